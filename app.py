@@ -16,9 +16,16 @@ Key features:
  
 import os
 import time
+import glob
+import codecs
+import hashlib
+import hmac
+import mimetypes
 import sqlite3
 import math
-from flask import Flask, redirect, render_template, request, session, abort, g, flash
+from flask import Flask, redirect, render_template, request, session, abort, g, flash, make_response
+from flask import send_file, url_for, stream_with_context
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
 import db
 import users
@@ -26,30 +33,49 @@ import config
 import transcriptions
 import text_splitter_help_functions
 import help_functions
+import page_cache
+import audio_store
+import transcript_export
+import jobs
+import metrics
 from user_routes import user_bp, require_login
 
 
-UPLOAD_FOLDER = './static/audio'
-
 app = Flask(__name__)
 app.secret_key = config.SECRET_KEY
 app.register_blueprint(user_bp)
+db.init_app(app)
 
 MEGABYTE = (2 ** 10) ** 2
 app.config['MAX_CONTENT_LENGTH'] = None
 app.config['MAX_FORM_MEMORY_SIZE'] = 5 * MEGABYTE
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+RAW_CONTENT_EDIT_LIMIT = MEGABYTE
+FRAGMENT_WINDOW_MAX = 200
+AUDIO_MAX_AGE = 365 * 24 * 60 * 60
+
+# part of the transcription page ETag, so that a deployment with changed
+# code or templates does not answer 304 for pages rendered by the old one
+TEMPLATE_VERSION = int(max(
+    os.path.getmtime(path)
+    for path in [__file__] + glob.glob(os.path.join(app.root_path, "templates", "*.html"))))
 
 
 @app.before_request
 def before_request():
-    """Store the request start time for performance monitoring."""
-    g.start_time = time.time()
+    """Store the request start time for performance monitoring.
+
+    The first request of a server process also starts its background job
+    workers and the thread that stores its request metrics, so importing
+    the module does not start threads.
+    """
+    g.start_time = time.perf_counter()
+    jobs.ensure_worker_threads(config.JOB_WORKER_THREADS)
+    metrics.ensure_flush_thread()
 
 
 @app.after_request
 def after_request(response):
-    """Calculate and log the elapsed time for each request.
+    """Record the latency, response size and SQL statements of the request.
 
     Args:
         response: The Flask response object.
@@ -57,11 +83,50 @@ def after_request(response):
     Returns:
         The unmodified response object.
     """
-    elapsed_time = round(time.time() - g.start_time, 2)
-    print("elapsed time:", elapsed_time, "s")
+    sql_statements, sql_seconds = db.statement_stats()
+    metrics.record_request(
+        request.endpoint or "unmatched",
+        request.method,
+        response.status_code,
+        time.perf_counter() - g.start_time,
+        response.content_length,
+        sql_statements,
+        sql_seconds)
     return response
 
 
+def metrics_allowed():
+    """Check that the request may read the metrics.
+
+    With METRICS_TOKEN set the request must carry it as a bearer token,
+    otherwise it must come from the local host.
+
+    Returns:
+        True if the metrics may be served.
+    """
+    if config.METRICS_TOKEN:
+        expected = "Bearer " + config.METRICS_TOKEN
+        given = request.headers.get("Authorization", "")
+        return hmac.compare_digest(given.encode(), expected.encode())
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+@app.route("/metrics")
+def show_metrics():
+    """Serve the request metrics of all worker processes for Prometheus.
+
+    Returns:
+        The metrics in the Prometheus text exposition format.
+
+    Raises:
+        403: If the request has no valid METRICS_TOKEN, or none is set and
+            the request is not from the local host.
+    """
+    if not metrics_allowed():
+        abort(403)
+    return app.response_class(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
 def check_csrf():
     """Validate CSRF token from form matches the session token.
 
@@ -88,6 +153,10 @@ def get_user():
 def index(page=1):
     """Display paginated list of transcriptions on the home page.
 
+    The previous/next links carry an ``after`` or ``before`` transcription
+    id cursor so that the page is read with an index seek. A plain page
+    number still works as a fallback.
+
     Args:
         page: The page number to display (default: 1).
 
@@ -106,8 +175,18 @@ def index(page=1):
     if page > page_count:
         return redirect("/" + str(page_count))
 
-    transcription_array = transcriptions.get_transcriptions_paginated(
-        page, page_size)
+    after = request.args.get("after", type=int)
+    before = request.args.get("before", type=int)
+    transcription_array = []
+    if after is not None:
+        transcription_array = transcriptions.get_transcriptions_after(
+            after, page_size)
+    elif before is not None:
+        transcription_array = transcriptions.get_transcriptions_before(
+            before, page_size)
+    if not transcription_array:
+        transcription_array = transcriptions.get_transcriptions_paginated(
+            page, page_size)
 
     return render_template(
         "index.html",
@@ -215,24 +294,14 @@ def new_transcription():
     if len(extra_meta_data) > 500:
         abort(400, description='Metadata liian pitkä. Maksimi pituus on 500 merkkiä')
 
-    file = request.files['file']
-
-    if file and help_functions.allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        new_filename = filename[:]
-        target_file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        counter = 1
-        while os.path.exists(target_file_path):
-            new_filename = str(counter) + "--" + filename
-            target_file_path = os.path.join(
-                app.config['UPLOAD_FOLDER'], new_filename)
-            counter += 1
-
-        file.save(target_file_path)
-        source_path = new_filename
+    audio_sha256 = store_audio_upload()
+    if audio_sha256:
+        source_path = secure_filename(request.files['file'].filename)
 
     if ':' in duration_sec:
         duration_sec = help_functions.convert_hms_to_seconds(duration_sec)
+    if audio_sha256 and not duration_sec:
+        duration_sec = audio_duration_sec(audio_sha256) or duration_sec
 
     transcription_id = transcriptions.add_transcription(
         title,
@@ -245,12 +314,129 @@ def new_transcription():
         record_date,
         duration_sec,
         extra_meta_data, allow_collaboration)
+    if audio_sha256:
+        transcriptions.set_audio(transcription_id, audio_sha256)
+    if store_raw_content_upload(transcription_id):
+        split_text_fragments(transcriptions.get_transcription(transcription_id))
     return redirect("/transcription/" + str(transcription_id))
 
 
+def find_audio(transcription):
+    """Find the playable audio of a transcription.
+
+    Audio in the content-addressed store is used first, then a copy saved
+    under static/audio before the store existed.
+
+    Args:
+        transcription: The transcription row.
+
+    Returns:
+        Tuple of the audio URL, its MIME type and the URL of its waveform
+        peaks; None for the parts that are not available.
+    """
+    if transcription['audio_sha256']:
+        audio_file = audio_store.get_audio_file(transcription['audio_sha256'])
+        if audio_file:
+            waveform_url = None
+            if audio_store.may_have_peaks(audio_file):
+                waveform_url = url_for('serve_audio_peaks', sha256=audio_file['sha256'])
+            return (url_for('serve_audio', sha256=audio_file['sha256']),
+                    audio_file['mime_type'], waveform_url)
+    legacy_file_name = audio_store.find_legacy_audio_file(transcription['source_path'])
+    if legacy_file_name:
+        return (url_for('static', filename='audio/' + legacy_file_name),
+                mimetypes.guess_type(legacy_file_name)[0] or 'audio/mpeg', None)
+    return None, None, None
+
+
+def transcription_page_etag(transcription, page, highlight_id, audio_url, job):
+    """Build the ETag of a rendered transcription page.
+
+    The page depends on the transcription revision, the viewing user and
+    the CSRF token of the login (embedded in the restore form), the shown
+    background job and its progress, the query string and the templates,
+    so all of them are part of the tag.
+
+    Args:
+        transcription: The transcription row.
+        page: The page number of text fragments.
+        highlight_id: The ID of the highlighted text fragment or None.
+        audio_url: The URL of the audio player source or None.
+        job: The background job shown on the page or None.
+
+    Returns:
+        The (weak) entity tag value.
+    """
+    key = "|".join(str(part) for part in (
+        transcription["id"], transcription["revision"], page, highlight_id,
+        session.get("user_id"), session.get("csrf_token"), audio_url,
+        job and (job["id"], job["state"], job["rows_processed"]),
+        request.query_string.decode("latin-1"), TEMPLATE_VERSION))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def render_text_fragment_listing(transcription, page, highlight_id, local_audio_file_copy_exists,
+                                 at=None):
+    """Render the text fragment table of one page, using the page cache.
+
+    Entries are keyed by the transcription revision, so a cached listing is
+    never served after the transcription or its fragments have changed.
+
+    Args:
+        transcription: The transcription row.
+        page: The page number of text fragments.
+        highlight_id: The ID of the highlighted text fragment or None.
+        local_audio_file_copy_exists: Whether the time stamps link to the audio player.
+        at: Show the texts as they were at this UTC time ("YYYY-MM-DD HH:MM:SS"),
+            or None for the current texts.
+
+    Returns:
+        Tuple of the listing HTML (None when the page has no fragments)
+        and the time string of the last fragment on the page.
+    """
+    cache_key = (transcription["id"], transcription["revision"], page,
+                 highlight_id, local_audio_file_copy_exists, at)
+    cached = page_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    text_fragments = transcriptions.get_text_fragments_paginated(
+        transcription["id"], page, at)
+    text_fragments_with_secs = [(id,
+                                 int(start_ms / 1000),
+                                 help_functions.convert_seconds_to_hms(int(start_ms / 1000)),
+                                 start_ms,
+                                 words, version) for id,
+                                start_ms,
+                                words,  version in text_fragments]
+
+    # Get the time string of the last fragment for next page navigation
+    next_page_time_str = None
+    text_fragments_html = None
+    if text_fragments_with_secs:
+        last_fragment = text_fragments_with_secs[-1]
+        next_page_time_str = last_fragment[2]  # time_str is at index 2
+        text_fragments_html = Markup(render_template(
+            "transcriptions_texts_listing.html",
+            transcription=transcription,
+            text_fragments=text_fragments_with_secs,
+            page=page,
+            local_audio_file_copy_exists=local_audio_file_copy_exists,
+            highlight_id=highlight_id))
+
+    result = (text_fragments_html, next_page_time_str)
+    page_cache.put(cache_key, result, len(text_fragments_html or ""))
+    return result
+
+
 def fetch_and_show_transcription(transcription_id, page=1, highlight_id=None):
     """Fetch and display a transcription with paginated text fragments.
 
+    Responses carry an ETag derived from the transcription revision, and a
+    matching If-None-Match request is answered with 304 before any
+    fragment is read. With the query parameter at, the texts are shown as
+    they were at that time.
+
     Args:
         transcription_id: The ID of the transcription to display.
         page: The page number of text fragments (default: 1).       
@@ -259,15 +445,33 @@ def fetch_and_show_transcription(transcription_id, page=1, highlight_id=None):
     Raises: 
         404: If transcription is not found.
     """
-    page_size = 20
     audiotime = request.args.get('audiotime')
-    text_fragments_count = transcriptions.get_text_fragments_count(
-        transcription_id)
-    # text_fragments_count = len(text_fragments)
-    text_fragments_count = text_fragments_count["count"]
-    page_count = math.ceil(text_fragments_count / page_size)
+    at = help_functions.parse_timestamp(request.args.get('at'))
+    transcription = transcriptions.get_transcription(transcription_id)
+    if not transcription:
+        abort(404)
+
+    audio_url, audio_mime_type, waveform_url = find_audio(transcription)
+    local_audio_file_copy_exists = audio_url is not None
+
+    # the latest background job is shown while it is active; its result
+    # (rows and time, or the error) is shown once to the user who queued it
+    job = jobs.get_latest_job(transcription_id)
+    if job and job["state"] not in jobs.ACTIVE_STATES and (
+            job["acknowledged"] or job["user_id"] != session.get("user_id")):
+        job = None
+
+    # pending flash messages are shown once, so such a page is never reused
+    conditional = not session.get("_flashes")
+    etag = transcription_page_etag(transcription, page, highlight_id, audio_url, job)
+    if conditional and request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    page_count = transcriptions.get_text_fragment_page_count(transcription_id)
     page_count = max(page_count, 1)
-    print(page_count, text_fragments_count)
     if page < 1:
         return redirect("/transcription/" + str(transcription_id) + "/1")
     if page > page_count:
@@ -277,61 +481,38 @@ def fetch_and_show_transcription(transcription_id, page=1, highlight_id=None):
             "/" +
             str(page_count))
 
-    text_fragments = transcriptions.get_text_fragments_paginated(
-        transcription_id, page, page_size)
-    text_fragments_with_secs = [(id,
-                                 int(start_ms / 1000),
-                                 help_functions.convert_seconds_to_hms(int(start_ms / 1000)),
-                                 start_ms,
-                                 words, version) for id,
-                                start_ms,
-                                words,  version in text_fragments]
-    
-    # Get the time string of the last fragment for next page navigation
-    next_page_time_str = None
-    if text_fragments_with_secs:
-        last_fragment = text_fragments_with_secs[-1]
-        next_page_time_str = last_fragment[2]  # time_str is at index 2
-    
-    transcription = transcriptions.get_transcription(transcription_id)
-    if not transcription:
-        abort(404)
+    text_fragments_html, next_page_time_str = render_text_fragment_listing(
+        transcription, page, highlight_id, local_audio_file_copy_exists, at)
 
     user = None
     if transcription['user_id']:
         user_id = transcription['user_id']
         user = users.get_user(user_id)
-    source_path = transcription['source_path']
-    local_audio_file_copy_exists = False
-    audio_file_path = None
-    if source_path:
-        source_path_file_name = os.path.basename(source_path)
-        local_audio_file_copy = os.path.join(
-            'static/audio', source_path_file_name)
-        local_audio_file_copy_exists = os.path.exists(local_audio_file_copy)
-        audio_file_path = f"audio/{source_path_file_name}"
-        if not local_audio_file_copy_exists:
-            # filenames from the whole source_path string
-            source_path_fallback = source_path.replace("\\", '--')
-            local_audio_file_copy = os.path.join(
-                'static/audio', source_path_fallback)
-            local_audio_file_copy_exists = os.path.exists(
-                local_audio_file_copy)
-            audio_file_path = f"audio/{source_path_fallback}"
 
-    return render_template(
+    response = make_response(render_template(
         "transcription.html",
         transcription=transcription,
-        text_fragments=text_fragments_with_secs,
+        text_fragments_html=text_fragments_html,
         convert_seconds_to_hms=help_functions.convert_seconds_to_hms,
         page=page,
         page_count=page_count,
         local_audio_file_copy_exists=local_audio_file_copy_exists,
-        audio_file_path=audio_file_path,
+        audio_url=audio_url,
+        audio_mime_type=audio_mime_type,
+        waveform_url=waveform_url,
         audiotime=audiotime,
         next_page_time_str=next_page_time_str,
         highlight_id=highlight_id,
-        user=user)
+        at=at,
+        job=job,
+        job_progress=jobs.progress(job) if job else (None, None),
+        user=user))
+    if job and job["state"] not in jobs.ACTIVE_STATES:
+        jobs.acknowledge(job["id"])
+    if conditional:
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 
 @app.route("/transcription/<int:transcription_id>")
@@ -354,6 +535,168 @@ def show_transcription(transcription_id, page=1):
     return fetch_and_show_transcription(transcription_id, page)
     
 
+@app.route("/transcription/<int:transcription_id>/seek")
+def seek_transcription(transcription_id):
+    """Find the text fragment and page playing at a playback time.
+
+    Query parameters: time as seconds or h:mm:ss, and go=1 to redirect to
+    the page of the fragment instead of answering with JSON.
+
+    Args:
+        transcription_id: The ID of the transcription.
+
+    Returns:
+        JSON with the fragment id, its start_ms, page and page URL, or a
+        redirect to that URL.
+
+    Raises:
+        400: If the time is missing or invalid.
+        404: If transcription is not found or has no text fragments.
+    """
+    require_login()
+    time_ms = help_functions.parse_playback_time(request.args.get("time"))
+    if time_ms is None:
+        abort(400)
+    if not transcriptions.get_transcription(transcription_id):
+        abort(404)
+    # before the first fragment the first one is the nearest
+    fragment = transcriptions.get_text_fragment_at_time(transcription_id, time_ms)
+    if not fragment:
+        fragment = next(iter(transcriptions.get_text_fragments_after(transcription_id, -1, -1, 1)), None)
+    if not fragment:
+        abort(404)
+    page, _ = transcriptions.get_the_page_of_text_fragment(fragment["id"])
+    url = ("/transcription/" + str(transcription_id) + "/" + str(page) +
+           "?audiotime=" + help_functions.convert_seconds_to_hms(time_ms // 1000) +
+           "#t-id-" + str(fragment["id"]))
+    if request.args.get("go"):
+        return redirect(url)
+    return {
+        "id": fragment["id"],
+        "start_ms": fragment["start_ms"],
+        "page": page,
+        "url": url,
+    }
+
+
+@app.route("/transcription/<int:transcription_id>/fragments")
+def text_fragment_window(transcription_id):
+    """Return the text fragments around a playback time as JSON.
+
+    The transcription page uses this to follow the audio player. Query
+    parameters: time as seconds or h:mm:ss, before (default 1) and after
+    (default 50) fragments around the one playing, at most
+    FRAGMENT_WINDOW_MAX each.
+
+    Args:
+        transcription_id: The ID of the transcription.
+
+    Returns:
+        JSON with current_id (null before the first fragment), the
+        fragments in page order and end, true when the last fragment of
+        the transcription is included. start_ms is the original start
+        time, the page order key the fragments are sorted and the current
+        one is found by.
+
+    Raises:
+        400: If the time is missing or invalid.
+        404: If transcription is not found.
+    """
+    require_login()
+    time_ms = help_functions.parse_playback_time(request.args.get("time"))
+    if time_ms is None:
+        abort(400)
+    if not transcriptions.get_transcription(transcription_id):
+        abort(404)
+    before = min(max(request.args.get("before", 1, type=int), 0), FRAGMENT_WINDOW_MAX)
+    after = min(max(request.args.get("after", 50, type=int), 1), FRAGMENT_WINDOW_MAX)
+    current_id, fragments = transcriptions.get_text_fragments_around(
+        transcription_id, time_ms, before, after)
+    # fragments after the current one; fewer than asked means the end
+    following = len(fragments)
+    if current_id is not None:
+        following -= [row["id"] for row in fragments].index(current_id) + 1
+    return {
+        "current_id": current_id,
+        "fragments": [{
+            "id": row["id"],
+            "start_ms": row["start_ms"],
+            "time": help_functions.convert_seconds_to_hms(row["start_ms"] // 1000) or "0:00:00",
+            "words": row["words"],
+            "version": row["version"],
+        } for row in fragments],
+        "end": following < after,
+    }
+
+
+@app.route("/transcription/<int:transcription_id>/restore", methods=["POST"])
+def restore_transcription_texts(transcription_id):
+    """Restore every text fragment to the text it had at a given time.
+
+    The texts are saved as new versions in one transaction, so the current
+    texts stay in the edit history. Removed and added fragments are not
+    affected.
+
+    Args:
+        transcription_id: The ID of the transcription.
+
+    Returns:
+        Redirect to the first page of the transcription.
+
+    Raises:
+        403: If the user may not edit the transcription.
+        404: If transcription is not found.
+    """
+    require_login()
+    check_csrf()
+    transcription = transcriptions.get_transcription(transcription_id)
+    if not transcription:
+        abort(404)
+    if not transcription["allow_collaboration"] and transcription["user_id"] != session["user_id"]:
+        abort(403)
+
+    at = help_functions.parse_timestamp(request.form.get("at"))
+    if not at:
+        flash('Virheellinen ajankohta')
+    elif jobs.get_active_job(transcription_id):
+        flash('Litteroinnilla on käynnissä taustatyö. Yritä myöhemmin uudelleen.')
+    else:
+        restored = transcriptions.restore_text_fragments(transcription_id, at, session["user_id"])
+        page_cache.invalidate(transcription_id)
+        flash(str(restored) + ' tekstiriviä palautettiin ajankohdan ' + at + ' (UTC) tekstiin')
+    return redirect("/transcription/" + str(transcription_id) + "/1")
+
+
+@app.route("/transcription/<int:transcription_id>/export.<string:export_format>")
+def export_transcription(transcription_id, export_format):
+    """Download the current text fragments of a transcription.
+
+    The file is streamed from a database cursor, so memory use does not
+    depend on the length of the transcription.
+
+    Args:
+        transcription_id: The ID of the transcription.
+        export_format: One of vtt, srt, json or txt.
+
+    Returns:
+        Streamed file response.
+
+    Raises:
+        404: If transcription or export format is not found.
+    """
+    require_login()
+    transcription = transcriptions.get_transcription(transcription_id)
+    if not transcription or export_format not in transcript_export.EXPORTERS:
+        abort(404)
+    mimetype = transcript_export.EXPORTERS[export_format][1]
+    file_name = secure_filename(transcription["title"] or "") or f"transcription-{transcription_id}"
+    response = app.response_class(
+        stream_with_context(transcript_export.export_transcription(transcription_id, export_format)),
+        mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{file_name}.{export_format}"'
+    return response
+
+
 @app.route("/add_text_fragment/<int:transcription_id>",
            methods=["GET", "POST"])
 def add_text_fragment(transcription_id):
@@ -407,6 +750,7 @@ def add_text_fragment(transcription_id):
             transcriptions.add_text_fragment(start_ms, words, transcription_id)
         except sqlite3.IntegrityError:
             abort(400)
+        page_cache.invalidate(transcription_id)
         page = '/' + str(return_page) if return_page else ''
         # id_anchor = '#t-id-' + str(text_fragment_id)
         return redirect(
@@ -421,73 +765,185 @@ def generate_text_fragments(transcription_id):
     """Generate text fragments from raw transcription content.
 
     Processes the raw content based on source type (YouTube, Word, WebVTT)
-    and splits it into timestamped text fragments.
+    and splits it into timestamped text fragments in a background job.
 
     Args:
         transcription_id: The ID of the transcription.
 
     Returns:
-        Rendered transcription page with generated fragments or redirect.
+        Redirect to the transcription page.
 
     Raises:
         400: If duplicate fragments are detected.
         404: If transcription is not found.
     """
     require_login()
-    text_fragments = transcriptions.get_text_fragments(transcription_id)
-    text_fragments_with_secs = [(id,
-                                 int(start_ms / 1000),
-                                 start_ms,
-                                 words) for id,
-                                start_ms,
-                                words in text_fragments]
     transcription = transcriptions.get_transcription(transcription_id)
     if not transcription:
         abort(404)
 
-    if len(text_fragments) > 0:
-        return render_template(
-            "transcription.html",
-            transcription=transcription,
-            text_fragments=text_fragments_with_secs)
+    text_fragments_count = transcriptions.get_text_fragments_count(transcription_id)
+    if text_fragments_count["count"] > 0:
+        return redirect("/transcription/" + str(transcription["id"]))
 
-    raw_content = transcription['raw_content']
-    if len(raw_content.strip()) == 0:
+    raw_content = transcriptions.iter_raw_content(transcription_id)
+    if not any(chunk.strip() for chunk in raw_content):
         try:
             transcriptions.add_text_fragment(0, 'Placeholder', transcription_id)
         except sqlite3.IntegrityError:
             abort(400)
+        page_cache.invalidate(transcription_id)
         return redirect("/transcription/" + str(transcription["id"]))
-   
-    test_fragments_with_timestamps = []
-    try:
-        if transcription['source'] == 'youtube':
-            test_fragments_with_timestamps = text_splitter_help_functions.split_youtube_transcription(
-                raw_content)
-        elif transcription['source'] == 'word':
-            test_fragments_with_timestamps = text_splitter_help_functions.split_word_transcription(
-                raw_content)
-        elif transcription['source'] == 'webvtt':
-            test_fragments_with_timestamps = text_splitter_help_functions.split_web_vtt(
-                raw_content)
-        else:
-            print(transcription['source'], " text source not supported")
-    except Exception:    
-        flash('Tekstinjako epäonnistui. Tarkista että aikaleimattu lähdeteksti on eheä ja valitun ' + transcription['source'] + ' lähteen formaation mukainen ') 
-        return redirect("/transcription/" + str(transcription["id"]))
-    transcription_id = transcription['id']
-    try:
-        for start_ms, words in test_fragments_with_timestamps:
-            transcriptions.add_text_fragment(start_ms, words, transcription_id)
-    except sqlite3.IntegrityError:
-        abort(400)
+
+    split_text_fragments(transcription)
     return redirect("/transcription/" + str(transcription["id"]))
 
 
+def split_text_fragments(transcription):
+    """Queue the splitting of the raw content of a transcription.
+
+    The background job streams the raw content through the splitter of the
+    transcription's source format and reports its progress on the
+    transcription page.
+
+    Args:
+        transcription: The transcription row.
+    """
+    source = transcription['source']
+    if source not in text_splitter_help_functions.SPLITTERS:
+        print(source, " text source not supported")
+        return
+    if enqueue_job("split", transcription['id']):
+        flash('Tekstinjako aloitettiin taustalla')
+
+
+def enqueue_job(kind, transcription_id):
+    """Queue a background job, or flash a message if another job is active.
+
+    Args:
+        kind: The job kind, see jobs.JOB_HANDLERS.
+        transcription_id: The ID of the transcription.
+
+    Returns:
+        The job id, or None if the transcription already has another job.
+    """
+    job_id = jobs.enqueue(kind, transcription_id, session.get("user_id"))
+    if not job_id:
+        flash('Litteroinnilla on jo käynnissä taustatyö. Yritä uudelleen kun se on valmis.')
+    return job_id
+
+
+def store_raw_content_upload(transcription_id):
+    """Store an uploaded raw transcript file of the current request.
+
+    The file is decoded and written to the database in chunks, so its size
+    is not limited by MAX_FORM_MEMORY_SIZE.
+
+    Args:
+        transcription_id: The ID of the transcription.
+
+    Returns:
+        True if a transcript file was uploaded and stored.
+    """
+    raw_file = request.files.get('raw_file')
+    if not raw_file or not help_functions.allowed_transcript_file(raw_file.filename):
+        return False
+    stream = raw_file.stream
+    chunks = codecs.iterdecode(
+        iter(lambda: stream.read(transcriptions.RAW_CONTENT_CHUNK_SIZE), b""),
+        "utf-8-sig", errors="replace")
+    transcriptions.set_raw_content(transcription_id, chunks)
+    return True
+
+
+def store_audio_upload():
+    """Store the audio file uploaded with the current request.
+
+    Returns:
+        SHA-256 of the stored file, or None if no audio file was uploaded.
+    """
+    file = request.files.get('file')
+    if not file or not help_functions.allowed_file(file.filename):
+        return None
+    return audio_store.store_audio(file.stream, secure_filename(file.filename))
+
+
+def audio_duration_sec(sha256):
+    """Return the duration of a stored audio file in whole seconds, or None."""
+    audio_file = audio_store.get_audio_file(sha256)
+    if not audio_file or audio_file["duration_ms"] is None:
+        return None
+    return round(audio_file["duration_ms"] / 1000)
+
+
+@app.route("/audio/<string:sha256>")
+def serve_audio(sha256):
+    """Serve a stored audio file.
+
+    Range requests are answered with 206 partial content, so the player can
+    seek without downloading the whole file. The URL names the content, so
+    the response can be cached for good.
+
+    Args:
+        sha256: The SHA-256 of the audio file.
+
+    Returns:
+        The audio file response.
+
+    Raises:
+        404: If the audio file is not in the store.
+    """
+    audio_file = audio_store.get_audio_file(sha256)
+    if not audio_file:
+        abort(404)
+    response = send_file(
+        audio_store.audio_path(sha256),
+        mimetype=audio_file["mime_type"],
+        conditional=True,
+        etag=sha256,
+        max_age=AUDIO_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route("/audio/<string:sha256>/peaks")
+def serve_audio_peaks(sha256):
+    """Serve the waveform peaks of a stored audio file.
+
+    The peaks of a WAV file are computed on the first request. The format
+    is described in audio_analysis.py.
+
+    Args:
+        sha256: The SHA-256 of the audio file.
+
+    Returns:
+        The binary peaks file response.
+
+    Raises:
+        404: If the audio file has no peaks.
+    """
+    audio_file = audio_store.get_audio_file(sha256)
+    if not audio_file or not audio_store.ensure_peaks(audio_file):
+        abort(404)
+    response = send_file(
+        audio_store.peaks_path(sha256),
+        mimetype="application/octet-stream",
+        conditional=True,
+        etag=sha256 + "-peaks",
+        max_age=AUDIO_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 @app.route("/search")
 def search():
     """Search for text within transcription content.
 
+    Uses the full-text index: results are ranked by relevance, "quoted
+    text" is matched as a phrase and a trailing * matches a prefix.
+
     Returns:
         Rendered search page with results.
     """
@@ -500,6 +956,7 @@ def search():
     return render_template(
         "search.html",
         text_query=text_query,
+        highlight_snippet=help_functions.highlight_snippet,
         results=results, user=user)
 
 
@@ -582,10 +1039,6 @@ def edit_text_fragment(text_fragment_id):
     require_login()
     return_page = request.args.get("return_page")
     text_fragment = transcriptions.get_text_fragment(text_fragment_id)
-    try:
-        version =  text_fragment['version']
-    except:
-        version=None
     if not text_fragment:
         abort(404)
 
@@ -610,14 +1063,24 @@ def edit_text_fragment(text_fragment_id):
         return_page = request.form["return_page"]
         words = request.form["words"]
         start_ms = text_fragment["start_ms"]
-        if version:
-            version = version + 1
-        else:
-            version = 1
+        # the version the form was based on; forms without it overwrite
+        base_version = request.form.get("version", type=int)
         text_fragment_id = text_fragment["id"]
-        print(words)
 
-        transcriptions.add_versioned_text_fragment(text_fragment_id, start_ms, version, words, session["user_id"])
+        version = transcriptions.add_versioned_text_fragment(
+            text_fragment_id, start_ms, words, session["user_id"], base_version)
+        if version is None:
+            # show the current text; the new form is based on its version
+            text_fragment = transcriptions.get_text_fragment(text_fragment_id)
+            flash('Toinen käyttäjä muokkasi riviä samaan aikaan (versio ' +
+                  str(text_fragment["version"]) + '). Tarkista nykyinen teksti ja tallenna uudelleen.')
+            return render_template(
+                "edit_text_fragment.html",
+                text_fragment=text_fragment,
+                submitted_words=words,
+                convert_seconds_to_hms=help_functions.convert_seconds_to_hms,
+                return_page=return_page), 409
+        page_cache.invalidate(transcription_id)
         page = '/' + str(return_page) if return_page else ''
         id_anchor = '#t-id-' + str(text_fragment_id)
 
@@ -674,6 +1137,7 @@ def remove_text_fragment(text_fragment_id):
         id_anchor = ''
         if "continue" in request.form:
             transcriptions.remove_text_fragment(text_fragment["id"])
+            page_cache.invalidate(transcription_id)
         else:
             id_anchor = '#t-id-' + str(text_fragment_id)
     return redirect(
@@ -688,7 +1152,7 @@ def remove_transcription(transcription_id):
     """Remove an entire transcription and its associated data.
 
     GET: Display confirmation form.
-    POST: Delete transcription if confirmed.
+    POST: Queue the removal of the transcription if confirmed.
 
     Args:
         transcription_id: The ID of the transcription to remove.
@@ -715,7 +1179,10 @@ def remove_transcription(transcription_id):
 
     if request.method == "POST":
         if "continue" in request.form:
-            transcriptions.remove_transcription(transcription["id"])
+            if not enqueue_job("remove_transcription", transcription["id"]):
+                return redirect("/transcription/" + str(transcription["id"]))
+            page_cache.invalidate(transcription["id"])
+            flash('Litterointi ' + str(transcription["id"]) + ' poistetaan taustalla')
     return redirect("/")
 
 
@@ -725,7 +1192,7 @@ def remove_transcription_split_text(transcription_id):
     """Remove all split text fragments from a transcription.
 
     GET: Display confirmation form.
-    POST: Delete all text fragments if confirmed.
+    POST: Queue the removal of all text fragments if confirmed.
 
     Args:
         transcription_id: The ID of the transcription.
@@ -754,7 +1221,8 @@ def remove_transcription_split_text(transcription_id):
 
     if request.method == "POST":
         if "continue" in request.form:
-            transcriptions.remove_transcription_split_text(transcription["id"])
+            enqueue_job("remove_split_text", transcription["id"])
+            page_cache.invalidate(transcription["id"])
     return redirect("/transcription/" + str(transcription["id"]))
 
 
@@ -782,7 +1250,12 @@ def edit_transcription(transcription_id):
  
 
     if request.method == "GET":
-        return render_template("edit.html", transcription=transcription,user=user)
+        # large raw content is not round-tripped through the form
+        raw_content = None
+        if (transcription["raw_content_size"] or 0) <= RAW_CONTENT_EDIT_LIMIT:
+            raw_content = transcriptions.get_raw_content(transcription_id)
+        return render_template("edit.html", transcription=transcription,user=user,
+                               raw_content=raw_content)
 
     if request.method == "POST":
         check_csrf()
@@ -802,23 +1275,17 @@ def edit_transcription(transcription_id):
         if ':' in duration_sec:
             duration_sec = help_functions.convert_hms_to_seconds(duration_sec)
 
-        # file = request.files['sound_file']
-        file = request.files['file']
-
-        if file and help_functions.allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            new_filename = filename[:]
-            target_file_path = os.path.join(
-                app.config['UPLOAD_FOLDER'], filename)
-            counter = 1
-            while os.path.exists(target_file_path):
-                new_filename = str(counter) + "--" + filename
-                target_file_path = os.path.join(
-                    app.config['UPLOAD_FOLDER'], new_filename)
-                counter += 1
+        audio_sha256 = store_audio_upload()
+        if audio_sha256:
+            source_path = secure_filename(request.files['file'].filename)
+            # the length of a newly attached recording comes from its headers
+            duration_sec = audio_duration_sec(audio_sha256) or duration_sec
 
-            file.save(target_file_path)
-            source_path = new_filename
+        # an uploaded transcript file replaces the raw content; raw content
+        # too large for the form is kept unless new text is given
+        raw_file_uploaded = store_raw_content_upload(transcription["id"])
+        if raw_file_uploaded or (not raw_content and "raw_content_kept" in request.form):
+            raw_content = None
 
         transcriptions.update_transcription(
             transcription["id"],
@@ -831,6 +1298,13 @@ def edit_transcription(transcription_id):
             record_date,
             duration_sec,
             extra_meta_data, allow_collaboration)
+        if audio_sha256:
+            transcriptions.set_audio(transcription["id"], audio_sha256)
+        page_cache.invalidate(transcription["id"])
+        text_fragments_count = transcriptions.get_text_fragments_count(
+            transcription["id"])
+        if raw_file_uploaded and text_fragments_count["count"] == 0:
+            split_text_fragments(transcriptions.get_transcription(transcription["id"]))
     return redirect("/transcription/" + str(transcription["id"]))
 
 
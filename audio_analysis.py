@@ -0,0 +1,272 @@
+"""Duration and waveform peaks of audio files, read from the file headers.
+
+WAV, MP3 and Ogg (Vorbis, Opus) durations are computed from headers and
+frame/page metadata without decoding the audio. For PCM WAV files a
+downsampled min/max peak array is read from a memory map of the data chunk.
+
+The peaks sidecar file is a 16 byte header followed by one signed byte min
+and one signed byte max per peak:
+
+    magic b"PEAK", version u32, sample rate u32, samples per peak u32
+"""
+
+import os
+import mmap
+import array
+import struct
+import tempfile
+
+PEAKS_PER_SECOND = 10
+PEAKS_MAGIC = b"PEAK"
+PEAKS_VERSION = 1
+PEAKS_HEADER = struct.Struct("<4sIII")
+HEADER_READ_SIZE = 64 * 1024
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = [44100, 48000, 32000]
+
+
+def _read_wav_header(f):
+    # (format, channels, sample rate, bits per sample, block align,
+    #  data offset, data size) of a RIFF WAVE file, or None
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        return None
+    fmt = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            data = f.read(chunk_size)
+            if len(data) < 16:
+                return None
+            audio_format, channels, sample_rate, _, block_align, bits = struct.unpack(
+                "<HHIIHH", data[:16])
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and len(data) >= 26:
+                audio_format = struct.unpack("<H", data[24:26])[0]
+            fmt = (audio_format, channels, sample_rate, bits, block_align)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            offset = f.tell()
+            # a streamed WAV can have a zero or oversized data chunk size
+            file_size = os.fstat(f.fileno()).st_size
+            if chunk_size == 0 or offset + chunk_size > file_size:
+                chunk_size = file_size - offset
+            return fmt + (offset, chunk_size)
+        else:
+            f.seek(chunk_size, os.SEEK_CUR)
+        if chunk_size % 2:
+            f.seek(1, os.SEEK_CUR)
+
+
+def wav_duration_ms(path):
+    with open(path, "rb") as f:
+        header = _read_wav_header(f)
+    if not header:
+        return None
+    _, _, sample_rate, _, block_align, _, data_size = header
+    if not sample_rate or not block_align:
+        return None
+    return data_size // block_align * 1000 // sample_rate
+
+
+def _id3v2_size(data):
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _mp3_frame_header(data, pos):
+    # (mpeg version 1 or 2, sample rate, bitrate kbps, mono, frame length)
+    # of a layer III frame header at pos, or None
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (data[pos + 1] >> 3) & 0x03
+    layer_bits = (data[pos + 1] >> 1) & 0x03
+    bitrate_index = data[pos + 2] >> 4
+    sample_rate_index = (data[pos + 2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    version = 1 if version_bits == 3 else 2
+    sample_rate = MP3_SAMPLE_RATES[sample_rate_index]
+    if version_bits == 2:
+        sample_rate //= 2
+    elif version_bits == 0:
+        sample_rate //= 4
+    mono = (data[pos + 3] >> 6) == 3
+    bitrate = MP3_BITRATES[version][bitrate_index]
+    padding = (data[pos + 2] >> 1) & 0x01
+    frame_length = (144 if version == 1 else 72) * bitrate * 1000 // sample_rate + padding
+    return version, sample_rate, bitrate, mono, frame_length
+
+
+def mp3_duration_ms(path):
+    """Duration from the Xing/Info or VBRI frame count, else from the bitrate."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        data = f.read(HEADER_READ_SIZE)
+        start = _id3v2_size(data)
+        if start:
+            f.seek(start)
+            data = f.read(HEADER_READ_SIZE)
+        else:
+            start = 0
+        f.seek(max(file_size - 128, 0))
+        id3v1 = f.read(3) == b"TAG"
+
+    # the first frame header that is followed by another one
+    pos = data.find(b"\xff")
+    header = None
+    while pos != -1 and pos < len(data) - 4:
+        header = _mp3_frame_header(data, pos)
+        if header:
+            next_pos = pos + header[4]
+            if next_pos + 4 > len(data) or _mp3_frame_header(data, next_pos):
+                break
+            header = None
+        pos = data.find(b"\xff", pos + 1)
+    if not header:
+        return None
+    version, sample_rate, bitrate, mono, _ = header
+    samples_per_frame = 1152 if version == 1 else 576
+
+    if version == 1:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            return frames * samples_per_frame * 1000 // sample_rate
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        return frames * samples_per_frame * 1000 // sample_rate
+
+    audio_size = file_size - start - pos - (128 if id3v1 else 0)
+    return audio_size * 8 // bitrate
+
+
+def ogg_duration_ms(path):
+    """Duration from the granule position of the last Ogg page."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(HEADER_READ_SIZE)
+        f.seek(max(file_size - HEADER_READ_SIZE, 0))
+        tail = f.read()
+    if head[:4] != b"OggS":
+        return None
+    pre_skip = 0
+    vorbis = head.find(b"\x01vorbis")
+    opus = head.find(b"OpusHead")
+    if vorbis != -1:
+        sample_rate = struct.unpack("<I", head[vorbis + 12:vorbis + 16])[0]
+    elif opus != -1:
+        pre_skip = struct.unpack("<H", head[opus + 10:opus + 12])[0]
+        sample_rate = 48000
+    else:
+        return None
+    page = tail.rfind(b"OggS")
+    while page != -1:
+        if tail[page + 4:page + 5] == b"\x00" and len(tail) >= page + 14:
+            granule = struct.unpack("<q", tail[page + 6:page + 14])[0]
+            if granule >= 0 and sample_rate:
+                return max(granule - pre_skip, 0) * 1000 // sample_rate
+        page = tail.rfind(b"OggS", 0, page)
+    return None
+
+
+DURATION_READERS = {
+    ".wav": wav_duration_ms,
+    ".mp3": mp3_duration_ms,
+    ".ogg": ogg_duration_ms,
+}
+
+
+def duration_ms(path, file_name):
+    """Return the duration of an audio file in milliseconds, or None.
+
+    The reader is picked by the extension of file_name, since stored files
+    are named by their hash.
+    """
+    reader = DURATION_READERS.get(os.path.splitext(file_name)[1].lower())
+    if not reader:
+        return None
+    try:
+        return reader(path)
+    except (OSError, struct.error):
+        return None
+
+
+# maps the most significant byte of a signed little-endian sample to an
+# unsigned byte with the same order, so min() and max() work on bytes
+SIGN_FLIP = bytes((value ^ 0x80) for value in range(256))
+
+
+def _block_min_max(block, audio_format, sample_size):
+    # signed byte min and max of a block of interleaved samples
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT:
+        samples = array.array("f", block)
+        return (max(-128, int(min(samples) * 128)),
+                min(127, int(max(samples) * 128)))
+    # the most significant byte is enough for an 8 bit waveform
+    high = block[sample_size - 1::sample_size]
+    if sample_size > 1:
+        high = high.translate(SIGN_FLIP)
+    return min(high) - 128, max(high) - 128
+
+
+def wav_peaks(path):
+    """Return (sample rate, samples per peak, bytes) of a WAV file, or None.
+
+    Every peak covers samples_per_peak frames of all channels and is stored
+    as a signed byte min followed by a signed byte max.
+    """
+    with open(path, "rb") as f:
+        header = _read_wav_header(f)
+        if not header:
+            return None
+        audio_format, _, sample_rate, bits, block_align, offset, data_size = header
+        supported = ((audio_format == WAVE_FORMAT_PCM and bits in (8, 16, 24, 32))
+                     or (audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 32))
+        if not supported or not sample_rate or not block_align or not data_size:
+            return None
+        samples_per_peak = max(sample_rate // PEAKS_PER_SECOND, 1)
+        peak_bytes = block_align * samples_per_peak
+        sample_size = bits // 8
+        peaks = bytearray()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(offset, offset + data_size, peak_bytes):
+                end = min(start + peak_bytes, offset + data_size)
+                end -= (end - start) % sample_size
+                if end <= start:
+                    break
+                low, high = _block_min_max(mapped[start:end], audio_format, sample_size)
+                peaks.append(low & 0xFF)
+                peaks.append(high & 0xFF)
+    return sample_rate, samples_per_peak, bytes(peaks)
+
+
+def write_peaks(path, sample_rate, samples_per_peak, peaks):
+    # a temporary file of its own, as two requests may write the same peaks
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(PEAKS_HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, sample_rate, samples_per_peak))
+        f.write(peaks)
+    os.replace(temp_path, path)
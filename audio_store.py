@@ -0,0 +1,134 @@
+"""Content-addressed storage for uploaded audio files.
+
+An upload is streamed to a temporary file while it is hashed, then moved
+to AUDIO_STORE_ROOT/ab/cd/<sha256>. The same file uploaded twice is stored
+once. Files uploaded before the store existed are still found by name in
+LEGACY_AUDIO_FOLDER.
+
+After a file is stored its duration is read from the headers. The
+waveform peaks of a WAV file are written next to it on the first request
+for them (see audio_analysis.py), so an upload does not read the audio.
+"""
+
+import os
+import hashlib
+import tempfile
+import mimetypes
+import db
+import audio_analysis
+
+# anchored to the application directory, like the paths send_file() and
+# the static folder resolve, so the working directory does not matter
+APP_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+AUDIO_STORE_ROOT = os.environ.get("AUDIO_STORE_ROOT", os.path.join(APP_DIRECTORY, "audio_store"))
+LEGACY_AUDIO_FOLDER = os.path.join(APP_DIRECTORY, "static", "audio")
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def audio_path(sha256):
+    return os.path.join(AUDIO_STORE_ROOT, sha256[:2], sha256[2:4], sha256)
+
+
+def peaks_path(sha256):
+    return audio_path(sha256) + ".peaks"
+
+
+def analyze_audio(sha256, file_name):
+    """Store the duration of a stored file.
+
+    Returns the duration in milliseconds, or None if it could not be read.
+    """
+    duration_ms = audio_analysis.duration_ms(audio_path(sha256), file_name)
+    sql = "UPDATE audio_files SET duration_ms = ? WHERE sha256 = ?"
+    db.execute(sql, [duration_ms, sha256])
+    return duration_ms
+
+
+def may_have_peaks(audio_file):
+    """Whether waveform peaks exist or can be computed for the file (WAV)."""
+    return bool(audio_file["has_peaks"]) or \
+        os.path.splitext(audio_file["file_name"])[1].lower() == ".wav"
+
+
+def ensure_peaks(audio_file):
+    """Compute the waveform peaks of a WAV file unless they are stored.
+
+    The first request for the peaks pays for reading the audio. A file
+    whose peaks cannot be read (not PCM, damaged) is only checked again,
+    which fails at its header.
+
+    Returns:
+        True if peaks_path() of the file can be served.
+    """
+    if audio_file["has_peaks"]:
+        return True
+    if not may_have_peaks(audio_file):
+        return False
+    sha256 = audio_file["sha256"]
+    try:
+        peaks = audio_analysis.wav_peaks(audio_path(sha256))
+    except (OSError, ValueError):
+        peaks = None
+    if not peaks:
+        return False
+    audio_analysis.write_peaks(peaks_path(sha256), *peaks)
+    db.execute("UPDATE audio_files SET has_peaks = TRUE WHERE sha256 = ?", [sha256])
+    return True
+
+
+def store_audio(stream, file_name):
+    """Store an audio stream and return its SHA-256 hex digest."""
+    temp_folder = os.path.join(AUDIO_STORE_ROOT, "tmp")
+    os.makedirs(temp_folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=temp_folder)
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            while True:
+                data = stream.read(COPY_CHUNK_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+                temp_file.write(data)
+                size += len(data)
+        sha256 = digest.hexdigest()
+        target_path = audio_path(sha256)
+        if os.path.exists(target_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(temp_path, target_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    mime_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    sql = """INSERT OR IGNORE INTO audio_files (sha256, file_name, mime_type, size, created)
+             VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)"""
+    db.execute(sql, [sha256, file_name, mime_type, size])
+    audio_file = get_audio_file(sha256)
+    if audio_file["duration_ms"] is None:
+        analyze_audio(sha256, audio_file["file_name"])
+    return sha256
+
+
+def get_audio_file(sha256):
+    sql = """SELECT sha256, file_name, mime_type, size, duration_ms, has_peaks
+             FROM audio_files WHERE sha256 = ?"""
+    result = db.query(sql, [sha256])
+    if not result or not os.path.exists(audio_path(sha256)):
+        return None
+    return result[0]
+
+
+def find_legacy_audio_file(source_path):
+    """Return the name of a pre-store copy of the audio under LEGACY_AUDIO_FOLDER."""
+    if not source_path:
+        return None
+    # by file name, then by a name made from the whole source_path string
+    for file_name in (os.path.basename(source_path), source_path.replace("\\", "--")):
+        if os.path.exists(os.path.join(LEGACY_AUDIO_FOLDER, file_name)):
+            return file_name
+    return None
@@ -0,0 +1,266 @@
+"""Benchmark of the database functions in transcriptions.py.
+
+For every database size (number of text fragments) a synthetic database is
+generated with seed.py into DATA_DIRECTORY, or reused if it is already
+there. Every public function of transcriptions.py is then called with
+arguments picked from that database: one warm-up call and --repeat timed
+calls. Functions that write run inside a transaction that is rolled back,
+so every call sees the same data. A public function with no entry in
+BENCHMARKS is reported as skipped, so new functions are not missed
+silently.
+
+The results are written as JSON. With --baseline they are compared with
+an earlier result file: a function whose median time grew by more than
+--tolerance (and by more than NOISE_FLOOR_MS) is reported as a
+regression and the command exits with status 1.
+
+Usage:
+    python benchmark.py [--sizes 10000,100000] [--output FILE] [--baseline FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import platform
+import datetime
+import sqlite3
+import statistics
+import db
+import seed
+import transcriptions
+
+DATA_DIRECTORY = "bench_data"
+DEFAULT_SIZES = (10**4, 10**5, 10**6, 10**7)
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR_MS = 0.5
+
+WRITES = {
+    "add_transcription", "remove_transcription", "set_raw_content", "set_audio",
+    "update_transcription", "add_text_fragment", "add_text_fragments",
+    "remove_text_fragment", "remove_text_fragments_batch",
+    "remove_transcription_split_text", "update_text", "add_versioned_text_fragment",
+    "restore_text_fragments",
+}
+
+# function name -> arguments made from the context of pick_context()
+BENCHMARKS = {
+    "get_transcriptions": lambda c: (),
+    "get_transcriptions_paginated": lambda c: (c["middle_page"], 20),
+    "get_transcriptions_after": lambda c: (c["typical_id"], 20),
+    "get_transcriptions_before": lambda c: (c["typical_id"], 20),
+    "get_transcriptions_count": lambda c: (),
+    "add_transcription": lambda c: ("Uusi", "uusi.mp3", "word", "luento", c["raw_content"],
+                                    c["user_id"], None, None, None, None, False),
+    "get_transcription": lambda c: (c["typical_id"],),
+    "remove_transcription": lambda c: (c["typical_id"],),
+    "set_raw_content": lambda c: (c["typical_id"], c["raw_content"]),
+    "iter_raw_content": lambda c: (c["largest_id"],),
+    "get_raw_content": lambda c: (c["largest_id"],),
+    "get_raw_content_hashes": lambda c: (),
+    "set_audio": lambda c: (c["typical_id"], None),
+    "update_transcription": lambda c: (c["typical_id"], "Muutettu", "uusi.mp3", "word", "luento",
+                                       None, None, None, None, None, False),
+    "get_text_fragments": lambda c: (c["largest_id"],),
+    "iter_text_fragments": lambda c: (c["largest_id"],),
+    "get_text_fragment_page_count": lambda c: (c["largest_id"],),
+    "get_text_fragments_paginated": lambda c: (c["largest_id"], c["largest_middle_page"]),
+    "get_text_fragments_after": lambda c: (c["largest_id"], c["fragment_start_ms"],
+                                           c["fragment_id"], transcriptions.FRAGMENT_PAGE_SIZE),
+    "get_text_fragments_as_of": lambda c: (c["largest_id"], c["as_of"], c["fragment_start_ms"],
+                                           c["fragment_id"], transcriptions.FRAGMENT_PAGE_SIZE),
+    "restore_text_fragments": lambda c: (c["largest_id"], c["as_of"], c["user_id"]),
+    "get_text_fragment_at_time": lambda c: (c["largest_id"], c["fragment_start_ms"]),
+    "get_text_fragments_around": lambda c: (c["largest_id"], c["fragment_start_ms"], 1, 50),
+    "get_the_page_of_text_fragment": lambda c: (c["fragment_id"],),
+    "get_text_fragments_count": lambda c: (c["largest_id"],),
+    "get_all_text_fragments_count": lambda c: (c["largest_id"],),
+    "get_text_fragment": lambda c: (c["fragment_id"],),
+    "add_text_fragment": lambda c: (123456, "Uusi rivi", c["largest_id"]),
+    "add_text_fragments": lambda c: (c["typical_id"], [(i * 1000, "Uusi rivi") for i in range(1000)]),
+    "remove_text_fragment": lambda c: (c["fragment_id"],),
+    "remove_text_fragments_batch": lambda c: (c["typical_id"],),
+    "remove_transcription_split_text": lambda c: (c["typical_id"],),
+    "update_text": lambda c: (c["fragment_id"], "Muutettu rivi"),
+    "add_versioned_text_fragment": lambda c: (c["fragment_id"], c["fragment_start_ms"],
+                                              "Muutettu rivi", c["user_id"]),
+    "search": lambda c: ("kyllä niin",),
+    "search_titles": lambda c: ("Litterointi 1",),
+    "search_file_name": lambda c: ("tallenne_1",),
+    "get_text_fragment_context": lambda c: (c["fragment_id"],),
+    "get_duplicate_files": lambda c: (),
+    "get_genre_stats": lambda c: (),
+    "get_source_stats": lambda c: (),
+    "get_user_stats": lambda c: (),
+    "get_transcriptions_of_user": lambda c: (c["user_id"],),
+    "get_transcriptions_by_genre": lambda c: ("luento",),
+    "get_transcriptions_by_source": lambda c: ("word",),
+}
+
+# untimed preparation of a write, in the same rolled back transaction
+SETUP = {
+    "remove_transcription": lambda c: transcriptions.remove_transcription_split_text(c["typical_id"]),
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def public_functions():
+    return {name: function for name, function in inspect.getmembers(transcriptions, inspect.isfunction)
+            if not name.startswith("_") and function.__module__ == transcriptions.__name__}
+
+
+def pick_context():
+    """Pick the ids the benchmarks use: the largest and a median transcription."""
+    sql = """SELECT transcription_id, count(*) AS count FROM text_fragments
+             GROUP BY transcription_id ORDER BY count DESC, transcription_id"""
+    counts = db.query(sql)
+    largest_id = counts[0]["transcription_id"]
+    typical_id = counts[len(counts) // 2]["transcription_id"]
+    page_count = transcriptions.get_text_fragment_page_count(largest_id)
+    middle_page = max(1, page_count // 2)
+    fragment = transcriptions.get_text_fragments_paginated(largest_id, middle_page)[0]
+    return {
+        "largest_id": largest_id,
+        "typical_id": typical_id,
+        "largest_middle_page": middle_page,
+        "middle_page": max(1, transcriptions.get_transcriptions_count() // 40),
+        "fragment_id": fragment["id"],
+        "fragment_start_ms": fragment["start_ms"],
+        "user_id": transcriptions.get_transcription(largest_id)["user_id"],
+        "raw_content": transcriptions.get_raw_content(typical_id),
+        "as_of": db.query("SELECT MIN(created_at) AS at FROM text_fragment_edits")[0]["at"],
+    }
+
+
+def _call(function, arguments, writes, setup=None):
+    # returns the time of the call in milliseconds
+    if not writes:
+        started = time.perf_counter()
+        result = function(*arguments)
+        if not isinstance(result, (list, tuple, dict, int, type(None))):
+            # generators are timed until the last row is read
+            for _ in result:
+                pass
+        return (time.perf_counter() - started) * 1000
+    try:
+        with db.transaction():
+            if setup:
+                setup()
+            started = time.perf_counter()
+            function(*arguments)
+            elapsed = (time.perf_counter() - started) * 1000
+            raise _Rollback
+    except _Rollback:
+        pass
+    return elapsed
+
+
+def time_function(function, arguments, writes, repeat, setup=None):
+    _call(function, arguments, writes, setup)
+    times = [_call(function, arguments, writes, setup) for _ in range(repeat)]
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+
+
+def database_path(size, data_directory):
+    return os.path.join(data_directory, f"bench_{size}.db")
+
+
+def benchmark_size(size, data_directory, repeat, only=None, regenerate=False):
+    path = database_path(size, data_directory)
+    if regenerate or not os.path.exists(path):
+        os.makedirs(data_directory, exist_ok=True)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        print(f"generating {path}", file=sys.stderr)
+        seed.generate(path, size)
+    db.DATABASE = path
+    results = {}
+    try:
+        context = pick_context()
+        for name, function in sorted(public_functions().items()):
+            if only and name not in only:
+                continue
+            make_arguments = BENCHMARKS.get(name)
+            if make_arguments is None:
+                results[name] = {"skipped": "no arguments in BENCHMARKS"}
+                continue
+            setup = SETUP.get(name)
+            results[name] = time_function(function, make_arguments(context), name in WRITES, repeat,
+                                          setup and (lambda: setup(context)))
+            print(f"{size:>10} {name:<34} {results[name]['median_ms']:>10.3f} ms",
+                  file=sys.stderr, flush=True)
+    finally:
+        db.close_connection()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return (size, name, baseline ms, ms) of the regressed functions."""
+    regressions = []
+    for size, functions in results["results"].items():
+        for name, result in functions.items():
+            old = baseline.get("results", {}).get(size, {}).get(name, {})
+            if "median_ms" not in result or "median_ms" not in old:
+                continue
+            new_ms, old_ms = result["median_ms"], old["median_ms"]
+            if new_ms > old_ms * (1 + tolerance) and new_ms - old_ms > NOISE_FLOOR_MS:
+                regressions.append((size, name, old_ms, new_ms))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the transcriptions.py functions.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma separated numbers of text fragments (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="timed calls per function (default: %(default)s)")
+    parser.add_argument("--only", help="comma separated function names to run")
+    parser.add_argument("--data-dir", default=DATA_DIRECTORY,
+                        help="directory of the generated databases (default: %(default)s)")
+    parser.add_argument("--regenerate", action="store_true",
+                        help="generate the databases even if they exist")
+    parser.add_argument("--output", help="JSON result file (default: standard output)")
+    parser.add_argument("--baseline", help="earlier JSON result file to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown (default: %(default)s)")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    only = set(args.only.split(",")) if args.only else None
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeat": args.repeat,
+        "results": {str(size): benchmark_size(size, args.data_dir, args.repeat, only, args.regenerate)
+                    for size in sizes},
+    }
+    text = json.dumps(results, indent=2, ensure_ascii=False) + "\n"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for size, name, old_ms, new_ms in regressions:
+        print(f"regression at {size} fragments: {name} {old_ms:.3f} ms -> {new_ms:.3f} ms",
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,3 +3,12 @@ import os
 SECRET_KEY = os.environ.get("SECRET_KEY")
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY environment variable must be set")
+
+# background job worker threads started by the first request of each web
+# server process; set to 0 when the jobs are run with a separate
+# "python jobs.py" process
+JOB_WORKER_THREADS = int(os.environ.get("JOB_WORKER_THREADS", "1"))
+
+# bearer token that Prometheus sends to /metrics; without one the metrics
+# are served only to requests from the local host
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
@@ -1,28 +1,181 @@
+"""SQLite access layer.
+
+Connections are opened in WAL mode with a busy timeout and kept in a small
+per-process pool. Inside a Flask request one connection is borrowed on first
+use, stored on ``flask.g`` and given back to the pool on app context
+teardown. Outside an app context (command line scripts) the connection is
+kept per thread until ``close_connection()`` is called.
+
+The number of statements run and the time spent in them are counted per
+request (or per thread), see statement_stats(). Slow statements are written
+to the slow query log, see query_log.py.
+"""
+
+import os
+import time
 import sqlite3
-from flask import g
+import threading
+from contextlib import contextmanager
+from flask import g, has_app_context
+import query_log
 
+DATABASE = os.environ.get("DATABASE", "database.db")
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
 
-def get_connection():
-    con = sqlite3.connect("database.db")
-    con.execute("PRAGMA foreign_keys = ON")
+_pool = {}
+_pool_pid = os.getpid()
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def _state():
+    return g if has_app_context() else _local
+
+
+def _connect(path):
+    con = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE)
     con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode = WAL")
+    con.execute("PRAGMA synchronous = NORMAL")
+    con.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    con.execute("PRAGMA foreign_keys = ON")
     return con
 
 
+def _acquire(path):
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            # connections must not be shared with a forked parent process
+            _pool = {}
+            _pool_pid = os.getpid()
+        idle = _pool.get(path)
+        if idle:
+            return idle.pop()
+    return _connect(path)
+
+
+def _release(path, con):
+    if con.in_transaction:
+        con.rollback()
+    with _pool_lock:
+        if _pool_pid == os.getpid():
+            idle = _pool.setdefault(path, [])
+            if len(idle) < POOL_SIZE:
+                idle.append(con)
+                return
+    con.close()
+
+
+def get_connection():
+    state = _state()
+    con = getattr(state, "db_connection", None)
+    if con is None:
+        path = DATABASE
+        con = _acquire(path)
+        state.db_connection = con
+        state.db_path = path
+        state.db_transaction_depth = 0
+    return con
+
+
+def close_connection(exception=None):
+    state = _state()
+    con = getattr(state, "db_connection", None)
+    if con is None:
+        return
+    state.db_connection = None
+    state.db_transaction_depth = 0
+    _release(state.db_path, con)
+
+
+def init_app(app):
+    app.teardown_appcontext(close_connection)
+
+
+@contextmanager
+def transaction():
+    """Run the enclosed statements in one transaction.
+
+    Nested blocks join the outermost transaction, which commits once at the
+    end or rolls everything back if an exception escapes.
+    """
+    con = get_connection()
+    state = _state()
+    if state.db_transaction_depth == 0:
+        con.execute("BEGIN IMMEDIATE")
+    state.db_transaction_depth += 1
+    try:
+        yield con
+    except BaseException:
+        state.db_transaction_depth -= 1
+        if state.db_transaction_depth == 0:
+            con.rollback()
+        raise
+    state.db_transaction_depth -= 1
+    if state.db_transaction_depth == 0:
+        con.commit()
+
+
+def _statement_done(con, sql, params, started, rows):
+    seconds = time.perf_counter() - started
+    state = _state()
+    state.sql_statements = getattr(state, "sql_statements", 0) + 1
+    state.sql_seconds = getattr(state, "sql_seconds", 0.0) + seconds
+    if query_log.SLOW_QUERY_LOG and seconds * 1000 >= query_log.SLOW_QUERY_MS:
+        query_log.record(con, sql, params, seconds, rows)
+
+
+def statement_stats():
+    """Return (statements, seconds) run by the current request or thread."""
+    state = _state()
+    return getattr(state, "sql_statements", 0), getattr(state, "sql_seconds", 0.0)
+
+
 def execute(sql, params=[]):
     con = get_connection()
+    started = time.perf_counter()
     result = con.execute(sql, params)
-    con.commit()
-    g.last_insert_id = result.lastrowid
-    con.close()
+    _statement_done(con, sql, params, started, result.rowcount)
+    _state().last_insert_id = result.lastrowid
+    return result.rowcount
+
+
+def executemany(sql, params_seq):
+    con = get_connection()
+    started = time.perf_counter()
+    result = con.executemany(sql, params_seq)
+    _statement_done(con, sql, None, started, result.rowcount)
+    return result.rowcount
 
 
 def last_insert_id():
-    return g.last_insert_id
+    return _state().last_insert_id
 
 
 def query(sql, params=[]):
     con = get_connection()
+    started = time.perf_counter()
     result = con.execute(sql, params).fetchall()
-    con.close()
+    _statement_done(con, sql, params, started, len(result))
     return result
+
+
+def iterate(sql, params=[]):
+    """Yield the result rows one at a time instead of fetching them all."""
+    con = get_connection()
+    started = time.perf_counter()
+    cursor = con.execute(sql, params)
+    # only the first step is timed, the rows are read by the caller
+    _statement_done(con, sql, params, started, None)
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
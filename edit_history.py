@@ -0,0 +1,329 @@
+"""Delta-compressed storage of the text fragment edit history.
+
+Every SNAPSHOT_INTERVAL:th version of a fragment (1, 1 + N, 1 + 2N, ...)
+and its latest version keep the full text in text_fragment_edits.words.
+The versions in between store only a delta against the previous version
+in the delta column (words is NULL), so a version is rebuilt from the
+nearest snapshot with at most SNAPSHOT_INTERVAL - 1 deltas. A delta that
+would not be shorter than the text is not used; the row stays a full
+snapshot.
+
+A delta is a JSON list of operations on the previous text: a positive
+integer copies that many characters, a negative integer skips that many
+and a string is inserted.
+
+New edits are saved in full. Saving a version turns the one before it
+into a delta (see compact_previous()). Existing history is converted
+with the compaction command, which also re-encodes it after a change of
+the interval. With --check it only verifies the stored history (see
+check()) and exits with status 1 if a fragment fails:
+
+    python edit_history.py [--database PATH] [--interval N] [--vacuum | --check]
+
+EDIT_HISTORY_SNAPSHOT_INTERVAL=0 keeps every version in full.
+"""
+
+import os
+import sys
+import json
+import argparse
+from itertools import groupby
+from difflib import SequenceMatcher
+import db
+
+SNAPSHOT_INTERVAL = int(os.environ.get("EDIT_HISTORY_SNAPSHOT_INTERVAL", "10"))
+COMPACT_BATCH_SIZE = 1000
+
+
+def encode_delta(old, new):
+    operations = []
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            operations.append(old_end - old_start)
+            continue
+        if old_end > old_start:
+            operations.append(old_start - old_end)
+        if new_end > new_start:
+            operations.append(new[new_start:new_end])
+    return json.dumps(operations, ensure_ascii=False, separators=(",", ":"))
+
+
+def apply_delta(old, delta):
+    parts = []
+    position = 0
+    for operation in json.loads(delta):
+        if isinstance(operation, str):
+            parts.append(operation)
+        elif operation > 0:
+            parts.append(old[position:position + operation])
+            position += operation
+        else:
+            position -= operation
+    return "".join(parts)
+
+
+def is_snapshot_version(version, interval=None):
+    interval = SNAPSHOT_INTERVAL if interval is None else interval
+    return interval <= 1 or (version - 1) % interval == 0
+
+
+def encode_history(texts, versions, interval=None):
+    """Return the (words, delta) to store for each version of a fragment.
+
+    texts and versions are in version order; the last one is the current
+    version and is always stored in full.
+    """
+    stored = []
+    for index, (text, version) in enumerate(zip(texts, versions)):
+        if index == 0 or index == len(texts) - 1 or is_snapshot_version(version, interval):
+            stored.append((text, None))
+            continue
+        delta = encode_delta(texts[index - 1] or "", text or "")
+        if text is None or len(delta) >= len(text):
+            stored.append((text, None))
+        else:
+            stored.append((None, delta))
+    return stored
+
+
+def rebuild_texts(rows):
+    """Full texts of rows (words, delta) read from a snapshot on, in version order."""
+    texts = []
+    text = None
+    for row in rows:
+        text = row["words"] if row["words"] is not None else apply_delta(text or "", row["delta"])
+        texts.append(text)
+    return texts
+
+
+def get_history(text_fragment_id):
+    """Every saved version of a fragment with its full text, oldest first."""
+    sql = """SELECT id, version, start_ms, words, delta, created_at, user_id
+             FROM text_fragment_edits WHERE text_fragment_id = ?
+             ORDER BY version"""
+    rows = db.query(sql, [text_fragment_id])
+    texts = rebuild_texts(rows)
+    return [dict(row, words=text) for row, text in zip(rows, texts)]
+
+
+def get_version_text(text_fragment_id, version):
+    """Return the text of one version, read from the nearest snapshot on."""
+    sql = """SELECT version, words, delta FROM text_fragment_edits
+             WHERE text_fragment_id = ? AND version <= ? AND version >= (
+                 SELECT MAX(version) FROM text_fragment_edits
+                 WHERE text_fragment_id = ? AND version <= ? AND words IS NOT NULL)
+             ORDER BY version"""
+    rows = db.query(sql, [text_fragment_id, version, text_fragment_id, version])
+    if not rows or rows[-1]["version"] != version:
+        return None
+    return rebuild_texts(rows)[-1]
+
+
+def compact_previous(text_fragment_id, version):
+    """Store the version saved before version as a delta, if it is not a snapshot."""
+    if SNAPSHOT_INTERVAL <= 1:
+        return
+    sql = """SELECT id, version, words FROM text_fragment_edits
+             WHERE text_fragment_id = ? AND version < ?
+             ORDER BY version DESC LIMIT 2"""
+    rows = db.query(sql, [text_fragment_id, version])
+    if len(rows) < 2 or rows[0]["words"] is None or is_snapshot_version(rows[0]["version"]):
+        return
+    previous_text = get_version_text(text_fragment_id, rows[1]["version"])
+    if previous_text is None:
+        return
+    delta = encode_delta(previous_text, rows[0]["words"])
+    if len(delta) < len(rows[0]["words"]):
+        sql = "UPDATE text_fragment_edits SET words = NULL, delta = ? WHERE id = ?"
+        db.execute(sql, [delta, rows[0]["id"]])
+
+
+def compact_versions(versions):
+    """Batch form of compact_previous() for restores.
+
+    versions are (text_fragment_id, version, words) of versions stored in
+    full that a newer version has just replaced. The texts of the versions
+    before them are rebuilt with one query and the deltas are written with
+    one executemany().
+    """
+    if SNAPSHOT_INTERVAL <= 1:
+        return
+    versions = {text_fragment_id: (version, words) for text_fragment_id, version, words in versions
+                if version > 1 and words is not None and not is_snapshot_version(version)}
+    if not versions:
+        return
+    sql = """WITH wanted AS (
+                 SELECT json_extract(value, '$[0]') AS text_fragment_id,
+                        json_extract(value, '$[1]') AS version
+                 FROM json_each(?))
+             SELECT e.text_fragment_id, e.version, e.words, e.delta
+             FROM wanted w
+             JOIN text_fragment_edits e ON e.text_fragment_id = w.text_fragment_id
+                 AND e.version < w.version AND e.version >= (
+                     SELECT MAX(s.version) FROM text_fragment_edits s
+                     WHERE s.text_fragment_id = w.text_fragment_id
+                     AND s.version < w.version AND s.words IS NOT NULL)
+             ORDER BY e.text_fragment_id, e.version"""
+    wanted = json.dumps([[text_fragment_id, version] for text_fragment_id, (version, _)
+                         in versions.items()])
+    updates = []
+    rows = db.query(sql, [wanted])
+    for text_fragment_id, group in groupby(rows, key=lambda row: row["text_fragment_id"]):
+        group = list(group)
+        version, words = versions[text_fragment_id]
+        if group[-1]["version"] != version - 1:
+            continue
+        delta = encode_delta(rebuild_texts(group)[-1], words)
+        if len(delta) < len(words):
+            updates.append((delta, text_fragment_id, version))
+    if updates:
+        sql = """UPDATE text_fragment_edits SET words = NULL, delta = ?
+                 WHERE text_fragment_id = ? AND version = ?"""
+        db.executemany(sql, updates)
+
+
+def _stored_size():
+    sql = """SELECT COALESCE(SUM(LENGTH(CAST(words AS BLOB))), 0)
+                  + COALESCE(SUM(LENGTH(CAST(delta AS BLOB))), 0) AS size
+             FROM text_fragment_edits"""
+    return db.query(sql)[0]["size"]
+
+
+def compact(interval=SNAPSHOT_INTERVAL, progress=True):
+    """Re-encode the history of every edited fragment with interval.
+
+    Returns (fragments, rows changed, stored bytes before, after).
+    """
+    size_before = _stored_size()
+    fragments = 0
+    changed = 0
+    last_id = -1
+    sql_ids = """SELECT DISTINCT text_fragment_id FROM text_fragment_edits
+                 WHERE text_fragment_id > ? ORDER BY text_fragment_id LIMIT ?"""
+    sql_rows = """SELECT id, version, words, delta FROM text_fragment_edits
+                  WHERE text_fragment_id = ? ORDER BY version"""
+    sql_update = "UPDATE text_fragment_edits SET words = ?, delta = ? WHERE id = ?"
+    while True:
+        ids = [row["text_fragment_id"] for row in db.query(sql_ids, [last_id, COMPACT_BATCH_SIZE])]
+        if not ids:
+            break
+        with db.transaction():
+            for text_fragment_id in ids:
+                rows = db.query(sql_rows, [text_fragment_id])
+                texts = rebuild_texts(rows)
+                stored = encode_history(texts, [row["version"] for row in rows], interval)
+                updates = [(words, delta, row["id"]) for row, (words, delta) in zip(rows, stored)
+                           if (words, delta) != (row["words"], row["delta"])]
+                if updates:
+                    db.executemany(sql_update, updates)
+                    changed += len(updates)
+                fragments += 1
+        last_id = ids[-1]
+        if progress:
+            print(f"{fragments} fragments, {changed} rows changed", end="\r", file=sys.stderr, flush=True)
+    if progress:
+        print(file=sys.stderr)
+    return fragments, changed, size_before, _stored_size()
+
+
+def _check_fragment(rows, interval):
+    # the problem found in the stored versions of one fragment, or None
+    if rows[0]["words"] is None:
+        return f"version {rows[0]['version']} is a delta without a snapshot before it"
+    if rows[-1]["words"] is None:
+        return f"latest version {rows[-1]['version']} is not stored in full"
+    try:
+        texts = rebuild_texts(rows)
+        for previous, row in zip(texts, rows[1:]):
+            # a delta copies and skips exactly the characters of the text before it
+            if row["delta"] is None:
+                continue
+            length = sum(abs(operation) for operation in json.loads(row["delta"])
+                         if not isinstance(operation, str))
+            if length != len(previous):
+                return f"the delta of version {row['version']} does not match the version before it"
+    except (ValueError, TypeError) as error:
+        return f"a delta cannot be applied: {error}"
+    if rows[-1]["current_words"] is not None and texts[-1] != rows[-1]["current_words"]:
+        return "latest version differs from the current text of the fragment"
+    stored = encode_history(texts, [row["version"] for row in rows], interval)
+    if rebuild_texts([{"words": words, "delta": delta} for words, delta in stored]) != texts:
+        return f"encoding with interval {interval} does not rebuild the same texts"
+    return None
+
+
+def check(interval=SNAPSHOT_INTERVAL, progress=True):
+    """Verify the stored history of every edited fragment.
+
+    Every version is rebuilt from its snapshot and deltas; the latest one
+    must equal the current text of the fragment, and encoding the texts
+    with interval and rebuilding them must give the same texts back.
+
+    Returns (fragments checked, list of (text_fragment_id, problem)).
+    """
+    fragments = 0
+    problems = []
+    last_id = -1
+    sql_ids = """SELECT DISTINCT text_fragment_id FROM text_fragment_edits
+                 WHERE text_fragment_id > ? ORDER BY text_fragment_id LIMIT ?"""
+    sql_rows = """SELECT e.text_fragment_id, e.version, e.words, e.delta, f.current_words
+                  FROM text_fragment_edits e
+                  LEFT JOIN text_fragments f ON f.id = e.text_fragment_id
+                  WHERE e.text_fragment_id BETWEEN ? AND ?
+                  ORDER BY e.text_fragment_id, e.version"""
+    while True:
+        ids = [row["text_fragment_id"] for row in db.query(sql_ids, [last_id, COMPACT_BATCH_SIZE])]
+        if not ids:
+            break
+        rows = db.query(sql_rows, [ids[0], ids[-1]])
+        for text_fragment_id, group in groupby(rows, key=lambda row: row["text_fragment_id"]):
+            problem = _check_fragment(list(group), interval)
+            if problem:
+                problems.append((text_fragment_id, problem))
+            fragments += 1
+        last_id = ids[-1]
+        if progress:
+            print(f"{fragments} fragments checked, {len(problems)} problems", end="\r",
+                  file=sys.stderr, flush=True)
+    if progress:
+        print(file=sys.stderr)
+    return fragments, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact the text fragment edit history.")
+    parser.add_argument("--database", default=db.DATABASE,
+                        help="SQLite database file (default: %(default)s)")
+    parser.add_argument("--interval", type=int, default=SNAPSHOT_INTERVAL,
+                        help="full snapshot every N versions, 0 or 1 for full texts only "
+                             "(default: %(default)s)")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="VACUUM the database afterwards to return the space to the file system")
+    parser.add_argument("--check", action="store_true",
+                        help="only rebuild every version and report the fragments that fail")
+    args = parser.parse_args(argv)
+    db.DATABASE = args.database
+    try:
+        if args.check:
+            fragments, problems = check(args.interval)
+            for text_fragment_id, problem in problems:
+                print(f"fragment {text_fragment_id}: {problem}")
+            print(f"{fragments} fragments checked, {len(problems)} with problems")
+            return 1 if problems else 0
+        file_size = os.path.getsize(args.database)
+        fragments, changed, before, after = compact(args.interval)
+        print(f"{fragments} fragments, {changed} history rows re-encoded")
+        print(f"history text {before} -> {after} bytes ({before - after} bytes reclaimed)")
+        if args.vacuum:
+            db.close_connection()
+            db.execute("VACUUM")
+            new_size = os.path.getsize(args.database)
+            print(f"database file {file_size} -> {new_size} bytes")
+        return 0
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,8 @@
+import datetime
+from markupsafe import Markup, escape
+
 ALLOWED_SOUND_FILE_EXTENSIONS = {'mp3', 'wav', 'ogg'}
+ALLOWED_TRANSCRIPT_FILE_EXTENSIONS = {'vtt', 'srt', 'json', 'txt'}
 
 
 def convert_seconds_to_hms(seconds):
@@ -31,12 +35,52 @@ def convert_hms_to_seconds(hms):
         hours = 0
         minutes = 0
         secs = int(parts[0])
+    else:
+        raise ValueError(f"invalid time {hms!r}")
     # Calculate total seconds
     total_seconds = hours * 3600 + minutes * 60 + secs
 
     return total_seconds
 
 
+def parse_playback_time(value):
+    # "1:33:00", "93:00" or seconds ("5580.5") to milliseconds; None if invalid
+    if not value:
+        return None
+    try:
+        if ":" in value:
+            milliseconds = convert_hms_to_seconds(value.strip()) * 1000
+        else:
+            milliseconds = int(float(value) * 1000)
+    except (ValueError, OverflowError):
+        return None
+    return milliseconds if milliseconds >= 0 else None
+
+
+def parse_timestamp(value):
+    # datetime-local input ("2025-11-01T12:30") to the "YYYY-MM-DD HH:MM:SS"
+    # form of CURRENT_TIMESTAMP; None if it is empty or not a date and time
+    if not value:
+        return None
+    try:
+        moment = datetime.datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_SOUND_FILE_EXTENSIONS
+
+
+def allowed_transcript_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_TRANSCRIPT_FILE_EXTENSIONS
+
+
+def highlight_snippet(snippet, start_marker="\x02", end_marker="\x03"):
+    # escape the fragment text and turn the match markers into <mark> tags
+    html = str(escape(snippet))
+    html = html.replace(start_marker, "<mark>").replace(end_marker, "</mark>")
+    return Markup(html)
@@ -0,0 +1,237 @@
+"""Bulk import of transcript files as transcriptions.
+
+Files are read, hashed and split into text fragments in a pool of worker
+processes. This process is the only writer: it inserts the parsed
+transcriptions and their fragments BATCH_SIZE files per transaction.
+
+A file whose content hash matches the raw content of an existing
+transcription is skipped, so an interrupted import can simply be run
+again. Files that cannot be read or split are written to the error log.
+
+The input is one or more directories, searched recursively for files with
+a known extension, or a CSV manifest with a "path" column (relative to the
+manifest) and optional title, source, source_path, genre, license,
+record_date, duration_sec and extra_meta_data columns.
+
+Usage:
+    python import_transcripts.py --user USERNAME [options] DIRECTORY...
+    python import_transcripts.py --user USERNAME --manifest FILE [options]
+"""
+
+import os
+import csv
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import multiprocessing
+from collections import deque
+import db
+import users
+import transcriptions
+import text_splitter_help_functions
+
+EXTENSION_SOURCES = {
+    ".vtt": "webvtt",
+    ".srt": "webvtt",
+    ".json": "youtube",
+    ".txt": "word",
+}
+METADATA_COLUMNS = ("title", "source", "source_path", "genre", "license",
+                    "record_date", "duration_sec", "extra_meta_data")
+BATCH_SIZE = 50
+JOBS_PER_WORKER = 4
+
+_known_hashes = set()
+
+
+def find_files(directory):
+    jobs = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file_name in sorted(files):
+            if os.path.splitext(file_name)[1].lower() in EXTENSION_SOURCES:
+                jobs.append({"path": os.path.join(root, file_name)})
+    return jobs
+
+
+def read_manifest(manifest_path):
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="", encoding="utf-8-sig") as f:
+        jobs = []
+        for row in csv.DictReader(f):
+            job = {column: row[column] for column in METADATA_COLUMNS if row.get(column)}
+            job["path"] = os.path.join(base, row["path"])
+            jobs.append(job)
+    return jobs
+
+
+def _init_worker(known_hashes):
+    global _known_hashes
+    _known_hashes = known_hashes
+
+
+def parse_file(job):
+    """Read, hash and split one file. Runs in a worker process.
+
+    Returns (status, job, result) where status is "ok" with
+    (sha256, raw content, fragments), "skipped" with the sha256, or
+    "error" with a message.
+    """
+    path = job["path"]
+    source = job.get("source") or EXTENSION_SOURCES.get(os.path.splitext(path)[1].lower())
+    try:
+        with open(path, "rb") as f:
+            raw_content = f.read().decode("utf-8-sig", errors="replace")
+        sha256 = hashlib.sha256(raw_content.encode("utf-8")).hexdigest()
+        if sha256 in _known_hashes:
+            return "skipped", job, sha256
+        if source not in text_splitter_help_functions.SPLITTERS:
+            return "error", job, f"unsupported source format {source!r}"
+        fragments = list(text_splitter_help_functions.split_transcription(source, raw_content))
+    except OSError as error:
+        return "error", job, str(error)
+    except text_splitter_help_functions.SplitError as error:
+        return "error", job, f"cannot split as {source}: {error}"
+    if not fragments:
+        return "error", job, f"no timestamped text found as {source}"
+    job = dict(job, source=source)
+    return "ok", job, (sha256, raw_content, fragments)
+
+
+def _insert(job, user_id, raw_content, fragments):
+    title = job.get("title") or os.path.splitext(os.path.basename(job["path"]))[0]
+    transcription_id = transcriptions.add_transcription(
+        title,
+        job.get("source_path"),
+        job["source"],
+        job.get("genre"),
+        raw_content,
+        user_id,
+        job.get("license"),
+        job.get("record_date"),
+        job.get("duration_sec"),
+        job.get("extra_meta_data"), False)
+    transcriptions.add_text_fragments(transcription_id, fragments)
+
+
+class Importer:
+    """Writes parsed files in batches and keeps the counts and error log."""
+
+    def __init__(self, user_id, error_log, batch_size=BATCH_SIZE, total=0):
+        self.user_id = user_id
+        self.error_log = error_log
+        self.batch_size = batch_size
+        self.total = total
+        self.known_hashes = transcriptions.get_raw_content_hashes()
+        self.pending = []
+        self.imported = 0
+        self.skipped = 0
+        self.failed = 0
+        self.handled = 0
+        self.start_time = time.time()
+
+    def handle(self, status, job, result):
+        if status == "error":
+            self.fail(job, result)
+        elif status == "skipped" or result[0] in self.known_hashes:
+            self.skipped += 1
+        else:
+            self.known_hashes.add(result[0])
+            self.pending.append((job, result))
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        self.handled += 1
+        if self.handled % self.batch_size == 0:
+            self.report()
+
+    def fail(self, job, message):
+        self.failed += 1
+        self.error_log.write(f"{job['path']}\t{message}\n")
+        self.error_log.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        try:
+            with db.transaction():
+                for job, (_, raw_content, fragments) in self.pending:
+                    _insert(job, self.user_id, raw_content, fragments)
+            self.imported += len(self.pending)
+        except sqlite3.DatabaseError:
+            # retry one by one, so that one bad file does not lose the batch
+            for job, (sha256, raw_content, fragments) in self.pending:
+                try:
+                    with db.transaction():
+                        _insert(job, self.user_id, raw_content, fragments)
+                    self.imported += 1
+                except sqlite3.DatabaseError as error:
+                    self.known_hashes.discard(sha256)
+                    self.fail(job, f"database error: {error}")
+        self.pending = []
+
+    def report(self):
+        done = self.handled
+        elapsed = time.time() - self.start_time
+        rate = done / elapsed if elapsed else 0
+        print(f"{done}/{self.total} files: {self.imported} imported, {self.skipped} skipped, "
+              f"{self.failed} failed ({rate:.1f} files/s)", flush=True)
+
+
+def import_files(jobs, user_id, error_log, workers=None, batch_size=BATCH_SIZE):
+    """Import the files of jobs, returning the Importer with the counts."""
+    importer = Importer(user_id, error_log, batch_size, total=len(jobs))
+    workers = workers or os.cpu_count() or 1
+    # a bounded number of parsed files waits for the writer at a time
+    in_flight = deque()
+    with multiprocessing.Pool(workers, _init_worker, (importer.known_hashes,)) as pool:
+        for job in jobs:
+            in_flight.append(pool.apply_async(parse_file, (job,)))
+            if len(in_flight) >= workers * JOBS_PER_WORKER:
+                importer.handle(*in_flight.popleft().get())
+        while in_flight:
+            importer.handle(*in_flight.popleft().get())
+    importer.flush()
+    importer.report()
+    return importer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a directory or manifest of transcript files.")
+    parser.add_argument("directories", nargs="*", metavar="DIRECTORY",
+                        help="directory searched recursively for "
+                             + ", ".join(sorted(EXTENSION_SOURCES)) + " files")
+    parser.add_argument("--manifest", help="CSV file with a path column and optional metadata columns")
+    parser.add_argument("--user", required=True, help="username of the owner of the transcriptions")
+    parser.add_argument("--database", default=db.DATABASE,
+                        help="SQLite database file (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of parser processes (default: number of CPUs)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="files per transaction (default: %(default)s)")
+    parser.add_argument("--error-log", default="import_errors.log",
+                        help="file the failed files are appended to (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if not args.directories and not args.manifest:
+        parser.error("give a DIRECTORY or --manifest")
+    db.DATABASE = args.database
+    try:
+        user = users.get_user_by_username(args.user)
+        if not user:
+            print("unknown user", args.user, file=sys.stderr)
+            return 2
+        jobs = read_manifest(args.manifest) if args.manifest else []
+        for directory in args.directories:
+            jobs.extend(find_files(directory))
+        with open(args.error_log, "a", encoding="utf-8") as error_log:
+            importer = import_files(jobs, user["id"], error_log, args.workers, args.batch_size)
+        if importer.failed:
+            print("failed files are listed in", args.error_log)
+        return 1 if importer.failed else 0
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""Background jobs for long running transcription operations.
+
+Jobs are rows in the jobs table. A worker claims the oldest queued job in
+an immediate transaction, so any number of worker threads and processes
+can share the queue. A transcription has at most one queued or running job
+at a time (a partial unique index), which serializes the operations on it.
+
+Handlers write in batches and record their progress in the same
+transaction as the batch. A retried job therefore continues where the
+failed attempt stopped. Unexpected errors are retried up to MAX_ATTEMPTS
+times; JobError marks the job failed at once. A running job whose
+heartbeat is older than STALE_AFTER_SECONDS is assumed to belong to a
+crashed worker and is queued again. Every batch checks in its transaction
+that the job is still running under the same worker, so a worker that was
+only slow stops (JobLost) instead of racing the one that took over.
+
+Workers run as threads inside the web application, started by the first
+request each server process handles (JOB_WORKER_THREADS in config.py), or
+as a separate process:
+
+    python jobs.py [--database PATH] [--threads N] [--once]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import traceback
+from itertools import islice
+import sqlite3
+import db
+import transcriptions
+import text_splitter_help_functions
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 10
+STALE_AFTER_SECONDS = 300
+POLL_INTERVAL_SECONDS = 1
+JOB_BATCH_SIZE = 5000
+
+ACTIVE_STATES = ("queued", "running")
+
+_worker_threads_pid = None
+_worker_threads_lock = threading.Lock()
+
+
+class JobError(Exception):
+    """A failure that retrying cannot fix. The message is shown to the user."""
+
+
+class JobLost(Exception):
+    """The job was queued again and may run elsewhere; this attempt stops."""
+
+
+def enqueue(kind, transcription_id, user_id=None):
+    """Queue a job for a transcription.
+
+    Queuing the same kind again while it is still active returns the
+    active job, so a repeated request does not run the work twice.
+
+    Returns:
+        The job id, or None if another kind of job is active for the
+        transcription.
+    """
+    sql = """INSERT INTO jobs (kind, transcription_id, user_id, created, run_after)
+             VALUES (?, ?, ?, ?, ?)"""
+    now = time.time()
+    try:
+        db.execute(sql, [kind, transcription_id, user_id, now, now])
+    except sqlite3.IntegrityError:
+        job = get_active_job(transcription_id)
+        if job and job["kind"] == kind:
+            return job["id"]
+        return None
+    return db.last_insert_id()
+
+
+def get_job(job_id):
+    result = db.query("SELECT * FROM jobs WHERE id = ?", [job_id])
+    return result[0] if result else None
+
+
+def get_active_job(transcription_id):
+    sql = """SELECT * FROM jobs WHERE transcription_id = ?
+             AND state IN ('queued', 'running')"""
+    result = db.query(sql, [transcription_id])
+    return result[0] if result else None
+
+
+def get_latest_job(transcription_id):
+    sql = "SELECT * FROM jobs WHERE transcription_id = ? ORDER BY id DESC LIMIT 1"
+    result = db.query(sql, [transcription_id])
+    return result[0] if result else None
+
+
+def acknowledge(job_id):
+    db.execute("UPDATE jobs SET acknowledged = 1 WHERE id = ?", [job_id])
+
+
+def progress(job):
+    """Return (percent done, estimated seconds left) of a job; None if unknown."""
+    if not job["work_total"] or not job["started_at"]:
+        return None, None
+    fraction = min(job["work_done"] / job["work_total"], 1)
+    eta = None
+    if job["state"] == "running" and fraction > 0:
+        elapsed = time.time() - job["started_at"]
+        eta = round(elapsed / fraction * (1 - fraction))
+    return int(fraction * 100), eta
+
+
+def update_progress(job, rows_processed, work_done, work_total):
+    """Record the progress of a running job and refresh its heartbeat.
+
+    Raises:
+        JobLost: If the job is no longer running under job["worker"]. Inside
+            a transaction this rolls back the batch it belongs to.
+    """
+    sql = """UPDATE jobs SET rows_processed = ?, work_done = ?, work_total = ?,
+             heartbeat = ? WHERE id = ? AND worker = ? AND state = 'running'"""
+    if not db.execute(sql, [rows_processed, work_done, work_total, time.time(),
+                            job["id"], job["worker"]]):
+        raise JobLost(f"job {job['id']} is no longer run by {job['worker']}")
+
+
+def heartbeat(job):
+    """Refresh the heartbeat of a running job, see update_progress()."""
+    sql = """UPDATE jobs SET heartbeat = ?
+             WHERE id = ? AND worker = ? AND state = 'running'"""
+    if not db.execute(sql, [time.time(), job["id"], job["worker"]]):
+        raise JobLost(f"job {job['id']} is no longer run by {job['worker']}")
+
+
+def claim(worker):
+    """Take the oldest runnable job and mark it running, or return None."""
+    now = time.time()
+    ready = """SELECT 1 FROM jobs WHERE (state = 'queued' AND run_after <= ?)
+               OR (state = 'running' AND heartbeat < ?) LIMIT 1"""
+    if not db.query(ready, [now, now - STALE_AFTER_SECONDS]):
+        return None
+    with db.transaction():
+        sql = """UPDATE jobs SET state = 'queued', worker = NULL
+                 WHERE state = 'running' AND heartbeat < ?"""
+        db.execute(sql, [now - STALE_AFTER_SECONDS])
+        sql = """SELECT id FROM jobs WHERE state = 'queued' AND run_after <= ?
+                 ORDER BY id LIMIT 1"""
+        result = db.query(sql, [now])
+        if not result:
+            return None
+        job_id = result[0]["id"]
+        sql = """UPDATE jobs SET state = 'running', attempts = attempts + 1, worker = ?,
+                 started_at = ?, heartbeat = ?, message = NULL WHERE id = ?"""
+        db.execute(sql, [worker, now, now, job_id])
+    return get_job(job_id)
+
+
+def finish(job):
+    sql = """UPDATE jobs SET state = 'done', finished_at = ?, heartbeat = ?
+             WHERE id = ? AND worker = ? AND state = 'running'"""
+    now = time.time()
+    db.execute(sql, [now, now, job["id"], job["worker"]])
+
+
+def fail(job, message, retry):
+    now = time.time()
+    if retry and job["attempts"] < MAX_ATTEMPTS:
+        sql = """UPDATE jobs SET state = 'queued', worker = NULL, message = ?,
+                 run_after = ? WHERE id = ? AND worker = ? AND state = 'running'"""
+        db.execute(sql, [message, now + RETRY_DELAY_SECONDS * job["attempts"],
+                         job["id"], job["worker"]])
+    else:
+        sql = """UPDATE jobs SET state = 'failed', message = ?, finished_at = ?
+                 WHERE id = ? AND worker = ? AND state = 'running'"""
+        db.execute(sql, [message, now, job["id"], job["worker"]])
+
+
+def run_split(job):
+    """Split the raw content into fragments, JOB_BATCH_SIZE rows per transaction.
+
+    Progress is measured in bytes of raw content read. A retry skips the
+    fragments the earlier attempts committed.
+    """
+    transcription_id = job["transcription_id"]
+    transcription = transcriptions.get_transcription(transcription_id)
+    if not transcription:
+        return
+    source = transcription["source"]
+    if source not in text_splitter_help_functions.SPLITTERS:
+        raise JobError(f"Lähdeformaattia {source} ei tueta")
+    rows = job["rows_processed"]
+    if rows == 0 and transcriptions.get_all_text_fragments_count(transcription_id):
+        # already split, by an earlier request
+        return
+
+    total = transcription["raw_content_size"] or 0
+    read = 0
+
+    def raw_chunks():
+        nonlocal read
+        for chunk in transcriptions.iter_raw_content(transcription_id):
+            read += len(chunk.encode("utf-8"))
+            yield chunk
+
+    fragments = text_splitter_help_functions.split_transcription(source, raw_chunks())
+    fragments = islice(fragments, rows, None)
+    try:
+        while True:
+            batch = list(islice(fragments, JOB_BATCH_SIZE))
+            if not batch:
+                break
+            with db.transaction():
+                transcriptions.add_text_fragments(transcription_id, batch)
+                rows += len(batch)
+                update_progress(job, rows, read, total)
+    except text_splitter_help_functions.SplitError as error:
+        with db.transaction():
+            heartbeat(job)
+            transcriptions.remove_transcription_split_text(transcription_id)
+        raise JobError('Tekstinjako epäonnistui. Tarkista että aikaleimattu lähdeteksti on eheä '
+                       'ja valitun ' + source + ' lähteen formaation mukainen') from error
+    update_progress(job, rows, total, total)
+
+
+def _remove_fragments(job):
+    transcription_id = job["transcription_id"]
+    rows = job["rows_processed"]
+    total = rows + transcriptions.get_all_text_fragments_count(transcription_id)
+    while True:
+        with db.transaction():
+            removed = transcriptions.remove_text_fragments_batch(transcription_id, JOB_BATCH_SIZE)
+            rows += removed
+            update_progress(job, rows, rows, total)
+        if not removed:
+            return
+
+
+def run_remove_split_text(job):
+    _remove_fragments(job)
+
+
+def run_remove_transcription(job):
+    if not transcriptions.get_transcription(job["transcription_id"]):
+        return
+    _remove_fragments(job)
+    with db.transaction():
+        heartbeat(job)
+        transcriptions.remove_transcription(job["transcription_id"])
+
+
+JOB_HANDLERS = {
+    "split": run_split,
+    "remove_split_text": run_remove_split_text,
+    "remove_transcription": run_remove_transcription,
+}
+
+
+def run(job):
+    try:
+        JOB_HANDLERS[job["kind"]](job)
+    except JobLost:
+        # the worker that took the job over finishes it
+        return
+    except JobError as error:
+        fail(job, str(error), retry=False)
+    except Exception as error:
+        traceback.print_exc()
+        fail(job, f"{type(error).__name__}: {error}", retry=True)
+    else:
+        finish(job)
+
+
+def work(worker, stop_event=None, once=False):
+    """Run jobs until stop_event is set, or until the queue is empty if once."""
+    while not (stop_event and stop_event.is_set()):
+        try:
+            job = claim(worker)
+            if job:
+                run(job)
+                continue
+        except sqlite3.OperationalError:
+            # the database is busy or not migrated yet; try again later
+            traceback.print_exc()
+        finally:
+            db.close_connection()
+        if once:
+            return
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def start_worker_threads(count):
+    """Start count daemon worker threads in this process."""
+    threads = []
+    for number in range(count):
+        name = f"{socket.gethostname()}:{os.getpid()}:{number}"
+        thread = threading.Thread(target=work, args=(name,), name="job-worker", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def ensure_worker_threads(count):
+    """Start count worker threads unless this process has started them.
+
+    The process id is checked, so a process forked from one with workers
+    (a gunicorn worker) starts its own.
+    """
+    global _worker_threads_pid
+    if count <= 0 or _worker_threads_pid == os.getpid():
+        return
+    with _worker_threads_lock:
+        if _worker_threads_pid != os.getpid():
+            _worker_threads_pid = os.getpid()
+            start_worker_threads(count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run background jobs.")
+    parser.add_argument("--database", default=db.DATABASE,
+                        help="SQLite database file (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="number of worker threads (default: %(default)s)")
+    parser.add_argument("--once", action="store_true",
+                        help="exit when no job is waiting")
+    args = parser.parse_args(argv)
+    db.DATABASE = args.database
+    if args.once:
+        work(f"{socket.gethostname()}:{os.getpid()}", once=True)
+        return 0
+    for thread in start_worker_threads(args.threads):
+        thread.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+"""HTTP load test of the main routes.
+
+Each virtual user logs in as one of the seed.py users (password
+seed.SEED_PASSWORD) with its own session cookie and then sends requests
+back to back, choosing the route by the weights of --mix:
+
+    index          GET /<page>
+    transcription  GET /transcription/<id>/<page>
+    search         GET /search?query=<words>
+    edit           POST /edit_text_fragment/<id> of a collaborative transcription
+    stats          GET /stats
+
+The ids and search words are read from the database before the test.
+With --start the app is started with gunicorn (or the Flask development
+server, --server flask) against that database and stopped afterwards;
+SQLite lock errors are then counted from the server output. Without
+--start an already running server at --url is tested and lock errors are
+not measured.
+
+With several --concurrency values the stages run one after another. The
+p99 latency of every route is checked against --p99-limit-ms; the routes
+over it and the first stage where that happened are reported, and the
+command exits with status 1.
+
+Usage:
+    python loadtest.py --database database_test.db --start [--concurrency 4,8,16,32] [--duration 30]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+import db
+import seed
+
+DEFAULT_MIX = "index=20,transcription=40,search=15,edit=10,stats=15"
+LOCK_ERROR = re.compile(r"database (table )?is locked")
+CSRF_TOKEN = re.compile(r'name="csrf_token" value="([0-9a-f]+)"')
+SAMPLE_SIZE = 1000
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def load_targets(users):
+    """Read the ids, pages and words the requests are made with."""
+    sql = """SELECT id FROM transcriptions ORDER BY random() LIMIT ?"""
+    transcription_ids = [row["id"] for row in db.query(sql, [SAMPLE_SIZE])]
+    sql = """SELECT tf.id FROM text_fragments tf
+             JOIN transcriptions t ON t.id = tf.transcription_id
+             WHERE t.allow_collaboration AND tf.trashed IS NULL
+             ORDER BY random() LIMIT ?"""
+    fragment_ids = [row["id"] for row in db.query(sql, [SAMPLE_SIZE])]
+    sql = "SELECT words FROM text_fragments ORDER BY random() LIMIT ?"
+    words = [word for row in db.query(sql, [SAMPLE_SIZE])
+             for word in row["words"].split() if len(word) > 3]
+    sql = "SELECT count FROM table_counts WHERE name = 'transcriptions'"
+    result = db.query(sql)
+    index_pages = max(1, (result[0]["count"] if result else 0) // 20)
+    sql = "SELECT username FROM users ORDER BY id LIMIT ?"
+    usernames = [row["username"] for row in db.query(sql, [users])]
+    if not transcription_ids or not usernames:
+        raise SystemExit("the database has no transcriptions or users, see seed.py")
+    return {
+        "transcription_ids": transcription_ids,
+        "fragment_ids": fragment_ids,
+        "words": words or ["ja"],
+        "index_pages": index_pages,
+        "usernames": usernames,
+    }
+
+
+class Results:
+    """Latencies and errors per route, shared by the virtual users."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+
+    def add(self, route, seconds, error=None):
+        with self.lock:
+            self.latencies[route].append(seconds * 1000)
+            if error:
+                self.errors[route] += 1
+                self.error_samples.setdefault(route, error)
+
+    def summary(self, elapsed):
+        routes = {}
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            routes[route] = {
+                "requests": len(values),
+                "errors": self.errors[route],
+                "per_second": round(len(values) / elapsed, 1),
+                "p50_ms": round(percentile(values, 0.5), 1),
+                "p95_ms": round(percentile(values, 0.95), 1),
+                "p99_ms": round(percentile(values, 0.99), 1),
+                "max_ms": round(values[-1], 1),
+            }
+        values = sorted(value for route_values in self.latencies.values() for value in route_values)
+        total = {
+            "requests": len(values),
+            "errors": sum(self.errors.values()),
+            "per_second": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 0.5), 1) if values else None,
+            "p95_ms": round(percentile(values, 0.95), 1) if values else None,
+            "p99_ms": round(percentile(values, 0.99), 1) if values else None,
+        }
+        return {"routes": routes, "total": total, "error_samples": dict(self.error_samples)}
+
+
+class VirtualUser:
+    """One logged in browser session."""
+
+    def __init__(self, base_url, username, targets, rng):
+        self.base_url = base_url
+        self.targets = targets
+        self.rng = rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.csrf_token = None
+        self.login(username)
+
+    def open(self, path, data=None):
+        if data is not None:
+            data = urllib.parse.urlencode(data).encode("utf-8")
+        with self.opener.open(self.base_url + path, data, timeout=60) as response:
+            return response.read()
+
+    def login(self, username):
+        self.open("/login", {"username": username, "password": seed.SEED_PASSWORD})
+        page = self.open("/create_transcription").decode("utf-8")
+        match = CSRF_TOKEN.search(page)
+        if not match:
+            raise RuntimeError(f"login failed for {username}")
+        self.csrf_token = match.group(1)
+
+    def request(self, route):
+        targets, rng = self.targets, self.rng
+        if route == "index":
+            return self.open(f"/{rng.randint(1, targets['index_pages'])}")
+        if route == "transcription":
+            return self.open(f"/transcription/{rng.choice(targets['transcription_ids'])}/"
+                             f"{rng.randint(1, 5)}")
+        if route == "search":
+            query = " ".join(rng.sample(targets["words"], min(2, len(targets["words"]))))
+            return self.open("/search?" + urllib.parse.urlencode({"query": query}))
+        if route == "edit":
+            if not targets["fragment_ids"]:
+                return self.open("/stats")
+            fragment_id = rng.choice(targets["fragment_ids"])
+            words = " ".join(rng.sample(targets["words"], min(6, len(targets["words"]))))
+            return self.open(f"/edit_text_fragment/{fragment_id}",
+                             {"words": words, "return_page": "", "csrf_token": self.csrf_token})
+        if route == "stats":
+            return self.open("/stats")
+        raise ValueError(route)
+
+
+def run_stage(base_url, targets, mix, concurrency, duration, seed_value):
+    results = Results()
+    routes, weights = zip(*mix.items())
+    deadline = time.monotonic() + duration
+    failures = []
+
+    def run_user(number):
+        rng = random.Random(seed_value * 1000 + number)
+        username = targets["usernames"][number % len(targets["usernames"])]
+        try:
+            user = VirtualUser(base_url, username, targets, rng)
+        except (OSError, RuntimeError) as error:
+            failures.append(f"{username}: {error}")
+            return
+        while time.monotonic() < deadline:
+            route = rng.choices(routes, weights)[0]
+            started = time.perf_counter()
+            error = None
+            try:
+                user.request(route)
+            except urllib.error.HTTPError as http_error:
+                error = f"HTTP {http_error.code}"
+            except OSError as os_error:
+                error = str(os_error)
+            results.add(route, time.perf_counter() - started, error)
+
+    threads = [threading.Thread(target=run_user, args=(number,)) for number in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = results.summary(time.monotonic() - started)
+    summary["concurrency"] = concurrency
+    summary["login_failures"] = failures
+    return summary
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(server, database, workers, threads, log_file):
+    port = _free_port()
+    env = dict(os.environ, DATABASE=os.path.abspath(database))
+    env.setdefault("SECRET_KEY", os.urandom(16).hex())
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "--workers", str(workers),
+                   "--threads", str(threads), "--bind", f"127.0.0.1:{port}", "app:app"]
+    else:
+        command = [sys.executable, "-m", "flask", "--app", "app", "run",
+                   "--port", str(port), "--with-threads"]
+    process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT, env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        if process.poll() is not None:
+            raise SystemExit(f"the server exited, see {log_file.name}")
+        try:
+            urllib.request.urlopen(base_url + "/login", timeout=1).close()
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("the server did not start")
+
+
+def print_stage(summary, output=sys.stderr):
+    print(f"\nconcurrency {summary['concurrency']}", file=output)
+    print(f"{'route':<15}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}", file=output)
+    for route, row in list(summary["routes"].items()) + [("total", summary["total"])]:
+        # a stage without any completed request has no percentiles
+        p50, p95, p99 = ("-" if row[key] is None else row[key]
+                         for key in ("p50_ms", "p95_ms", "p99_ms"))
+        print(f"{route:<15}{row['requests']:>9}{row['errors']:>8}{row['per_second']:>9}"
+              f"{p50:>9}{p95:>9}{p99:>9}{row.get('max_ms', ''):>9}",
+              file=output)
+    for route, error in summary["error_samples"].items():
+        print(f"first error of {route}: {error}", file=output)
+    for failure in summary["login_failures"]:
+        print("login failed:", failure, file=output)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        route, weight = part.split("=")
+        mix[route.strip()] = float(weight)
+    unknown = set(mix) - {"index", "transcription", "search", "edit", "stats"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown routes: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the main routes over HTTP.")
+    parser.add_argument("--database", default=db.DATABASE,
+                        help="database the ids are read from (default: %(default)s)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000",
+                        help="server to test when not started with --start (default: %(default)s)")
+    parser.add_argument("--start", action="store_true", help="start the app for the test")
+    parser.add_argument("--server", choices=("gunicorn", "flask"), default="gunicorn",
+                        help="server started with --start (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="gunicorn worker processes (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=4,
+                        help="gunicorn threads per worker (default: %(default)s)")
+    parser.add_argument("--concurrency", default="8",
+                        help="comma separated numbers of virtual users, one stage each (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=30,
+                        help="seconds per stage (default: %(default)s)")
+    parser.add_argument("--users", type=int, default=100,
+                        help="number of seed users logged in (default: %(default)s)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help="route weights (default: %(default)s)")
+    parser.add_argument("--p99-limit-ms", type=float, default=1000,
+                        help="p99 latency limit of a stage (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: %(default)s)")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    db.DATABASE = args.database
+    try:
+        targets = load_targets(args.users)
+    finally:
+        db.close_connection()
+
+    process = None
+    log_file = None
+    base_url = args.url.rstrip("/")
+    if args.start:
+        log_file = tempfile.NamedTemporaryFile("w+", prefix="loadtest_server_", suffix=".log",
+                                               delete=False)
+        process, base_url = start_server(args.server, args.database, args.workers,
+                                         args.threads, log_file)
+    stages = []
+    try:
+        for concurrency in [int(value) for value in args.concurrency.split(",")]:
+            summary = run_stage(base_url, targets, args.mix, concurrency, args.duration, args.seed)
+            stages.append(summary)
+            print_stage(summary)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    report = {"url": base_url, "mix": args.mix, "duration": args.duration, "stages": stages}
+    if log_file:
+        log_file.seek(0)
+        lock_errors = len(LOCK_ERROR.findall(log_file.read()))
+        log_file.close()
+        report["sqlite_lock_errors"] = lock_errors
+        report["server_log"] = log_file.name
+        print(f"\nSQLite lock errors in the server log: {lock_errors} ({log_file.name})",
+              file=sys.stderr)
+    else:
+        report["sqlite_lock_errors"] = None
+        print("\nSQLite lock errors were not measured (the server was not started with --start)",
+              file=sys.stderr)
+    over_limit = [{"concurrency": stage["concurrency"], "route": route, "p99_ms": row["p99_ms"]}
+                  for stage in stages for route, row in stage["routes"].items()
+                  if row["p99_ms"] is not None and row["p99_ms"] > args.p99_limit_ms]
+    report["routes_over_p99_limit"] = over_limit
+    report["first_concurrency_over_p99_limit"] = (over_limit[0]["concurrency"]
+                                                  if over_limit else None)
+    for entry in over_limit:
+        print(f"p99 of {entry['route']} {entry['p99_ms']} ms is over {args.p99_limit_ms:g} ms "
+              f"with {entry['concurrency']} virtual users", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if over_limit else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Per-endpoint request metrics in the Prometheus text format.
+
+Every request adds to counters and histogram buckets held in the process.
+A background thread of the process adds them to a small SQLite database
+(METRICS_DATABASE) every FLUSH_INTERVAL_SECONDS, and once more when the
+process exits, so /metrics served by any gunicorn worker reports the sum
+over all worker processes. Requests never wait for the database. The stored values only grow; delete
+the file to start from zero.
+
+Histogram buckets are stored cumulatively, as they are exposed. The
+latency quantiles p50, p95 and p99 are estimated from the buckets the
+same way as Prometheus histogram_quantile().
+"""
+
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from collections import defaultdict
+
+METRICS_DATABASE = os.environ.get("METRICS_DATABASE", "metrics.db")
+FLUSH_INTERVAL_SECONDS = 5
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+FAMILIES = {
+    "http_requests_total": (
+        "counter", "Requests by endpoint, method and status code."),
+    "http_request_duration_seconds": (
+        "histogram", "Time from the start of the request to the response."),
+    "http_response_size_bytes": (
+        "histogram", "Response body size, when known before streaming."),
+    "http_request_sql_statements": (
+        "histogram", "SQL statements executed per request."),
+    "http_request_sql_duration_seconds": (
+        "histogram", "Time spent in SQL statements per request."),
+}
+QUANTILE_FAMILY = "http_request_duration_quantile_seconds"
+
+# (name, labels, le) -> amount not yet added to METRICS_DATABASE
+_pending = defaultdict(float)
+_lock = threading.Lock()
+_connection = None
+_connection_pid = None
+_flush_thread_pid = None
+_flush_thread_lock = threading.Lock()
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in sorted(labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_le(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _observe(name, labels, value, buckets):
+    # caller holds _lock
+    for bound in buckets + (float("inf"),):
+        if value <= bound:
+            _pending[(name + "_bucket", labels, _format_le(bound))] += 1
+    _pending[(name + "_sum", labels, "")] += value
+    _pending[(name + "_count", labels, "")] += 1
+
+
+def record_request(endpoint, method, status, seconds, size, sql_statements, sql_seconds):
+    """Add one finished request. size is None when the length is unknown."""
+    endpoint_labels = _labels(endpoint=endpoint)
+    with _lock:
+        _pending[("http_requests_total", _labels(endpoint=endpoint, method=method, status=status), "")] += 1
+        _observe("http_request_duration_seconds", endpoint_labels, seconds, LATENCY_BUCKETS)
+        if size is not None:
+            _observe("http_response_size_bytes", endpoint_labels, size, SIZE_BUCKETS)
+        _observe("http_request_sql_statements", endpoint_labels, sql_statements, STATEMENT_BUCKETS)
+        _observe("http_request_sql_duration_seconds", endpoint_labels, sql_seconds, LATENCY_BUCKETS)
+
+
+def _connect():
+    # caller holds _lock; a forked worker opens its own connection
+    global _connection, _connection_pid
+    if _connection is None or _connection_pid != os.getpid():
+        con = sqlite3.connect(METRICS_DATABASE, timeout=5, isolation_level=None,
+                              check_same_thread=False)
+        con.execute("PRAGMA journal_mode = WAL")
+        con.execute("PRAGMA synchronous = NORMAL")
+        con.execute("""CREATE TABLE IF NOT EXISTS metrics (
+                           name TEXT,
+                           labels TEXT,
+                           le TEXT,
+                           value REAL,
+                           PRIMARY KEY (name, labels, le)) WITHOUT ROWID""")
+        _connection = con
+        _connection_pid = os.getpid()
+    return _connection
+
+
+def flush():
+    """Add the pending values of this process to METRICS_DATABASE."""
+    with _lock:
+        if not _pending:
+            return
+        rows = [(name, labels, le, value) for (name, labels, le), value in _pending.items()]
+        try:
+            con = _connect()
+            with con:
+                con.execute("BEGIN IMMEDIATE")
+                con.executemany("""INSERT INTO metrics (name, labels, le, value) VALUES (?, ?, ?, ?)
+                                   ON CONFLICT (name, labels, le)
+                                   DO UPDATE SET value = value + excluded.value""", rows)
+        except sqlite3.OperationalError:
+            # busy or not writable; keep the values for the next flush
+            return
+        _pending.clear()
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        flush()
+
+
+def ensure_flush_thread():
+    """Start the flush thread unless this process has started it.
+
+    The process id is checked, so a process forked from one with the
+    thread (a gunicorn worker) starts its own.
+    """
+    global _flush_thread_pid
+    if _flush_thread_pid == os.getpid():
+        return
+    with _flush_thread_lock:
+        if _flush_thread_pid != os.getpid():
+            _flush_thread_pid = os.getpid()
+            threading.Thread(target=_flush_periodically, name="metrics-flush",
+                             daemon=True).start()
+
+
+# the values recorded since the last periodic flush
+atexit.register(flush)
+
+
+def _family(name):
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def _quantile(q, buckets):
+    # buckets: [(upper bound, cumulative count)] in increasing order
+    total = buckets[-1][1]
+    if not total:
+        return None
+    rank = q * total
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def render():
+    """Return all stored metrics in the Prometheus text exposition format."""
+    flush()
+    with _lock:
+        try:
+            rows = _connect().execute("SELECT name, labels, le, value FROM metrics").fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+
+    suffix_order = {"_bucket": 0, "_sum": 1, "_count": 2}
+
+    def sort_key(row):
+        name, labels, le, _ = row
+        family = _family(name)
+        suffix = name[len(family):]
+        return family, labels, suffix_order.get(suffix, 0), float(le) if le else 0
+
+    samples = defaultdict(list)
+    latency_buckets = defaultdict(list)
+    for name, labels, le, value in sorted(rows, key=sort_key):
+        samples[_family(name)].append((name, labels, le, value))
+        if name == "http_request_duration_seconds_bucket":
+            latency_buckets[labels].append((float(le), value))
+
+    lines = []
+    for family, (metric_type, help_text) in FAMILIES.items():
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        for name, labels, le, value in samples.get(family, []):
+            if le:
+                labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+            lines.append(f"{name}{{{labels}}} {_format_value(value)}")
+
+    lines.append(f"# HELP {QUANTILE_FAMILY} Request latency quantiles estimated from "
+                 "http_request_duration_seconds.")
+    lines.append(f"# TYPE {QUANTILE_FAMILY} gauge")
+    for labels, buckets in latency_buckets.items():
+        for q in QUANTILES:
+            value = _quantile(q, buckets)
+            if value is not None:
+                lines.append(f'{QUANTILE_FAMILY}{{{labels},quantile="{q}"}} {_format_value(value)}')
+    return "\n".join(lines) + "\n"
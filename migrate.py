@@ -0,0 +1,502 @@
+"""Versioned, forward-only migrations for the SQLite database.
+
+schema.sql creates the baseline tables. Every later schema change is a
+numbered migration here. Applied versions are recorded in the
+schema_version table, so running the command again only applies the new
+ones. Migrations also work on databases whose schema.sql was applied by
+hand before this module existed.
+
+Usage:
+    python migrate.py [--database PATH] [--status]
+"""
+
+import argparse
+import sys
+import zlib
+import hashlib
+import db
+
+
+def _has_column(table, column):
+    rows = db.query(f"PRAGMA table_info({table})")
+    return any(row["name"] == column for row in rows)
+
+
+def _run(statements):
+    for sql in statements:
+        db.execute(sql)
+
+
+def production_indexes():
+    _run([
+        """CREATE INDEX IF NOT EXISTS idx_text_fragment_edits_version
+           ON text_fragment_edits (text_fragment_id, version)""",
+        """CREATE INDEX IF NOT EXISTS idx_transcriptions_genre
+           ON transcriptions (genre, last_modified)""",
+        """CREATE INDEX IF NOT EXISTS idx_transcriptions_source
+           ON transcriptions (source, last_modified)""",
+        """CREATE INDEX IF NOT EXISTS idx_transcriptions_user
+           ON transcriptions (user_id, last_modified)""",
+        """CREATE INDEX IF NOT EXISTS idx_transcriptions_source_path
+           ON transcriptions (source_path)""",
+        # only live fragments are listed, counted and paged
+        """CREATE INDEX IF NOT EXISTS idx_text_fragments_page_order
+           ON text_fragments (transcription_id, start_ms, id)
+           WHERE trashed IS NULL""",
+        "ANALYZE",
+    ])
+
+
+def current_fragment_text():
+    # start_ms and words keep the original split text. current_start_ms,
+    # current_words and version mirror the latest text_fragment_edits row
+    # (NULL / 0 while the fragment has not been edited).
+    if not _has_column("text_fragments", "current_start_ms"):
+        db.execute("ALTER TABLE text_fragments ADD COLUMN current_start_ms INTEGER DEFAULT NULL")
+    if not _has_column("text_fragments", "current_words"):
+        db.execute("ALTER TABLE text_fragments ADD COLUMN current_words TEXT DEFAULT NULL")
+    if not _has_column("text_fragments", "version"):
+        db.execute("ALTER TABLE text_fragments ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    _run([
+        """CREATE TRIGGER IF NOT EXISTS text_fragment_edits_current
+           AFTER INSERT ON text_fragment_edits
+           WHEN NEW.version >= (SELECT version FROM text_fragments WHERE id = NEW.text_fragment_id)
+           BEGIN
+               UPDATE text_fragments
+               SET current_start_ms = NEW.start_ms, current_words = NEW.words, version = NEW.version
+               WHERE id = NEW.text_fragment_id;
+           END""",
+        """UPDATE text_fragments
+           SET (current_start_ms, current_words, version) = (
+               SELECT tfe.start_ms, tfe.words, tfe.version
+               FROM text_fragment_edits tfe
+               WHERE tfe.text_fragment_id = text_fragments.id
+               ORDER BY tfe.version DESC LIMIT 1)
+           WHERE id IN (SELECT text_fragment_id FROM text_fragment_edits)""",
+    ])
+
+
+def full_text_search():
+    # text_fragments_fts holds the current text of every non-trashed
+    # fragment, rowid = text_fragments.id
+    _run([
+        """CREATE VIRTUAL TABLE IF NOT EXISTS text_fragments_fts USING fts5(
+               words,
+               tokenize = 'unicode61 remove_diacritics 0',
+               prefix = '2 3')""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragments_fts_insert
+           AFTER INSERT ON text_fragments
+           WHEN NEW.trashed IS NULL
+           BEGIN
+               INSERT INTO text_fragments_fts (rowid, words)
+               VALUES (NEW.id, COALESCE(NEW.current_words, NEW.words));
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragments_fts_update
+           AFTER UPDATE OF words, current_words, trashed ON text_fragments
+           BEGIN
+               DELETE FROM text_fragments_fts WHERE rowid = OLD.id;
+               INSERT INTO text_fragments_fts (rowid, words)
+               SELECT NEW.id, COALESCE(NEW.current_words, NEW.words)
+               WHERE NEW.trashed IS NULL;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragments_fts_delete
+           AFTER DELETE ON text_fragments
+           BEGIN
+               DELETE FROM text_fragments_fts WHERE rowid = OLD.id;
+           END""",
+        "DELETE FROM text_fragments_fts",
+        """INSERT INTO text_fragments_fts (rowid, words)
+           SELECT id, COALESCE(current_words, words) FROM text_fragments
+           WHERE trashed IS NULL""",
+    ])
+
+
+def fragment_page_index():
+    # first (start_ms, id) key of every fragment page of a transcription,
+    # rebuilt on demand after the fragments of the transcription change
+    _run([
+        """CREATE TABLE IF NOT EXISTS text_fragment_pages (
+               transcription_id INTEGER,
+               page INTEGER,
+               start_ms INTEGER,
+               text_fragment_id INTEGER,
+               PRIMARY KEY (transcription_id, page))""",
+        """CREATE INDEX IF NOT EXISTS idx_text_fragment_pages_key
+           ON text_fragment_pages (transcription_id, start_ms, text_fragment_id)""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragment_pages_insert
+           AFTER INSERT ON text_fragments
+           BEGIN
+               DELETE FROM text_fragment_pages WHERE transcription_id = NEW.transcription_id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragment_pages_update
+           AFTER UPDATE OF start_ms, trashed, transcription_id ON text_fragments
+           BEGIN
+               DELETE FROM text_fragment_pages
+               WHERE transcription_id IN (OLD.transcription_id, NEW.transcription_id);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragment_pages_delete
+           AFTER DELETE ON text_fragments
+           BEGIN
+               DELETE FROM text_fragment_pages WHERE transcription_id = OLD.transcription_id;
+           END""",
+        "DELETE FROM text_fragment_pages",
+    ])
+
+
+def table_counts():
+    # row counts maintained by triggers so that they can be read in O(1)
+    _run([
+        """CREATE TABLE IF NOT EXISTS table_counts (
+               name TEXT PRIMARY KEY,
+               count INTEGER NOT NULL DEFAULT 0)""",
+        """INSERT OR REPLACE INTO table_counts (name, count)
+           SELECT 'transcriptions', count(id) FROM transcriptions""",
+        """CREATE TRIGGER IF NOT EXISTS transcriptions_count_insert
+           AFTER INSERT ON transcriptions
+           BEGIN
+               UPDATE table_counts SET count = count + 1 WHERE name = 'transcriptions';
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS transcriptions_count_delete
+           AFTER DELETE ON transcriptions
+           BEGIN
+               UPDATE table_counts SET count = count - 1 WHERE name = 'transcriptions';
+           END""",
+    ])
+
+
+def compressed_raw_content():
+    # raw content moves out of the transcriptions row into zlib-compressed
+    # chunks; the row keeps a short preview, the UTF-8 size and a SHA-256
+    chunk_size = 256 * 1024
+    preview_length = 50
+    for column, column_type in [("raw_content_preview", "TEXT"),
+                                ("raw_content_size", "INTEGER DEFAULT 0"),
+                                ("raw_content_sha256", "TEXT")]:
+        if not _has_column("transcriptions", column):
+            db.execute(f"ALTER TABLE transcriptions ADD COLUMN {column} {column_type}")
+    db.execute("""CREATE TABLE IF NOT EXISTS transcription_raw_content (
+                      transcription_id INTEGER REFERENCES transcriptions,
+                      seq INTEGER,
+                      data BLOB,
+                      PRIMARY KEY (transcription_id, seq))""")
+    transcription_ids = [row["id"] for row in db.query("SELECT id FROM transcriptions")]
+    for transcription_id in transcription_ids:
+        # one transcription at a time to keep memory bounded
+        row = db.query("SELECT raw_content FROM transcriptions WHERE id = ?",
+                       [transcription_id])[0]
+        text = row["raw_content"] or ""
+        chunks = [text[start:start + chunk_size]
+                  for start in range(0, len(text), chunk_size)]
+        digest = hashlib.sha256()
+        size = 0
+        db.execute("DELETE FROM transcription_raw_content WHERE transcription_id = ?",
+                   [transcription_id])
+        for seq, chunk in enumerate(chunks):
+            data = chunk.encode("utf-8")
+            digest.update(data)
+            size += len(data)
+            db.execute("""INSERT INTO transcription_raw_content (transcription_id, seq, data)
+                          VALUES (?, ?, ?)""", [transcription_id, seq, zlib.compress(data)])
+        preview = chunks[0][:preview_length] if chunks else ""
+        db.execute("""UPDATE transcriptions SET raw_content = NULL, raw_content_preview = ?,
+                      raw_content_size = ?, raw_content_sha256 = ? WHERE id = ?""",
+                   [preview, size, digest.hexdigest(), transcription_id])
+
+
+# summary table, key column, key expression over a transcriptions row
+# (NEW./OLD. prefix added per trigger) and rows skipped by the expression
+STATS_TABLES = [
+    # NULL cannot be a conflict target, so a missing genre or source is
+    # kept as char(0), separate from the empty string like in GROUP BY
+    ("stats_genre", "genre TEXT", "IFNULL({row}.genre, char(0))", None),
+    ("stats_source", "source TEXT", "IFNULL({row}.source, char(0))", None),
+    ("stats_user", "user_id INTEGER", "IFNULL({row}.user_id, 0)", None),
+    ("stats_source_path", "source_path TEXT", "{row}.source_path", "{row}.source_path IS NOT NULL"),
+]
+
+
+def _stats_increment(table, key_column, key, condition):
+    where = "WHERE " + condition if condition else "WHERE true"
+    return f"""INSERT INTO {table} ({key_column}, count) SELECT {key}, 1 {where}
+               ON CONFLICT ({key_column}) DO UPDATE SET count = count + 1;"""
+
+
+def _stats_decrement(table, key_column, key, condition):
+    extra = " AND " + condition if condition else ""
+    return f"""UPDATE {table} SET count = count - 1 WHERE {key_column} = {key}{extra};
+               DELETE FROM {table} WHERE {key_column} = {key} AND count <= 0;"""
+
+
+def transcription_stats():
+    # per genre, source, user and source_path transcription counts, kept up
+    # to date by triggers so that /stats reads O(number of groups) rows
+    insert_body = []
+    delete_body = []
+    update_body = []
+    for table, key_definition, key, condition in STATS_TABLES:
+        key_column = key_definition.split()[0]
+        db.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+                           {key_definition} PRIMARY KEY,
+                           count INTEGER NOT NULL DEFAULT 0)""")
+        db.execute(f"DELETE FROM {table}")
+        where = "WHERE " + condition.format(row="t") if condition else ""
+        db.execute(f"""INSERT INTO {table} ({key_column}, count)
+                       SELECT {key.format(row="t")}, count(t.id) FROM transcriptions t
+                       {where} GROUP BY 1""")
+        new_key = key.format(row="NEW")
+        old_key = key.format(row="OLD")
+        new_condition = condition.format(row="NEW") if condition else None
+        old_condition = condition.format(row="OLD") if condition else None
+        changed = f"{old_key} IS NOT {new_key}"
+        insert_body.append(_stats_increment(table, key_column, new_key, new_condition))
+        delete_body.append(_stats_decrement(table, key_column, old_key, old_condition))
+        update_body.append(_stats_decrement(
+            table, key_column, old_key, " AND ".join(filter(None, [old_condition, changed]))))
+        update_body.append(_stats_increment(
+            table, key_column, new_key, " AND ".join(filter(None, [new_condition, changed]))))
+    insert_statements = "\n".join(insert_body)
+    delete_statements = "\n".join(delete_body)
+    update_statements = "\n".join(update_body)
+    db.execute("""CREATE INDEX IF NOT EXISTS idx_stats_source_path_duplicates
+                  ON stats_source_path (count) WHERE count > 1""")
+    _run([
+        f"""CREATE TRIGGER IF NOT EXISTS transcriptions_stats_insert
+            AFTER INSERT ON transcriptions
+            BEGIN
+            {insert_statements}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS transcriptions_stats_delete
+            AFTER DELETE ON transcriptions
+            BEGIN
+            {delete_statements}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS transcriptions_stats_update
+            AFTER UPDATE OF genre, source, user_id, source_path ON transcriptions
+            BEGIN
+            {update_statements}
+            END""",
+    ])
+
+
+def transcription_revision():
+    # change token of a transcription page, bumped by every write to the
+    # transcription row or its fragments (fragment edits update the
+    # fragment through text_fragment_edits_current)
+    if not _has_column("transcriptions", "revision"):
+        db.execute("ALTER TABLE transcriptions ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+    _run([
+        """CREATE TRIGGER IF NOT EXISTS transcriptions_revision_update
+           AFTER UPDATE ON transcriptions
+           WHEN NEW.revision IS OLD.revision
+           BEGIN
+               UPDATE transcriptions SET revision = revision + 1 WHERE id = NEW.id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragments_revision_insert
+           AFTER INSERT ON text_fragments
+           BEGIN
+               UPDATE transcriptions SET revision = revision + 1
+               WHERE id = NEW.transcription_id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragments_revision_update
+           AFTER UPDATE ON text_fragments
+           BEGIN
+               UPDATE transcriptions SET revision = revision + 1
+               WHERE id IN (OLD.transcription_id, NEW.transcription_id);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS text_fragments_revision_delete
+           AFTER DELETE ON text_fragments
+           BEGIN
+               UPDATE transcriptions SET revision = revision + 1
+               WHERE id = OLD.transcription_id;
+           END""",
+    ])
+
+
+def audio_store():
+    # uploaded audio files by content hash, see audio_store.py
+    db.execute("""CREATE TABLE IF NOT EXISTS audio_files (
+                      sha256 TEXT PRIMARY KEY,
+                      file_name TEXT,
+                      mime_type TEXT,
+                      size INTEGER,
+                      created DATETIME)""")
+    if not _has_column("transcriptions", "audio_sha256"):
+        db.execute("ALTER TABLE transcriptions ADD COLUMN audio_sha256 TEXT REFERENCES audio_files")
+
+
+def audio_analysis():
+    # header based duration and waveform peaks sidecar of stored audio
+    if not _has_column("audio_files", "duration_ms"):
+        db.execute("ALTER TABLE audio_files ADD COLUMN duration_ms INTEGER")
+    if not _has_column("audio_files", "has_peaks"):
+        db.execute("ALTER TABLE audio_files ADD COLUMN has_peaks BOOLEAN NOT NULL DEFAULT FALSE")
+
+
+def raw_content_hash_index():
+    # lets the bulk importer skip transcripts that are already imported
+    db.execute("""CREATE INDEX IF NOT EXISTS idx_transcriptions_raw_content_sha256
+                  ON transcriptions (raw_content_sha256)""")
+
+
+def job_queue():
+    # background jobs, see jobs.py; at most one queued or running job per
+    # transcription
+    _run([
+        """CREATE TABLE IF NOT EXISTS jobs (
+               id INTEGER PRIMARY KEY,
+               kind TEXT NOT NULL,
+               transcription_id INTEGER,
+               user_id INTEGER,
+               state TEXT NOT NULL DEFAULT 'queued',
+               attempts INTEGER NOT NULL DEFAULT 0,
+               rows_processed INTEGER NOT NULL DEFAULT 0,
+               work_done INTEGER NOT NULL DEFAULT 0,
+               work_total INTEGER,
+               message TEXT,
+               worker TEXT,
+               created REAL,
+               run_after REAL,
+               started_at REAL,
+               heartbeat REAL,
+               finished_at REAL)""",
+        """CREATE INDEX IF NOT EXISTS idx_jobs_state
+           ON jobs (state, run_after)""",
+        """CREATE INDEX IF NOT EXISTS idx_jobs_transcription
+           ON jobs (transcription_id, id)""",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_transcription
+           ON jobs (transcription_id) WHERE state IN ('queued', 'running')""",
+    ])
+
+
+def unique_fragment_versions():
+    # one edit row per (fragment, version); concurrent saves used to be able
+    # to write the same version twice, those are renumbered in save order
+    _run([
+        """CREATE TEMP TABLE renumbered_edits AS
+           SELECT id, ROW_NUMBER() OVER (
+               PARTITION BY text_fragment_id ORDER BY version, id) AS version
+           FROM text_fragment_edits
+           WHERE text_fragment_id IN (
+               SELECT text_fragment_id FROM text_fragment_edits
+               GROUP BY text_fragment_id, version HAVING count(*) > 1)""",
+        """UPDATE text_fragment_edits
+           SET version = (SELECT version FROM renumbered_edits r
+                          WHERE r.id = text_fragment_edits.id)
+           WHERE id IN (SELECT id FROM renumbered_edits)""",
+        """UPDATE text_fragments
+           SET (current_start_ms, current_words, version) = (
+               SELECT tfe.start_ms, tfe.words, tfe.version
+               FROM text_fragment_edits tfe
+               WHERE tfe.text_fragment_id = text_fragments.id
+               ORDER BY tfe.version DESC LIMIT 1)
+           WHERE id IN (SELECT text_fragment_id FROM text_fragment_edits
+                        WHERE id IN (SELECT id FROM renumbered_edits))""",
+        "DROP TABLE renumbered_edits",
+        "DROP INDEX IF EXISTS idx_text_fragment_edits_version",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_text_fragment_edits_version
+           ON text_fragment_edits (text_fragment_id, version)""",
+    ])
+
+
+def edit_history_deltas():
+    # versions between snapshots keep a delta instead of words, see
+    # edit_history.py
+    if not _has_column("text_fragment_edits", "delta"):
+        db.execute("ALTER TABLE text_fragment_edits ADD COLUMN delta TEXT")
+
+
+def edit_history_time_index():
+    # point-in-time views find the last edit before a moment per fragment
+    db.execute("""CREATE INDEX IF NOT EXISTS idx_text_fragment_edits_created
+                  ON text_fragment_edits (text_fragment_id, created_at)""")
+
+
+def job_acknowledgement():
+    # a finished job is shown once to the user who queued it; jobs that
+    # finished before the column existed count as already shown
+    if not _has_column("jobs", "acknowledged"):
+        _run([
+            "ALTER TABLE jobs ADD COLUMN acknowledged INTEGER NOT NULL DEFAULT 0",
+            "UPDATE jobs SET acknowledged = 1 WHERE state IN ('done', 'failed')",
+        ])
+
+
+MIGRATIONS = [
+    (1, "production index set", production_indexes),
+    (2, "materialized current fragment text", current_fragment_text),
+    (3, "fts5 index over current fragment text", full_text_search),
+    (4, "fragment page boundaries", fragment_page_index),
+    (5, "trigger maintained transcription count", table_counts),
+    (6, "compressed raw content outside the transcriptions row", compressed_raw_content),
+    (7, "incrementally maintained transcription statistics", transcription_stats),
+    (8, "per transcription revision counter", transcription_revision),
+    (9, "content addressed audio store", audio_store),
+    (10, "audio duration and waveform peaks", audio_analysis),
+    (11, "raw content hash index", raw_content_hash_index),
+    (12, "background job queue", job_queue),
+    (13, "unique fragment edit versions", unique_fragment_versions),
+    (14, "delta compressed edit history", edit_history_deltas),
+    (15, "edit history time index", edit_history_time_index),
+    (16, "acknowledged background jobs", job_acknowledgement),
+]
+
+
+def _ensure_version_table():
+    db.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+                      version INTEGER PRIMARY KEY,
+                      description TEXT,
+                      applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)""")
+
+
+def applied_versions():
+    _ensure_version_table()
+    return {row["version"] for row in db.query("SELECT version FROM schema_version")}
+
+
+def pending_migrations():
+    applied = applied_versions()
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def migrate():
+    """Apply every pending migration, each in its own transaction.
+
+    Returns the list of applied version numbers.
+    """
+    applied = []
+    for version, description, migration in pending_migrations():
+        with db.transaction():
+            migration()
+            db.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                       [version, description])
+        applied.append(version)
+    if applied:
+        db.execute("PRAGMA optimize")
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upgrade the database schema in place.")
+    parser.add_argument("--database", default=db.DATABASE,
+                        help="SQLite database file (default: %(default)s)")
+    parser.add_argument("--status", action="store_true",
+                        help="list applied and pending migrations without applying them")
+    args = parser.parse_args(argv)
+    db.DATABASE = args.database
+    try:
+        if args.status:
+            applied = applied_versions()
+            for version, description, _ in MIGRATIONS:
+                state = "applied" if version in applied else "pending"
+                print(f"{version:4}  {state:8} {description}")
+            return 0
+        for version in migrate():
+            print("applied migration", version)
+        print("schema version", max(applied_versions(), default=0))
+    finally:
+        db.close_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
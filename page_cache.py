@@ -0,0 +1,62 @@
+"""In-process LRU cache of rendered transcription page fragments.
+
+Entries are keyed by (transcription_id, revision, ...). The revision is read
+from the database on every request, so an entry written before a change in
+another worker process is never served. invalidate() only frees the memory
+of entries that can no longer be hit.
+"""
+
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = 32 * 1024 * 1024
+MAX_ENTRIES = 4096
+# charged on top of the given size for the key, the tuple and the other
+# values of an entry, so small and empty pages are evicted too
+ENTRY_OVERHEAD_BYTES = 512
+
+_entries = OrderedDict()
+_size = 0
+_lock = threading.Lock()
+
+
+def get(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        _entries.move_to_end(key)
+        return entry[0]
+
+
+def put(key, value, size):
+    """Store value, evicting the least recently used entries over MAX_BYTES
+    or MAX_ENTRIES."""
+    global _size
+    size += ENTRY_OVERHEAD_BYTES
+    if size > MAX_BYTES:
+        return
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _size -= old[1]
+        _entries[key] = (value, size)
+        _size += size
+        while _size > MAX_BYTES or len(_entries) > MAX_ENTRIES:
+            _, (_, evicted_size) = _entries.popitem(last=False)
+            _size -= evicted_size
+
+
+def invalidate(transcription_id):
+    """Drop every entry of the transcription."""
+    global _size
+    with _lock:
+        for key in [key for key in _entries if key[0] == transcription_id]:
+            _size -= _entries.pop(key)[1]
+
+
+def clear():
+    global _size
+    with _lock:
+        _entries.clear()
+        _size = 0
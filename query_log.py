@@ -0,0 +1,171 @@
+"""Slow query log.
+
+db.py hands every statement that took at least SLOW_QUERY_MS milliseconds
+to record(). It is appended to SLOW_QUERY_LOG as one JSON object per line
+with the SQL text, the types of the bound parameters (not their values),
+the duration, the number of rows returned or changed and the endpoint of
+the request. The first time a process logs a statement, the line also
+gets its EXPLAIN QUERY PLAN, so full table scans show up with the query.
+
+Statements are grouped by a fingerprint: the SQL with its whitespace
+collapsed and literals and IN lists replaced by placeholders.
+
+Set SLOW_QUERY_MS to change the threshold (0 logs every statement) and
+SLOW_QUERY_LOG to an empty string to turn the log off.
+
+Usage:
+    python query_log.py [--log FILE] [--sort total|count|max] [--top N]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import sqlite3
+import threading
+from flask import has_request_context, request
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG", "slow_queries.log")
+
+_explained = set()
+_lock = threading.Lock()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    """Return a short id shared by the statements that differ only in literals."""
+    text = _STRING_LITERAL.sub("?", normalize(sql))
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _IN_LIST.sub("IN (...)", text)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _shape(value):
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+def parameter_shapes(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: _shape(value) for name, value in params.items()}
+    return [_shape(value) for value in params]
+
+
+def _explain(con, sql, params):
+    try:
+        rows = con.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error:
+        return None
+    return [row[3] for row in rows]
+
+
+def record(con, sql, params, seconds, rows):
+    """Append a slow statement to SLOW_QUERY_LOG.
+
+    params is None for executemany() batches, which are not explained.
+    """
+    key = fingerprint(sql)
+    entry = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fingerprint": key,
+        "sql": normalize(sql),
+        "params": parameter_shapes(params),
+        "ms": round(seconds * 1000, 3),
+        "rows": rows,
+        "endpoint": request.endpoint if has_request_context() else None,
+    }
+    with _lock:
+        explain = params is not None and key not in _explained
+        _explained.add(key)
+    if explain:
+        entry["plan"] = _explain(con, sql, params)
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    try:
+        with _lock, open(SLOW_QUERY_LOG, "a", encoding="utf-8") as log:
+            log.write(line)
+    except OSError:
+        pass
+
+
+def read_log(path):
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def aggregate(entries):
+    """Group log entries by fingerprint, returning a list of summary dicts."""
+    groups = {}
+    for entry in entries:
+        group = groups.get(entry["fingerprint"])
+        if group is None:
+            group = groups[entry["fingerprint"]] = {
+                "fingerprint": entry["fingerprint"], "sql": entry["sql"], "plan": None,
+                "count": 0, "total": 0.0, "max": 0.0, "rows": 0, "endpoints": set()}
+        group["count"] += 1
+        group["total"] += entry["ms"]
+        group["max"] = max(group["max"], entry["ms"])
+        group["rows"] += entry.get("rows") or 0
+        if entry.get("endpoint"):
+            group["endpoints"].add(entry["endpoint"])
+        if entry.get("plan") and not group["plan"]:
+            group["plan"] = entry["plan"]
+    return list(groups.values())
+
+
+def report(groups, sort="total", top=20, output=sys.stdout):
+    groups = sorted(groups, key=lambda group: group[sort], reverse=True)[:top]
+    for group in groups:
+        mean = group["total"] / group["count"]
+        print(f"{group['fingerprint']}  {group['count']} x  total {group['total']:.0f} ms  "
+              f"mean {mean:.1f} ms  max {group['max']:.1f} ms  "
+              f"rows/call {group['rows'] / group['count']:.0f}", file=output)
+        if group["endpoints"]:
+            print("  endpoints:", ", ".join(sorted(group["endpoints"])), file=output)
+        print("  " + group["sql"], file=output)
+        for step in group["plan"] or ["(no plan captured)"]:
+            marker = "!" if step.startswith("SCAN") else " "
+            print(f"  {marker} {step}", file=output)
+        print(file=output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the slow query log by statement.")
+    parser.add_argument("--log", default=SLOW_QUERY_LOG or "slow_queries.log",
+                        help="slow query log file (default: %(default)s)")
+    parser.add_argument("--sort", choices=("total", "count", "max"), default="total",
+                        help="order of the statements (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=20,
+                        help="number of statements shown (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        groups = aggregate(read_log(args.log))
+    except FileNotFoundError:
+        print("no slow query log", args.log, file=sys.stderr)
+        return 1
+    report(groups, args.sort, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
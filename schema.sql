@@ -1,3 +1,5 @@
+-- Baseline schema. Later changes are applied with: python migrate.py
+
 CREATE TABLE users (
     id INTEGER PRIMARY KEY,
     username TEXT UNIQUE,
@@ -41,4 +43,4 @@ CREATE TABLE text_fragment_edits (
     user_id INTEGER REFERENCES users
 );
 
-CREATE INDEX idx_transcriptions_text_fragments ON text_fragments (transcription_id);
\ No newline at end of file
+CREATE INDEX idx_transcriptions_text_fragments ON text_fragments (transcription_id);
@@ -1,34 +1,249 @@
+"""Synthetic test data for performance testing.
+
+Creates a database with the schema and all migrations and fills it with
+users, transcriptions and text fragments:
+
+- the words come from a generated Finnish-like vocabulary, picked with
+  Zipf-distributed frequencies
+- transcription lengths follow a Pareto distribution, so a few
+  transcriptions are very long and most are short
+- a share of the fragments has an edit history of one or more versions,
+  and a share is trashed
+- every transcription has its raw content in the MS Word layout
+
+Rows are written with executemany in large transactions. The per-row
+triggers of the fragment tables are dropped during the load, and the
+current text columns and the full text index are then rebuilt in one pass
+by the same migration code that created them. The random seed makes the
+data reproducible. Every user's password is SEED_PASSWORD.
+
+Usage:
+    python seed.py [--database PATH] [--fragments N] [--transcriptions N] [--users N] [--reset]
+"""
+
+import os
+import sys
+import zlib
 import random
+import hashlib
+import argparse
+import datetime
 import sqlite3
+from itertools import accumulate
+from werkzeug.security import generate_password_hash
+import db
+import migrate
+import transcriptions
+
+SEED_PASSWORD = "seed-user"
+BATCH_SIZE = 10000
+VOCABULARY_SIZE = 20000
+PARETO_ALPHA = 1.2
+
+COMMON_WORDS = [
+    "ja", "on", "ei", "se", "että", "oli", "kun", "niin", "mutta", "tämä",
+    "hän", "me", "te", "ne", "nyt", "vain", "jo", "myös", "kuin", "sitten",
+    "joka", "mitä", "siis", "no", "kyllä", "tai", "sen", "ole", "voi", "olla",
+]
+ONSETS = ["", "k", "t", "p", "s", "h", "m", "n", "l", "r", "v", "j", "kk", "tt", "ss"]
+VOWELS = ["a", "e", "i", "o", "u", "y", "ä", "ö", "aa", "ee", "ii", "uu", "ää", "ai", "ei", "oi", "uo", "ie"]
+CODAS = ["", "", "", "n", "s", "t", "l", "r", "nen", "sta", "lla", "ssa", "lle", "ksi"]
+GENRES = ["haastattelu", "luento", "podcast", "kokous", "uutiset", "dokumentti", "puhe", ""]
+SOURCES = ["word", "webvtt", "youtube"]
+LICENSES = ["CC BY 4.0", "CC BY-SA 4.0", "CC0", "kaikki oikeudet pidätetään", None]
+
+
+def make_vocabulary(rng, size):
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        syllables = rng.choice((1, 2, 2, 3, 3, 3, 4, 5))
+        word = "".join(rng.choice(ONSETS) + rng.choice(VOWELS) for _ in range(syllables))
+        word += rng.choice(CODAS)
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    # Zipf: the n:th word is used in proportion to 1 / n
+    weights = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    return words, weights
+
+
+class Generator:
+    """Writes the synthetic rows with one database connection."""
+
+    def __init__(self, rng, users, edit_ratio, trash_ratio):
+        self.rng = rng
+        self.users = users
+        self.edit_ratio = edit_ratio
+        self.trash_ratio = trash_ratio
+        self.words, self.cum_weights = make_vocabulary(rng, VOCABULARY_SIZE)
+        self.now = datetime.datetime(2025, 11, 1)
+        self.fragment_id = 0
+        self.fragment_rows = []
+        self.edit_rows = []
+
+    def sentence(self):
+        length = max(1, int(self.rng.lognormvariate(2.1, 0.5)))
+        words = self.rng.choices(self.words, cum_weights=self.cum_weights, k=length)
+        text = " ".join(words)
+        return text[0].upper() + text[1:] + self.rng.choice(".....?!,")
+
+    def timestamp(self, days_ago):
+        moment = self.now - datetime.timedelta(days=days_ago)
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+    def edited(self, words):
+        words = words.split(" ")
+        index = self.rng.randrange(len(words))
+        words[index] = self.rng.choices(self.words, cum_weights=self.cum_weights)[0]
+        return " ".join(words)
+
+    def transcription(self, transcription_id, fragment_count):
+        rng = self.rng
+        user_id = rng.randint(1, self.users)
+        days_ago = rng.uniform(0, 3 * 365)
+        start_ms = 0
+        raw_lines = []
+        for _ in range(fragment_count):
+            start_ms += rng.randint(1500, 9000)
+            words = self.sentence()
+            self.fragment_id += 1
+            trashed = 1 if rng.random() < self.trash_ratio else None
+            self.fragment_rows.append((self.fragment_id, start_ms, words, transcription_id, trashed))
+            seconds = start_ms // 1000
+            raw_lines.append(f"{seconds // 3600:02}:{seconds // 60 % 60:02}:{seconds % 60:02}\n{words}\n")
+            if trashed is None and rng.random() < self.edit_ratio:
+                versions = 1
+                while versions < 20 and rng.random() < 0.4:
+                    versions += 1
+                edit_days_ago = days_ago
+                for version in range(1, versions + 1):
+                    words = self.edited(words)
+                    edit_days_ago = rng.uniform(0, edit_days_ago)
+                    self.edit_rows.append((start_ms, words, version, self.fragment_id,
+                                           self.timestamp(edit_days_ago), rng.randint(1, self.users)))
+        raw_content = "".join(raw_lines)
+        data = raw_content.encode("utf-8")
+        record_date = (self.now - datetime.timedelta(days=days_ago + rng.uniform(0, 365))).date()
+        row = (transcription_id, f"Litterointi {transcription_id}: {self.sentence()}",
+               f"aanitteet/{user_id}/tallenne_{transcription_id}.mp3", rng.choice(SOURCES),
+               rng.choice(GENRES), user_id, self.timestamp(days_ago), self.timestamp(days_ago / 2),
+               rng.choice(LICENSES), record_date.isoformat(), start_ms // 1000 + 5, None,
+               rng.random() < 0.2, raw_content[:transcriptions.RAW_CONTENT_PREVIEW_LENGTH],
+               len(data), hashlib.sha256(data).hexdigest())
+        chunk_size = transcriptions.RAW_CONTENT_CHUNK_SIZE
+        chunks = [(transcription_id, seq, zlib.compress(raw_content[start:start + chunk_size].encode("utf-8")))
+                  for seq, start in enumerate(range(0, len(raw_content), chunk_size))]
+        return row, chunks
+
+    def flush(self):
+        db.executemany("""INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed)
+                          VALUES (?, ?, ?, ?, ?)""", self.fragment_rows)
+        db.executemany("""INSERT INTO text_fragment_edits
+                          (start_ms, words, version, text_fragment_id, created_at, user_id)
+                          VALUES (?, ?, ?, ?, ?, ?)""", self.edit_rows)
+        self.fragment_rows = []
+        self.edit_rows = []
+
+
+def fragment_counts(rng, transcription_count, fragment_count):
+    """Split fragment_count over the transcriptions with Pareto weights."""
+    weights = [rng.paretovariate(PARETO_ALPHA) for _ in range(transcription_count)]
+    total = sum(weights)
+    counts = [int(weight / total * fragment_count) for weight in weights]
+    for index in rng.sample(range(transcription_count), fragment_count - sum(counts)):
+        counts[index] += 1
+    return counts
+
+
+def generate(path, fragments, transcription_count=None, users=100, edit_ratio=0.05,
+             trash_ratio=0.01, seed=1, progress=True):
+    """Create the database at path and fill it with synthetic data."""
+    transcription_count = transcription_count or max(1, fragments // 100)
+    rng = random.Random(seed)
+    con = sqlite3.connect(path)
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql"),
+              encoding="utf-8") as f:
+        con.executescript(f.read())
+    con.close()
+    old_database = db.DATABASE
+    db.DATABASE = path
+    try:
+        migrate.migrate()
+        password_hash = generate_password_hash(SEED_PASSWORD)
+        with db.transaction():
+            db.executemany("INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)",
+                           [(i, f"user{i}", password_hash) for i in range(1, users + 1)])
+        sql = """SELECT name, sql FROM sqlite_master WHERE type = 'trigger'
+                 AND tbl_name IN ('text_fragments', 'text_fragment_edits')"""
+        triggers = db.query(sql)
+        for trigger in triggers:
+            db.execute(f"DROP TRIGGER {trigger['name']}")
+        generator = Generator(rng, users, edit_ratio, trash_ratio)
+        counts = fragment_counts(rng, transcription_count, fragments)
+        pending = []
+        written = 0
+        for transcription_id, count in enumerate(counts, 1):
+            pending.append(generator.transcription(transcription_id, count))
+            if len(generator.fragment_rows) >= BATCH_SIZE or transcription_id == len(counts):
+                with db.transaction():
+                    db.executemany(
+                        """INSERT INTO transcriptions
+                           (id, title, source_path, source, genre, user_id, created, last_modified,
+                            license, record_date, duration_sec, extra_meta_data, allow_collaboration,
+                            raw_content_preview, raw_content_size, raw_content_sha256)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        [row for row, _ in pending])
+                    db.executemany("""INSERT INTO transcription_raw_content (transcription_id, seq, data)
+                                      VALUES (?, ?, ?)""",
+                                   [chunk for _, chunks in pending for chunk in chunks])
+                    written += len(generator.fragment_rows)
+                    generator.flush()
+                pending = []
+                if progress:
+                    print(f"{written}/{fragments} fragments", end="\r", flush=True, file=sys.stderr)
+        with db.transaction():
+            migrate.current_fragment_text()
+            for trigger in triggers:
+                db.execute(trigger["sql"].replace("CREATE TRIGGER", "CREATE TRIGGER IF NOT EXISTS", 1))
+            migrate.full_text_search()
+        db.execute("ANALYZE")
+        if progress:
+            print(file=sys.stderr)
+    finally:
+        db.close_connection()
+        db.DATABASE = old_database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create a database of synthetic transcriptions.")
+    parser.add_argument("--database", default="database_test.db",
+                        help="database file to create (default: %(default)s)")
+    parser.add_argument("--fragments", type=int, default=10**6,
+                        help="number of text fragments (default: %(default)s)")
+    parser.add_argument("--transcriptions", type=int, default=None,
+                        help="number of transcriptions (default: fragments / 100)")
+    parser.add_argument("--users", type=int, default=100,
+                        help="number of users (default: %(default)s)")
+    parser.add_argument("--edit-ratio", type=float, default=0.05,
+                        help="share of the fragments with an edit history (default: %(default)s)")
+    parser.add_argument("--trash-ratio", type=float, default=0.01,
+                        help="share of trashed fragments (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: %(default)s)")
+    parser.add_argument("--reset", action="store_true",
+                        help="remove the database file first if it exists")
+    args = parser.parse_args(argv)
+    if os.path.exists(args.database):
+        if not args.reset:
+            print(args.database, "exists, use --reset to replace it", file=sys.stderr)
+            return 1
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+    generate(args.database, args.fragments, args.transcriptions, args.users,
+             args.edit_ratio, args.trash_ratio, args.seed)
+    return 0
+
 
-# using a separate test database to avoid messing with development data 
-# (switch manually to database_test.db in db.py for testing)
-db = sqlite3.connect("database_test.db")
-
-db.execute("DELETE FROM users")
-db.execute("DELETE FROM transcriptions")
-db.execute("DELETE FROM text_fragments")
-
-user_count = 100
-transcriptions_count = 10**4
-text_fragments_count = 10**6
-
-for i in range(1, user_count + 1):
-    db.execute("INSERT INTO users (username) VALUES (?)",
-               ["user" + str(i)])
-
-for i in range(1, transcriptions_count + 1):
-    user_id = random.randint(1, user_count)
-    db.execute("INSERT INTO transcriptions (title, user_id) VALUES (?, ?)",
-               ["transcription " + str(i), user_id])
-
-for i in range(1, text_fragments_count + 1):
-    user_id = random.randint(1, user_count)
-    transcription_id = random.randint(1, transcriptions_count)
-    db.execute(
-        """INSERT INTO text_fragments (start_ms, words, transcription_id)
-                  VALUES (?, ?, ?)""", [
-            i * 1000 + 2, "tekstitystä " + str(i), transcription_id])
-
-db.commit()
-db.close()
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,37 +4,37 @@ INSERT INTO transcriptions VALUES(9,'El águila, el cuervo y el pastor.','https:
 
 INSERT INTO transcriptions VALUES(11,'The Wolf and the Lamb (Aesop''s Fables)','https://www.youtube.com/watch?v=9Ntycz339Bo','youtube','Satu',replace(replace('{\r\012  "wireMagic": "pb3",\r\012  "pens": [ {\r\012  \r\012  } ],\r\012  "wsWinStyles": [ {\r\012  \r\012  }, {\r\012    "mhModeHint": 2,\r\012    "juJustifCode": 0,\r\012    "sdScrollDir": 3\r\012  } ],\r\012  "wpWinPositions": [ {\r\012  \r\012  }, {\r\012    "apPoint": 6,\r\012    "ahHorPos": 20,\r\012    "avVerPos": 100,\r\012    "rcRows": 2,\r\012    "ccCols": 40\r\012  } ],\r\012  "events": [ {\r\012    "tStartMs": 0,\r\012    "dDurationMs": 74439,\r\012    "id": 1,\r\012    "wpWinPosId": 1,\r\012    "wsWinStyleId": 1\r\012  }, {\r\012    "tStartMs": 240,\r\012    "dDurationMs": 5920,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "once",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " upon",\r\012      "tOffsetMs": 440,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " a",\r\012      "tOffsetMs": 720,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " time",\r\012      "tOffsetMs": 959,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " a",\r\012      "tOffsetMs": 1400,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " wolf",\r\012      "tOffsetMs": 1560,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " was",\r\012      "tOffsetMs": 1919,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " lapping",\r\012      "tOffsetMs": 2120,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " at",\r\012      "tOffsetMs": 2560,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " a",\r\012      "tOffsetMs": 2679,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 3110,\r\012    "dDurationMs": 3050,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 3120,\r\012    "dDurationMs": 5120,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "spring",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " on",\r\012      "tOffsetMs": 480,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " a",\r\012      "tOffsetMs": 640,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " hillside",\r\012      "tOffsetMs": 920,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " when",\r\012      "tOffsetMs": 1920,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " looking",\r\012      "tOffsetMs": 2199,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " up",\r\012      "tOffsetMs": 2560,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 6150,\r\012    "dDurationMs": 2090,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 6160,\r\012    "dDurationMs": 4880,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "what",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " should",\r\012      "tOffsetMs": 119,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " he",\r\012      "tOffsetMs": 360,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " see",\r\012      "tOffsetMs": 480,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " but",\r\012      "tOffsetMs": 880,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " a",\r\012      "tOffsetMs": 1040,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " lamb",\r\012      "tOffsetMs": 1199,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " just",\r\012      "tOffsetMs": 1840,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 8230,\r\012    "dDurationMs": 2810,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 8240,\r\012    "dDurationMs": 6519,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "beginning",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " to",\r\012      "tOffsetMs": 399,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " drink",\r\012      "tOffsetMs": 600,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " a",\r\012      "tOffsetMs": 880,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " little",\r\012      "tOffsetMs": 1040,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " lower",\r\012      "tOffsetMs": 1279,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " down",\r\012      "tOffsetMs": 1800,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 11030,\r\012    "dDurationMs": 3729,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 11040,\r\012    "dDurationMs": 7680,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "there''s",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " my",\r\012      "tOffsetMs": 440,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " supper",\r\012      "tOffsetMs": 880,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " thought",\r\012      "tOffsetMs": 1880,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " he",\r\012      "tOffsetMs": 2240,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " if",\r\012      "tOffsetMs": 2960,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " only",\r\012      "tOffsetMs": 3160,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " I",\r\012      "tOffsetMs": 3599,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 14749,\r\012    "dDurationMs": 3971,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 14759,\r\012    "dDurationMs": 6921,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "can",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " find",\r\012      "tOffsetMs": 361,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " some",\r\012      "tOffsetMs": 721,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " excuse",\r\012      "tOffsetMs": 1040,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " to",\r\012      "tOffsetMs": 1721,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " seize",\r\012      "tOffsetMs": 2041,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " it",\r\012      "tOffsetMs": 2641,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " then",\r\012      "tOffsetMs": 3641,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " he",\r\012      "tOffsetMs": 3761,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 18710,\r\012    "dDurationMs": 2970,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 18720,\r\012    "dDurationMs": 5960,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "called",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " out",\r\012      "tOffsetMs": 319,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " to",\r\012      "tOffsetMs": 520,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 680,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " lamb",\r\012      "tOffsetMs": 960,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " how",\r\012      "tOffsetMs": 1960,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " dare",\r\012      "tOffsetMs": 2360,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " you",\r\012      "tOffsetMs": 2680,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 21670,\r\012    "dDurationMs": 3010,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 21680,\r\012    "dDurationMs": 7160,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "muddle",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 480,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " water",\r\012      "tOffsetMs": 679,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " from",\r\012      "tOffsetMs": 1040,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " which",\r\012      "tOffsetMs": 1359,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " I''m",\r\012      "tOffsetMs": 1640,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 24670,\r\012    "dDurationMs": 4170,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 24680,\r\012    "dDurationMs": 6359,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "drinking",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " nay",\r\012      "tOffsetMs": 1000,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " Master",\r\012      "tOffsetMs": 1439,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " nay",\r\012      "tOffsetMs": 1880,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " said",\r\012      "tOffsetMs": 2679,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 2919,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " Lamkin",\r\012      "tOffsetMs": 3160,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 28830,\r\012    "dDurationMs": 2209,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 28840,\r\012    "dDurationMs": 4680,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "if",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 199,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " water",\r\012      "tOffsetMs": 359,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " be",\r\012      "tOffsetMs": 599,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " muddy",\r\012      "tOffsetMs": 759,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " up",\r\012      "tOffsetMs": 1199,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " there",\r\012      "tOffsetMs": 1400,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " I",\r\012      "tOffsetMs": 1679,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " cannot",\r\012      "tOffsetMs": 1839,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 31029,\r\012    "dDurationMs": 2491,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 31039,\r\012    "dDurationMs": 3601,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "be",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 240,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " cause",\r\012      "tOffsetMs": 361,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " of",\r\012      "tOffsetMs": 640,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " it",\r\012      "tOffsetMs": 761,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " for",\r\012      "tOffsetMs": 961,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " it",\r\012      "tOffsetMs": 1200,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " runs",\r\012      "tOffsetMs": 1321,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " down",\r\012      "tOffsetMs": 1761,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " from",\r\012      "tOffsetMs": 2200,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 33510,\r\012    "dDurationMs": 1130,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 33520,\r\012    "dDurationMs": 5600,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "you",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " to",\r\012      "tOffsetMs": 280,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 34630,\r\012    "dDurationMs": 4490,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 34640,\r\012    "dDurationMs": 7399,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "me",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " well",\r\012      "tOffsetMs": 1000,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " then",\r\012      "tOffsetMs": 1320,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " said",\r\012      "tOffsetMs": 2079,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 2360,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " wolf",\r\012      "tOffsetMs": 2960,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " why",\r\012      "tOffsetMs": 3960,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " did",\r\012      "tOffsetMs": 4120,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " you",\r\012      "tOffsetMs": 4280,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 39110,\r\012    "dDurationMs": 2929,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 39120,\r\012    "dDurationMs": 6599,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "call",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " me",\r\012      "tOffsetMs": 200,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " bad",\r\012      "tOffsetMs": 560,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " names",\r\012      "tOffsetMs": 800,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " this",\r\012      "tOffsetMs": 1160,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " time",\r\012      "tOffsetMs": 1360,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " last",\r\012      "tOffsetMs": 1800,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 42029,\r\012    "dDurationMs": 3690,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 42039,\r\012    "dDurationMs": 5520,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "year",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " that",\r\012      "tOffsetMs": 1000,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " cannot",\r\012      "tOffsetMs": 1200,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " be",\r\012      "tOffsetMs": 1641,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " said",\r\012      "tOffsetMs": 2241,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 2481,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " lamb",\r\012      "tOffsetMs": 2641,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " I",\r\012      "tOffsetMs": 3441,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " am",\r\012      "tOffsetMs": 3561,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 45709,\r\012    "dDurationMs": 1850,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 45719,\r\012    "dDurationMs": 6121,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "only",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " 6",\r\012      "tOffsetMs": 401,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " months",\r\012      "tOffsetMs": 721,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 47549,\r\012    "dDurationMs": 4291,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 47559,\r\012    "dDurationMs": 8041,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "old",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " I",\r\012      "tOffsetMs": 1000,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " don''t",\r\012      "tOffsetMs": 1160,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " dare",\r\012      "tOffsetMs": 1601,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " snarled",\r\012      "tOffsetMs": 2401,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 2961,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " wolf",\r\012      "tOffsetMs": 3121,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " if",\r\012      "tOffsetMs": 3961,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " it",\r\012      "tOffsetMs": 4081,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 51830,\r\012    "dDurationMs": 3770,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 51840,\r\012    "dDurationMs": 6039,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "was",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " not",\r\012      "tOffsetMs": 239,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " you",\r\012      "tOffsetMs": 559,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " then",\r\012      "tOffsetMs": 1359,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " it",\r\012      "tOffsetMs": 1519,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " was",\r\012      "tOffsetMs": 1640,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " your",\r\012      "tOffsetMs": 1800,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " father",\r\012      "tOffsetMs": 2559,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " and",\r\012      "tOffsetMs": 3559,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 55590,\r\012    "dDurationMs": 2289,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 55600,\r\012    "dDurationMs": 6320,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "with",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " that",\r\012      "tOffsetMs": 160,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " he",\r\012      "tOffsetMs": 360,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " rushed",\r\012      "tOffsetMs": 520,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " upon",\r\012      "tOffsetMs": 920,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " the",\r\012      "tOffsetMs": 1240,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " poor",\r\012      "tOffsetMs": 1400,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " little",\r\012      "tOffsetMs": 1639,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 57869,\r\012    "dDurationMs": 4051,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 57879,\r\012    "dDurationMs": 6240,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "lamb",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " and",\r\012      "tOffsetMs": 1000,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " ate",\r\012      "tOffsetMs": 1241,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " her",\r\012      "tOffsetMs": 1520,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " all",\r\012      "tOffsetMs": 1761,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " all",\r\012      "tOffsetMs": 2121,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " up",\r\012      "tOffsetMs": 2520,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " but",\r\012      "tOffsetMs": 3520,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " before",\r\012      "tOffsetMs": 3721,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 61910,\r\012    "dDurationMs": 2209,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 61920,\r\012    "dDurationMs": 5430,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "she",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " died",\r\012      "tOffsetMs": 319,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " she",\r\012      "tOffsetMs": 680,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " gasped",\r\012      "tOffsetMs": 920,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 64109,\r\012    "dDurationMs": 3241,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 64119,\r\012    "dDurationMs": 7320,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "out",\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " any",\r\012      "tOffsetMs": 1000,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " excuse",\r\012      "tOffsetMs": 1481,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " will",\r\012      "tOffsetMs": 2081,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " serve",\r\012      "tOffsetMs": 2360,\r\012      "acAsrConf": 0\r\012    }, {\r\012      "utf8": " a",\r\012      "tOffsetMs": 2801,\r\012      "acAsrConf": 0\r\012    } ]\r\012  }, {\r\012    "tStartMs": 67340,\r\012    "dDurationMs": 4099,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 67350,\r\012    "dDurationMs": 7089,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "[Music]"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 71429,\r\012    "dDurationMs": 3010,\r\012    "wWinId": 1,\r\012    "aAppend": 1,\r\012    "segs": [ {\r\012      "utf8": "\n"\r\012    } ]\r\012  }, {\r\012    "tStartMs": 71439,\r\012    "dDurationMs": 3000,\r\012    "wWinId": 1,\r\012    "segs": [ {\r\012      "utf8": "tyrant",\r\012      "acAsrConf": 0\r\012    } ]\r\012  } ]\r\012}\r\012','\r',char(13)),'\012',char(10)),1,'2025-11-08 05:50:45','2025-11-08 05:50:45','Creative Commons Attribution license', NULL, NULL, NULL,FALSE );
 
-INSERT INTO text_fragments VALUES(5305,1000,'Las fábulas de Esopo Grabado para librevox.org por Christina Chu Fábula número uno El águila, el cuervo y el pastor Lanzándose desde una cima, un águila arrebató a un corderito.',9,NULL);
-INSERT INTO text_fragments VALUES(5306,25000,'La vió',9,NULL);
-INSERT INTO text_fragments VALUES(5307,27000,'Un cuevo y tratando de imitar al águila, se lanzó sobre un canelo, pero con tan mal conocimiento en el arte que sus garras se enredaron en la lana, y patiendo al máximo sus alas no logró soltarse.',9,NULL);
-INSERT INTO text_fragments VALUES(5308,50000,'Viendo el pastor lo que sucedía, cogió al cuevo',9,NULL);
-INSERT INTO text_fragments VALUES(5309,56000,'y cortando las puntas de sus alas, se lo llevó a sus niños.',9,NULL);
-INSERT INTO text_fragments VALUES(5310,64000,'Le preguntaron sus hijos acerca de qué clase de ave era aquella, y les dijo: "Para mí, solo es un cuevo, pero él se cree águila.',9,NULL);
-INSERT INTO text_fragments VALUES(5311,80000,'Pon tu esfuerzo y dedicación',9,NULL);
-INSERT INTO text_fragments VALUES(5312,84000,'En lo que realmente estás preparado, no en lo que no te corresponde.',9,NULL);
-INSERT INTO text_fragments VALUES(5313,92000,'Fin de fábula, esta grabación está en el dominio público.',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5305,1000,'Las fábulas de Esopo Grabado para librevox.org por Christina Chu Fábula número uno El águila, el cuervo y el pastor Lanzándose desde una cima, un águila arrebató a un corderito.',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5306,25000,'La vió',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5307,27000,'Un cuevo y tratando de imitar al águila, se lanzó sobre un canelo, pero con tan mal conocimiento en el arte que sus garras se enredaron en la lana, y patiendo al máximo sus alas no logró soltarse.',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5308,50000,'Viendo el pastor lo que sucedía, cogió al cuevo',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5309,56000,'y cortando las puntas de sus alas, se lo llevó a sus niños.',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5310,64000,'Le preguntaron sus hijos acerca de qué clase de ave era aquella, y les dijo: "Para mí, solo es un cuevo, pero él se cree águila.',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5311,80000,'Pon tu esfuerzo y dedicación',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5312,84000,'En lo que realmente estás preparado, no en lo que no te corresponde.',9,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5313,92000,'Fin de fábula, esta grabación está en el dominio público.',9,NULL);
 
-INSERT INTO text_fragments VALUES(5361,240,'once upon a time a wolf was lapping at a',11,NULL);
-INSERT INTO text_fragments VALUES(5362,3120,'spring on a hillside when looking up',11,NULL);
-INSERT INTO text_fragments VALUES(5363,6160,'what should he see but a lamb just',11,NULL);
-INSERT INTO text_fragments VALUES(5364,8240,'beginning to drink a little lower down',11,NULL);
-INSERT INTO text_fragments VALUES(5365,11040,'there''s my supper thought he if only I',11,NULL);
-INSERT INTO text_fragments VALUES(5366,14759,'can find some excuse to seize it then he',11,NULL);
-INSERT INTO text_fragments VALUES(5367,18720,'called out to the lamb how dare you',11,NULL);
-INSERT INTO text_fragments VALUES(5368,21680,'muddle the water from which I''m',11,NULL);
-INSERT INTO text_fragments VALUES(5369,24680,'drinking nay Master nay said the Lamkin',11,NULL);
-INSERT INTO text_fragments VALUES(5370,28840,'if the water be muddy up there I cannot',11,NULL);
-INSERT INTO text_fragments VALUES(5371,31039,'be the cause of it for it runs down from',11,NULL);
-INSERT INTO text_fragments VALUES(5372,33520,'you to',11,NULL);
-INSERT INTO text_fragments VALUES(5373,34640,'me well then said the wolf why did you',11,NULL);
-INSERT INTO text_fragments VALUES(5374,39120,'call me bad names this time last',11,NULL);
-INSERT INTO text_fragments VALUES(5375,42039,'year that cannot be said the lamb I am',11,NULL);
-INSERT INTO text_fragments VALUES(5376,45719,'only 6 months',11,NULL);
-INSERT INTO text_fragments VALUES(5377,47559,'old I don''t dare snarled the wolf if it',11,NULL);
-INSERT INTO text_fragments VALUES(5378,51840,'was not you then it was your father and',11,NULL);
-INSERT INTO text_fragments VALUES(5379,55600,'with that he rushed upon the poor little',11,NULL);
-INSERT INTO text_fragments VALUES(5380,57879,'lamb and ate her all all up but before',11,NULL);
-INSERT INTO text_fragments VALUES(5381,61920,'she died she gasped',11,NULL);
-INSERT INTO text_fragments VALUES(5382,64119,'out any excuse will serve a',11,NULL);
-INSERT INTO text_fragments VALUES(5383,67350,'[Music]',11,NULL);
-INSERT INTO text_fragments VALUES(5384,71439,'tyrant',11,NULL);
\ No newline at end of file
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5361,240,'once upon a time a wolf was lapping at a',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5362,3120,'spring on a hillside when looking up',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5363,6160,'what should he see but a lamb just',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5364,8240,'beginning to drink a little lower down',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5365,11040,'there''s my supper thought he if only I',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5366,14759,'can find some excuse to seize it then he',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5367,18720,'called out to the lamb how dare you',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5368,21680,'muddle the water from which I''m',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5369,24680,'drinking nay Master nay said the Lamkin',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5370,28840,'if the water be muddy up there I cannot',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5371,31039,'be the cause of it for it runs down from',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5372,33520,'you to',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5373,34640,'me well then said the wolf why did you',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5374,39120,'call me bad names this time last',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5375,42039,'year that cannot be said the lamb I am',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5376,45719,'only 6 months',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5377,47559,'old I don''t dare snarled the wolf if it',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5378,51840,'was not you then it was your father and',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5379,55600,'with that he rushed upon the poor little',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5380,57879,'lamb and ate her all all up but before',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5381,61920,'she died she gasped',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5382,64119,'out any excuse will serve a',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5383,67350,'[Music]',11,NULL);
+INSERT INTO text_fragments (id, start_ms, words, transcription_id, trashed) VALUES(5384,71439,'tyrant',11,NULL);
\ No newline at end of file
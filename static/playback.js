@@ -0,0 +1,109 @@
+// Follows the audio player on the transcription page: the text fragment
+// that is playing is highlighted in the listing and shown above it, also
+// when it is on another page. Fragments around the playback time are
+// loaded from the window API (app.text_fragment_window) and the playing
+// one is found with a binary search over start_ms, the order key the
+// server sorts and seeks by; a new window is loaded only when playback
+// leaves the loaded one.
+(function () {
+    var audio = document.querySelector("#audio-player audio");
+    var box = document.getElementById("now-playing");
+    if (!audio || !box) {
+        return;
+    }
+    var windowUrl = box.dataset.windowUrl;
+    var seekUrl = box.dataset.seekUrl;
+    var fragments = [];
+    var fromMs = Infinity;
+    var toMs = -Infinity;
+    var loading = false;
+    var currentId = null;
+    // after a failed window request the next one waits, doubling up to a minute
+    var retryDelayMs = 0;
+    var retryAt = 0;
+
+    // index of the last fragment starting at or before timeMs, -1 if none
+    function find(timeMs) {
+        var low = 0;
+        var high = fragments.length - 1;
+        var found = -1;
+        while (low <= high) {
+            var middle = (low + high) >> 1;
+            if (fragments[middle].start_ms <= timeMs) {
+                found = middle;
+                low = middle + 1;
+            } else {
+                high = middle - 1;
+            }
+        }
+        return found;
+    }
+
+    function show(fragment) {
+        var id = fragment ? fragment.id : null;
+        if (id === currentId) {
+            return;
+        }
+        var previous = document.getElementById("t-id-" + currentId);
+        if (previous) {
+            previous.classList.remove("playing-text-fragment");
+        }
+        currentId = id;
+        box.textContent = "";
+        box.hidden = !fragment;
+        if (!fragment) {
+            return;
+        }
+        var row = document.getElementById("t-id-" + id);
+        if (row) {
+            row.classList.add("playing-text-fragment");
+        }
+        box.appendChild(document.createTextNode(fragment.time + " " + fragment.words + " "));
+        if (!row) {
+            var link = document.createElement("a");
+            link.href = seekUrl + "&time=" + fragment.start_ms / 1000;
+            link.textContent = "Siirry riville";
+            box.appendChild(link);
+        }
+    }
+
+    function load(timeMs) {
+        loading = true;
+        fetch(windowUrl + "&time=" + timeMs / 1000)
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                fragments = data.fragments;
+                var current = fragments.findIndex(function (fragment) { return fragment.id === data.current_id; });
+                fromMs = current < 0 ? 0 : fragments[current].start_ms;
+                toMs = data.end || !fragments.length ? Infinity : fragments[fragments.length - 1].start_ms;
+                loading = false;
+                retryDelayMs = 0;
+                update();
+            })
+            .catch(function () {
+                loading = false;
+                retryDelayMs = Math.min(Math.max(retryDelayMs * 2, 1000), 60000);
+                retryAt = Date.now() + retryDelayMs;
+            });
+    }
+
+    function update() {
+        var timeMs = audio.currentTime * 1000;
+        if (timeMs < fromMs || timeMs >= toMs) {
+            if (!loading && Date.now() >= retryAt) {
+                load(timeMs);
+            }
+            return;
+        }
+        var index = find(timeMs);
+        show(index < 0 ? null : fragments[index]);
+    }
+
+    audio.addEventListener("timeupdate", update);
+    audio.addEventListener("seeked", update);
+})();
@@ -0,0 +1,78 @@
+// Draws the waveform peaks of the transcription audio (format in
+// audio_analysis.py) and marks the start times of the text fragments
+// listed on the page. Clicking the waveform seeks the audio player.
+(function () {
+    var canvas = document.getElementById("waveform");
+    if (!canvas) {
+        return;
+    }
+    var audio = document.querySelector("#audio-player audio");
+    var context = canvas.getContext("2d");
+    var markers = Array.prototype.map.call(
+        document.querySelectorAll("tr[data-start-ms]"),
+        function (row) { return Number(row.dataset.startMs); });
+    var peaks = null;
+    var durationMs = 0;
+
+    function draw() {
+        var width = canvas.width;
+        var height = canvas.height;
+        var middle = height / 2;
+        var count = peaks.length / 2;
+        context.clearRect(0, 0, width, height);
+        context.fillStyle = "#4a6d8c";
+        for (var x = 0; x < width; x++) {
+            var first = Math.floor(x * count / width);
+            var last = Math.max(first + 1, Math.floor((x + 1) * count / width));
+            var low = 0;
+            var high = 0;
+            for (var i = first; i < last && i < count; i++) {
+                low = Math.min(low, peaks[2 * i]);
+                high = Math.max(high, peaks[2 * i + 1]);
+            }
+            var top = middle - high / 128 * middle;
+            context.fillRect(x, top, 1, Math.max(1, (high - low) / 128 * middle));
+        }
+        context.fillStyle = "#d98c1f";
+        markers.forEach(function (startMs) {
+            context.fillRect(Math.round(startMs / durationMs * width), 0, 1, height);
+        });
+        if (audio) {
+            context.fillStyle = "#c0392b";
+            context.fillRect(Math.round(audio.currentTime * 1000 / durationMs * width), 0, 2, height);
+        }
+    }
+
+    fetch(canvas.dataset.peaksUrl)
+        .then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.arrayBuffer();
+        })
+        .then(function (buffer) {
+            var header = new DataView(buffer, 0, 16);
+            var magic = String.fromCharCode(
+                header.getUint8(0), header.getUint8(1), header.getUint8(2), header.getUint8(3));
+            if (magic !== "PEAK") {
+                return;
+            }
+            var sampleRate = header.getUint32(8, true);
+            var samplesPerPeak = header.getUint32(12, true);
+            peaks = new Int8Array(buffer, 16);
+            durationMs = peaks.length / 2 * samplesPerPeak * 1000 / sampleRate;
+            if (!durationMs) {
+                return;
+            }
+            canvas.hidden = false;
+            draw();
+            if (audio) {
+                audio.addEventListener("timeupdate", draw);
+                canvas.addEventListener("click", function (event) {
+                    var box = canvas.getBoundingClientRect();
+                    audio.currentTime = (event.clientX - box.left) / box.width * durationMs / 1000;
+                });
+            }
+        })
+        .catch(function () {});
+})();
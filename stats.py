@@ -0,0 +1,85 @@
+"""Consistency check and rebuild of the summary tables behind /stats.
+
+The stats_* tables and the transcription count in table_counts are kept up
+to date by triggers (see migrate.py). This command recomputes them from
+the transcriptions table and reports or repairs any difference.
+
+Usage:
+    python stats.py [--database PATH] [--rebuild]
+"""
+
+import argparse
+import sys
+import db
+from migrate import STATS_TABLES
+
+
+def _expected_counts(key, condition):
+    where = "WHERE " + condition.format(row="t") if condition else ""
+    sql = f"""SELECT {key.format(row="t")} as key, count(t.id) as count
+              FROM transcriptions t {where} GROUP BY 1"""
+    return {row["key"]: row["count"] for row in db.query(sql)}
+
+
+def _stored_counts(table, key_column):
+    sql = f"SELECT {key_column} as key, count FROM {table}"
+    return {row["key"]: row["count"] for row in db.query(sql)}
+
+
+def check_stats():
+    """Return (table, key, stored count, expected count) for every mismatch."""
+    differences = []
+    for table, key_definition, key, condition in STATS_TABLES:
+        key_column = key_definition.split()[0]
+        stored = _stored_counts(table, key_column)
+        expected = _expected_counts(key, condition)
+        for group in sorted(set(stored) | set(expected), key=str):
+            if stored.get(group, 0) != expected.get(group, 0):
+                differences.append((table, group, stored.get(group, 0), expected.get(group, 0)))
+    stored = db.query("SELECT count FROM table_counts WHERE name = 'transcriptions'")
+    stored = stored[0]["count"] if stored else 0
+    expected = db.query("SELECT count(id) as count FROM transcriptions")[0]["count"]
+    if stored != expected:
+        differences.append(("table_counts", "transcriptions", stored, expected))
+    return differences
+
+
+def rebuild_stats():
+    with db.transaction():
+        for table, key_definition, key, condition in STATS_TABLES:
+            key_column = key_definition.split()[0]
+            db.execute(f"DELETE FROM {table}")
+            where = "WHERE " + condition.format(row="t") if condition else ""
+            db.execute(f"""INSERT INTO {table} ({key_column}, count)
+                           SELECT {key.format(row="t")}, count(t.id) FROM transcriptions t
+                           {where} GROUP BY 1""")
+        db.execute("""INSERT OR REPLACE INTO table_counts (name, count)
+                      SELECT 'transcriptions', count(id) FROM transcriptions""")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the /stats summary tables.")
+    parser.add_argument("--database", default=db.DATABASE,
+                        help="SQLite database file (default: %(default)s)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="recompute the summary tables from the transcriptions table")
+    args = parser.parse_args(argv)
+    db.DATABASE = args.database
+    try:
+        differences = check_stats()
+        for table, group, stored, expected in differences:
+            print(f"{table} {group!r}: stored {stored}, expected {expected}")
+        if not differences:
+            print("statistics are consistent")
+            return 0
+        if args.rebuild:
+            rebuild_stats()
+            print("statistics rebuilt")
+            return 0
+        return 1
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
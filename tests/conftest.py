@@ -0,0 +1,56 @@
+"""Shared fixtures: a migrated temporary database and a logged-in client."""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["JOB_WORKER_THREADS"] = "0"
+# keep the metrics and uploaded audio of the test runs out of the repository
+_scratch = tempfile.mkdtemp(prefix="litteroinnit-tests-")
+os.environ["METRICS_DATABASE"] = os.path.join(_scratch, "metrics.db")
+os.environ["AUDIO_STORE_ROOT"] = os.path.join(_scratch, "audio_store")
+
+import db  # noqa: E402
+import migrate  # noqa: E402
+import app as application  # noqa: E402
+
+CSRF_TOKEN = "test-token"
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A database built from schema.sql and seed.sql and fully migrated."""
+    path = str(tmp_path / "test.db")
+    con = sqlite3.connect(path)
+    for name in ("schema.sql", "seed.sql"):
+        with open(os.path.join(ROOT, name), encoding="utf-8") as file:
+            con.executescript(file.read())
+    con.close()
+    monkeypatch.setattr(db, "DATABASE", path)
+    migrate.migrate()
+    db.close_connection()
+    yield path
+    db.close_connection()
+
+
+@pytest.fixture
+def app_context(database):
+    with application.app.app_context():
+        yield
+
+
+@pytest.fixture
+def client(database):
+    """A test client logged in as the seeded testi-user (id 1)."""
+    application.app.config["TESTING"] = True
+    client = application.app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = 1
+        session["username"] = "testi-user"
+        session["csrf_token"] = CSRF_TOKEN
+    return client
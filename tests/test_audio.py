@@ -0,0 +1,55 @@
+import io
+import os
+import wave
+import audio_store
+import db
+from conftest import CSRF_TOKEN
+
+
+def _wav(seconds):
+    data = io.BytesIO()
+    with wave.open(data, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(8000)
+        file.writeframes(b"\x00\x40" * 8000 * seconds)
+    return data.getvalue()
+
+
+def _upload(client, content, file_name):
+    response = client.post("/new_transcription", data={
+        "csrf_token": CSRF_TOKEN, "title": "ääni", "source_path": "", "source": "word",
+        "genre": "g", "raw_content": "00:00:01\nhei\n", "license": "", "record_date": "",
+        "duration_sec": "", "extra_meta_data": "",
+        "file": (io.BytesIO(content), file_name)})
+    assert response.status_code == 302
+    transcription_id = int(response.headers["Location"].rsplit("/", 1)[1])
+    with client.application.app_context():
+        sql = "SELECT audio_sha256, duration_sec FROM transcriptions WHERE id = ?"
+        return transcription_id, db.query(sql, [transcription_id])[0]
+
+
+def test_wav_peaks_are_computed_on_the_first_request(client):
+    transcription_id, row = _upload(client, _wav(5), "puhe.wav")
+    sha256 = row["audio_sha256"]
+    assert row["duration_sec"] == 5
+    # the upload reads only the headers
+    assert not os.path.exists(audio_store.peaks_path(sha256))
+
+    page = client.get(f"/transcription/{transcription_id}")
+    assert f"/audio/{sha256}/peaks".encode() in page.data
+
+    response = client.get(f"/audio/{sha256}/peaks")
+    assert response.status_code == 200
+    assert response.data[:4] == b"PEAK" and len(response.data) == 16 + 2 * 50
+    with client.application.app_context():
+        assert audio_store.get_audio_file(sha256)["has_peaks"]
+    assert client.get(f"/audio/{sha256}/peaks").data == response.data
+
+
+def test_files_without_peaks_answer_404(client):
+    _, row = _upload(client, b"ID3" + bytes(2000), "puhe.mp3")
+    assert client.get(f"/audio/{row['audio_sha256']}/peaks").status_code == 404
+    _, row = _upload(client, b"RIFF" + bytes(40), "rikki.wav")
+    assert client.get(f"/audio/{row['audio_sha256']}/peaks").status_code == 404
+    assert client.get("/audio/" + "0" * 64 + "/peaks").status_code == 404
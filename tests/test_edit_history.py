@@ -0,0 +1,70 @@
+import pytest
+import db
+import edit_history
+import transcriptions
+
+
+@pytest.mark.parametrize("old, new", [
+    ("", ""),
+    ("", "uusi teksti"),
+    ("vanha teksti", ""),
+    ("sama", "sama"),
+    ("Las fábulas de Esopo", "Las fábulas de Esopo, grabado"),
+    ("alku keski loppu", "alku loppu"),
+    ("ääkköset ja 😀", "ÄÄKKÖSET ja 😀!"),
+    ('"lainaus" [1, -2]', '"lainaus" [-1, 2]'),
+])
+def test_apply_delta_rebuilds_the_new_text(old, new):
+    assert edit_history.apply_delta(old, edit_history.encode_delta(old, new)) == new
+
+
+def test_delta_copies_skips_and_inserts():
+    assert edit_history.encode_delta("abcdef", "abXdef") == '[2,-1,"X",3]'
+
+
+def test_snapshot_versions():
+    assert [v for v in range(1, 25) if edit_history.is_snapshot_version(v, 10)] == [1, 11, 21]
+    assert all(edit_history.is_snapshot_version(v, 0) for v in range(1, 5))
+
+
+def test_encode_history_round_trip():
+    texts = [f"rivi {'x' * 40} versio {n}" for n in range(1, 24)]
+    versions = list(range(1, 24))
+    stored = edit_history.encode_history(texts, versions, interval=10)
+    full = [index for index, (words, _) in enumerate(stored) if words is not None]
+    assert full == [0, 10, 20, 22]
+    rows = [{"words": words, "delta": delta} for words, delta in stored]
+    assert edit_history.rebuild_texts(rows) == texts
+
+
+def test_a_delta_longer_than_the_text_is_not_used():
+    stored = edit_history.encode_history(["a", "b", "c"], [1, 2, 3], interval=10)
+    assert stored == [("a", None), ("b", None), ("c", None)]
+
+
+def test_saved_versions_are_compacted_and_checked(app_context, monkeypatch):
+    monkeypatch.setattr(edit_history, "SNAPSHOT_INTERVAL", 3)
+    fragment = transcriptions.get_text_fragment(
+        db.query("SELECT id FROM text_fragments WHERE transcription_id = 9 LIMIT 1")[0]["id"])
+    texts = [f"{fragment['words']} muokkaus {n}" for n in range(1, 8)]
+    for text in texts:
+        transcriptions.add_versioned_text_fragment(fragment["id"], fragment["start_ms"], text, 1)
+    history = edit_history.get_history(fragment["id"])
+    assert [row["words"] for row in history][-len(texts):] == texts
+    deltas = db.query("""SELECT count(*) AS count FROM text_fragment_edits
+                         WHERE text_fragment_id = ? AND delta IS NOT NULL""", [fragment["id"]])
+    assert deltas[0]["count"] > 0
+    assert edit_history.get_version_text(fragment["id"], history[-2]["version"]) == texts[-2]
+    assert edit_history.check(interval=3, progress=False)[1] == []
+
+
+def test_check_reports_a_damaged_delta(app_context, monkeypatch):
+    monkeypatch.setattr(edit_history, "SNAPSHOT_INTERVAL", 10)
+    fragment_id = db.query(
+        "SELECT id FROM text_fragments WHERE transcription_id = 9 LIMIT 1")[0]["id"]
+    for n in range(4):
+        transcriptions.add_versioned_text_fragment(fragment_id, 0, f"pitkä teksti numero {n}", 1)
+    db.execute("""UPDATE text_fragment_edits SET delta = '[3,"x"]'
+                  WHERE text_fragment_id = ? AND delta IS NOT NULL""", [fragment_id])
+    _, problems = edit_history.check(interval=10, progress=False)
+    assert [fragment for fragment, _ in problems] == [fragment_id]
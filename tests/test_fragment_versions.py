@@ -0,0 +1,56 @@
+import pytest
+import db
+import transcriptions
+from conftest import CSRF_TOKEN
+
+
+@pytest.fixture
+def fragment_id(app_context):
+    return db.query("SELECT id FROM text_fragments WHERE transcription_id = 9 LIMIT 1")[0]["id"]
+
+
+def _edit(client, fragment_id, words, version):
+    data = {"csrf_token": CSRF_TOKEN, "return_page": "1", "words": words}
+    if version is not None:
+        data["version"] = version
+    return client.post(f"/edit_text_fragment/{fragment_id}", data=data)
+
+
+def test_edit_based_on_the_current_version_is_saved(client, fragment_id):
+    assert _edit(client, fragment_id, "eka", 0).status_code == 302
+    assert _edit(client, fragment_id, "toka", 1).status_code == 302
+    fragment = transcriptions.get_text_fragment(fragment_id)
+    assert (fragment["words"], fragment["version"]) == ("toka", 2)
+
+
+def test_edit_based_on_an_old_version_conflicts(client, fragment_id):
+    assert _edit(client, fragment_id, "eka", 0).status_code == 302
+    response = _edit(client, fragment_id, "myöhästynyt", 0)
+    assert response.status_code == 409
+    # the form shows the current text and is now based on version 1
+    assert 'name="version" value="1"'.encode() in response.data
+    assert "myöhästynyt".encode() in response.data
+    assert transcriptions.get_text_fragment(fragment_id)["words"] == "eka"
+
+
+def test_form_without_a_version_overwrites(client, fragment_id):
+    assert _edit(client, fragment_id, "eka", 0).status_code == 302
+    assert _edit(client, fragment_id, "toka", None).status_code == 302
+
+
+def test_saves_based_on_the_same_version_conflict(fragment_id):
+    assert transcriptions.add_versioned_text_fragment(fragment_id, 0, "a", 1, 0) == 1
+    assert transcriptions.add_versioned_text_fragment(fragment_id, 0, "b", 1, 0) is None
+    assert transcriptions.add_versioned_text_fragment(fragment_id, 0, "c", 1) == 2
+
+
+def test_other_users_may_not_edit(client, fragment_id):
+    with client.session_transaction() as session:
+        session["user_id"] = 2
+    assert _edit(client, fragment_id, "vieras", 0).status_code == 403
+
+
+def test_csrf_token_is_required(client, fragment_id):
+    response = client.post(f"/edit_text_fragment/{fragment_id}",
+                           data={"return_page": "1", "words": "x", "version": 0})
+    assert response.status_code == 403
@@ -0,0 +1,86 @@
+import time
+import pytest
+import db
+import jobs
+
+
+@pytest.fixture
+def handler(app_context, monkeypatch):
+    """Run the jobs of kind "test" with the function the test assigns."""
+    calls = []
+
+    def run(job):
+        calls.append(job["id"])
+        if handler.action:
+            handler.action(job)
+    handler.action = None
+    handler.calls = calls
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "test", run)
+    return handler
+
+
+def test_a_transcription_has_one_active_job(app_context):
+    job_id = jobs.enqueue("split", 9, 1)
+    assert jobs.enqueue("split", 9, 1) == job_id
+    assert jobs.enqueue("remove_split_text", 9, 1) is None
+    assert jobs.enqueue("split", 11, 1) not in (None, job_id)
+
+
+def test_claim_runs_and_finishes_a_job(handler):
+    job_id = jobs.enqueue("test", 9, 1)
+    job = jobs.claim("w1")
+    assert (job["id"], job["state"], job["attempts"], job["worker"]) == (job_id, "running", 1, "w1")
+    assert jobs.claim("w2") is None
+    jobs.run(job)
+    assert jobs.get_job(job_id)["state"] == "done"
+    assert handler.calls == [job_id]
+    assert jobs.get_active_job(9) is None
+
+
+def test_an_unexpected_error_is_retried_until_max_attempts(handler, monkeypatch):
+    def crash(job):
+        raise RuntimeError("boom")
+    handler.action = crash
+    monkeypatch.setattr(jobs, "RETRY_DELAY_SECONDS", 0)
+    job_id = jobs.enqueue("test", 9, 1)
+    for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+        job = jobs.claim("w1")
+        assert job["attempts"] == attempt
+        jobs.run(job)
+    job = jobs.get_job(job_id)
+    assert job["state"] == "failed"
+    assert job["message"] == "RuntimeError: boom"
+    assert jobs.claim("w1") is None
+
+
+def test_a_job_error_fails_at_once(handler):
+    def refuse(job):
+        raise jobs.JobError("ei onnistu")
+    handler.action = refuse
+    job_id = jobs.enqueue("test", 9, 1)
+    jobs.run(jobs.claim("w1"))
+    job = jobs.get_job(job_id)
+    assert (job["state"], job["attempts"], job["message"]) == ("failed", 1, "ei onnistu")
+
+
+def test_a_stale_job_is_taken_over_and_the_slow_worker_stops(handler):
+    job_id = jobs.enqueue("test", 9, 1)
+    slow = jobs.claim("slow")
+    db.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?",
+               [time.time() - jobs.STALE_AFTER_SECONDS - 1, job_id])
+    fast = jobs.claim("fast")
+    assert fast["id"] == job_id and fast["attempts"] == 2
+
+    # the slow worker's next batch is rolled back and it gives up the job
+    with pytest.raises(jobs.JobLost):
+        with db.transaction():
+            db.execute("UPDATE transcriptions SET title = 'slow' WHERE id = 9")
+            jobs.update_progress(slow, 10, 10, 100)
+    assert db.query("SELECT title FROM transcriptions WHERE id = 9")[0]["title"] != "slow"
+
+    handler.action = lambda job: jobs.update_progress(job, 1, 1, 1)
+    jobs.run(slow)
+    assert jobs.get_job(job_id)["state"] == "running"
+    jobs.run(fast)
+    job = jobs.get_job(job_id)
+    assert (job["state"], job["worker"], job["rows_processed"]) == ("done", "fast", 1)
@@ -0,0 +1,40 @@
+import config
+
+
+def test_metrics_are_served_to_the_local_host(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert b"# TYPE http_requests_total counter" in response.data
+
+
+def test_metrics_are_refused_to_other_hosts(client):
+    response = client.get("/metrics", environ_base={"REMOTE_ADDR": "192.0.2.1"})
+    assert response.status_code == 403
+
+
+def test_metrics_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(config, "METRICS_TOKEN", "salainen")
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer väärä"}).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer salainen"},
+                          environ_base={"REMOTE_ADDR": "192.0.2.1"})
+    assert response.status_code == 200
+
+
+def test_recording_a_request_does_not_touch_the_database(monkeypatch):
+    import metrics
+
+    def no_database():
+        raise AssertionError("record_request opened the metrics database")
+    monkeypatch.setattr(metrics, "_connect", no_database)
+    monkeypatch.setattr(metrics, "FLUSH_INTERVAL_SECONDS", 0)
+    for _ in range(3):
+        metrics.record_request("index", "GET", 200, 0.01, 100, 2, 0.001)
+
+
+def test_flush_stores_the_pending_values(client):
+    import metrics
+    client.get("/")
+    metrics.flush()
+    assert not metrics._pending
+    assert 'http_requests_total{endpoint="index",method="GET",status="200"}' in metrics.render()
@@ -0,0 +1,15 @@
+import db
+import migrate
+
+
+def test_migrations_are_numbered_without_gaps():
+    versions = [version for version, _, _ in migrate.MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_every_migration_can_run_again(app_context):
+    # a database restored from a backup may have a migration's changes
+    # without its schema_version row
+    for _, _, migration in migrate.MIGRATIONS:
+        with db.transaction():
+            migration()
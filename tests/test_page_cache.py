@@ -0,0 +1,43 @@
+import pytest
+import page_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    page_cache.clear()
+    yield
+    page_cache.clear()
+
+
+def test_empty_entries_are_evicted_by_count(monkeypatch):
+    monkeypatch.setattr(page_cache, "MAX_ENTRIES", 3)
+    for number in range(5):
+        page_cache.put((1, number), "", 0)
+    assert page_cache.get((1, 0)) is None and page_cache.get((1, 1)) is None
+    assert [page_cache.get((1, number)) for number in (2, 3, 4)] == ["", "", ""]
+
+
+def test_every_entry_is_charged_its_overhead(monkeypatch):
+    monkeypatch.setattr(page_cache, "MAX_BYTES", 3 * page_cache.ENTRY_OVERHEAD_BYTES)
+    for number in range(4):
+        page_cache.put((1, number), "x", 0)
+    assert page_cache.get((1, 0)) is None
+    assert page_cache.get((1, 3)) == "x"
+
+
+def test_least_recently_used_entry_goes_first(monkeypatch):
+    monkeypatch.setattr(page_cache, "MAX_ENTRIES", 2)
+    page_cache.put((1, "a"), "a", 10)
+    page_cache.put((1, "b"), "b", 10)
+    page_cache.get((1, "a"))
+    page_cache.put((1, "c"), "c", 10)
+    assert page_cache.get((1, "b")) is None
+    assert page_cache.get((1, "a")) == "a"
+
+
+def test_invalidate_drops_the_entries_of_one_transcription():
+    page_cache.put((1, 1), "a", 10)
+    page_cache.put((2, 1), "b", 10)
+    page_cache.invalidate(1)
+    assert page_cache.get((1, 1)) is None
+    assert page_cache.get((2, 1)) == "b"
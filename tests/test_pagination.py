@@ -0,0 +1,59 @@
+import pytest
+import db
+import transcriptions
+
+PAGE_SIZE = transcriptions.FRAGMENT_PAGE_SIZE
+
+
+@pytest.fixture
+def transcription_id(app_context):
+    db.execute("INSERT INTO transcriptions (title, source, user_id) VALUES ('sivut', 'word', 1)")
+    transcription_id = db.last_insert_id()
+    # inserted out of order, with runs of equal start times across page breaks
+    starts = [(n // 3) * 1000 for n in range(2 * PAGE_SIZE + 5)]
+    transcriptions.add_text_fragments(
+        transcription_id, [(start, f"rivi {n}") for n, start in reversed(list(enumerate(starts)))])
+    return transcription_id
+
+
+def _ordered_ids(transcription_id):
+    sql = """SELECT id FROM text_fragments WHERE transcription_id = ? AND trashed IS NULL
+             ORDER BY start_ms, id"""
+    return [row["id"] for row in db.query(sql, [transcription_id])]
+
+
+def _pages(transcription_id):
+    count = transcriptions.get_text_fragment_page_count(transcription_id)
+    return [[row[0] for row in transcriptions.get_text_fragments_paginated(transcription_id, page)]
+            for page in range(1, count + 1)]
+
+
+def test_pages_split_the_ordered_fragments_without_overlap(transcription_id):
+    ids = _ordered_ids(transcription_id)
+    pages = _pages(transcription_id)
+    assert pages == [ids[start:start + PAGE_SIZE] for start in range(0, len(ids), PAGE_SIZE)]
+    assert transcriptions.get_text_fragments_paginated(transcription_id, len(pages) + 1) == []
+
+
+def test_every_fragment_resolves_to_its_page(transcription_id):
+    for page, ids in enumerate(_pages(transcription_id), 1):
+        for fragment_id in ids:
+            page_of_fragment = transcriptions.get_the_page_of_text_fragment(fragment_id)
+            assert page_of_fragment == (page, transcription_id)
+
+
+def test_pages_follow_trashed_and_added_fragments(transcription_id):
+    first_page = _pages(transcription_id)[0]
+    transcriptions.remove_text_fragment(first_page[0])
+    transcriptions.add_text_fragments(transcription_id, [(-1, "alkuun")])
+    ids = _ordered_ids(transcription_id)
+    assert first_page[0] not in ids
+    assert _pages(transcription_id) == [ids[start:start + PAGE_SIZE]
+                                        for start in range(0, len(ids), PAGE_SIZE)]
+
+
+def test_a_page_past_the_end_redirects_to_the_last_one(client, transcription_id):
+    response = client.get(f"/transcription/{transcription_id}/9")
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith(f"/transcription/{transcription_id}/3")
+    assert client.get(f"/transcription/{transcription_id}/3").status_code == 200
@@ -0,0 +1,54 @@
+import pytest
+import help_functions
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1:33:00", 5580000),
+    ("93:00", 5580000),
+    ("5580.5", 5580500),
+    ("0", 0),
+])
+def test_parse_playback_time(value, expected):
+    assert help_functions.parse_playback_time(value) == expected
+
+
+@pytest.mark.parametrize("value", [
+    None, "", "1:2:3:4", "abc", "1:xx", "::", "-5", "1e400", "nan",
+])
+def test_parse_playback_time_rejects_invalid_values(value):
+    assert help_functions.parse_playback_time(value) is None
+
+
+def test_convert_hms_to_seconds_rejects_more_than_three_parts():
+    with pytest.raises(ValueError):
+        help_functions.convert_hms_to_seconds("1:2:3:4")
+
+
+@pytest.mark.parametrize("time", ["1:2:3:4", "abc", "-1"])
+def test_seek_and_window_reject_invalid_time(client, time):
+    assert client.get("/transcription/9/seek", query_string={"time": time}).status_code == 400
+    assert client.get("/transcription/9/fragments",
+                      query_string={"time": time}).status_code == 400
+
+
+def test_seek_finds_the_fragment_playing(client):
+    response = client.get("/transcription/9/seek", query_string={"time": "0:00:26"})
+    assert response.status_code == 200
+    assert response.json["start_ms"] == 25000
+
+
+def test_window_is_sorted_and_keyed_by_the_same_start_ms(client, app_context):
+    import db
+    # an edited start time out of page order must not reorder the window
+    first, second = db.query("""SELECT id, start_ms FROM text_fragments
+                                WHERE transcription_id = 9 ORDER BY start_ms, id LIMIT 2""")
+    db.execute("UPDATE text_fragments SET current_start_ms = 0 WHERE id = ?", [second["id"]])
+    response = client.get("/transcription/9/fragments",
+                          query_string={"time": second["start_ms"] / 1000, "before": 1})
+    assert response.status_code == 200
+    fragments = response.json["fragments"]
+    assert [f["id"] for f in fragments[:2]] == [first["id"], second["id"]]
+    assert response.json["current_id"] == second["id"]
+    starts = [f["start_ms"] for f in fragments]
+    assert starts == sorted(starts)
+    assert fragments[1]["start_ms"] == second["start_ms"]
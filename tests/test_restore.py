@@ -0,0 +1,71 @@
+import pytest
+import db
+import help_functions
+import jobs
+import transcriptions
+from conftest import CSRF_TOKEN
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2025-11-01T12:30", "2025-11-01 12:30:00"),
+    ("2025-11-01T12:30:45", "2025-11-01 12:30:45"),
+    (" 2025-11-01 12:30 ", "2025-11-01 12:30:00"),
+])
+def test_parse_timestamp(value, expected):
+    assert help_functions.parse_timestamp(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, "", "eilen", "2025-13-01T12:00", "1:2:3:4"])
+def test_parse_timestamp_rejects_invalid_values(value):
+    assert help_functions.parse_timestamp(value) is None
+
+
+@pytest.fixture
+def edited_fragment(app_context):
+    """A fragment of transcription 9 edited to "eka" in 2025 and "toka" in 2026."""
+    fragment = db.query("""SELECT id, start_ms FROM text_fragments WHERE transcription_id = 9
+                           ORDER BY start_ms LIMIT 1""")[0]
+    for words, created_at in (("eka", "2025-01-01 10:00:00"), ("toka", "2026-01-01 10:00:00")):
+        version = transcriptions.add_versioned_text_fragment(
+            fragment["id"], fragment["start_ms"], words, 1)
+        db.execute("""UPDATE text_fragment_edits SET created_at = ?
+                      WHERE text_fragment_id = ? AND version = ?""",
+                   [created_at, fragment["id"], version])
+    return fragment["id"]
+
+
+def _restore(client, at, transcription_id=9):
+    return client.post(f"/transcription/{transcription_id}/restore",
+                       data={"csrf_token": CSRF_TOKEN, "at": at})
+
+
+def test_page_shows_the_texts_as_of_a_moment(client, edited_fragment):
+    assert "eka".encode() in client.get("/transcription/9/1?at=2025-06-01T00:00").data
+    assert b"toka" not in client.get("/transcription/9/1?at=2025-06-01T00:00").data
+    assert b"toka" in client.get("/transcription/9/1").data
+
+
+def test_restore_saves_the_old_texts_as_new_versions(client, edited_fragment):
+    response = _restore(client, "2025-06-01T00:00")
+    assert response.status_code == 302
+    fragment = transcriptions.get_text_fragment(edited_fragment)
+    assert (fragment["words"], fragment["version"]) == ("eka", 3)
+
+
+def test_restore_with_an_invalid_time_changes_nothing(client, edited_fragment):
+    assert _restore(client, "1:2:3:4").status_code == 302
+    assert transcriptions.get_text_fragment(edited_fragment)["words"] == "toka"
+
+
+def test_restore_waits_for_an_active_job(client, edited_fragment):
+    jobs.enqueue("split", 9, 1)
+    _restore(client, "2025-06-01T00:00")
+    assert transcriptions.get_text_fragment(edited_fragment)["words"] == "toka"
+
+
+def test_restore_requires_the_right_to_edit(client, edited_fragment):
+    assert _restore(client, "2025-06-01T00:00", transcription_id=999).status_code == 404
+    with client.session_transaction() as session:
+        session["user_id"] = 2
+    assert _restore(client, "2025-06-01T00:00").status_code == 403
+    assert transcriptions.get_text_fragment(edited_fragment)["words"] == "toka"
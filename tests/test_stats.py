@@ -0,0 +1,43 @@
+import db
+import stats
+import transcriptions
+
+
+def _genre_counts():
+    return {row["genre"]: row["count"] for row in transcriptions.get_genre_stats()}
+
+
+def _grouped_genre_counts():
+    sql = "SELECT genre, count(id) as count FROM transcriptions GROUP BY genre"
+    return {row["genre"]: row["count"] for row in db.query(sql)}
+
+
+def test_missing_and_empty_genres_are_counted_apart(app_context):
+    for genre in (None, None, "", "Satu"):
+        db.execute("INSERT INTO transcriptions (title, genre, source, user_id) VALUES (?, ?, ?, 1)",
+                   ["uusi", genre, "word"])
+    counts = _genre_counts()
+    assert counts == _grouped_genre_counts()
+    assert counts[None] >= 2 and counts[""] >= 1
+    assert stats.check_stats() == []
+
+
+def test_triggers_move_counts_between_missing_and_empty(app_context):
+    db.execute("""INSERT INTO transcriptions (title, genre, source, user_id)
+                  VALUES ('a', NULL, NULL, 1)""")
+    transcription_id = db.last_insert_id()
+    db.execute("UPDATE transcriptions SET genre = '', source = '' WHERE id = ?", [transcription_id])
+    assert _genre_counts() == _grouped_genre_counts()
+    db.execute("DELETE FROM transcriptions WHERE id = ?", [transcription_id])
+    assert _genre_counts() == _grouped_genre_counts()
+    assert stats.check_stats() == []
+
+
+def test_rebuild_keeps_the_groups(app_context):
+    db.execute("INSERT INTO transcriptions (title, genre, user_id) VALUES ('a', NULL, 1)")
+    db.execute("INSERT INTO transcriptions (title, genre, user_id) VALUES ('b', '', 1)")
+    db.execute("DELETE FROM stats_genre")
+    assert stats.check_stats()
+    stats.rebuild_stats()
+    assert stats.check_stats() == []
+    assert _genre_counts() == _grouped_genre_counts()
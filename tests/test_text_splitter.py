@@ -0,0 +1,89 @@
+import io
+import json
+import pytest
+import db
+import jobs
+import transcriptions
+from text_splitter_help_functions import SplitError, split_transcription
+from conftest import CSRF_TOKEN
+
+VTT = """WEBVTT
+
+NOTE tekijä
+
+1
+00:00:01.000 --> 00:00:02.000
+eka rivi
+jatkuu
+
+2
+01:00:03,500 --> 01:00:04.000
+toka
+"""
+
+WORD = "00:00:01\r\nLas fábulas\r\n00:00:25\r\nLa vió\r\n"
+
+YOUTUBE = json.dumps({"events": [
+    {"tStartMs": 0, "dDurationMs": 10},
+    {"tStartMs": 1000, "segs": [{"utf8": "hei "}, {"utf8": "maailma"}]},
+    {"tStartMs": 2000, "segs": [{"utf8": "\n"}]},
+    {"tStartMs": 3000, "segs": [{"utf8": "moi"}]},
+]})
+
+
+def _split(source, raw):
+    return list(split_transcription(source, raw))
+
+
+@pytest.mark.parametrize("source, raw, expected", [
+    ("webvtt", VTT, [(1000, "eka rivi jatkuu"), (3603500, "toka")]),
+    ("word", WORD, [(1000, "Las fábulas"), (25000, "La vió")]),
+    ("youtube", YOUTUBE, [(1000, "hei maailma"), (3000, "moi")]),
+])
+def test_splitters(source, raw, expected):
+    assert _split(source, raw) == expected
+
+
+@pytest.mark.parametrize("source, raw", [("webvtt", VTT), ("word", WORD), ("youtube", YOUTUBE)])
+def test_chunk_boundaries_do_not_matter(source, raw):
+    chunks = [raw[start:start + 7] for start in range(0, len(raw), 7)]
+    assert _split(source, chunks) == _split(source, raw) == _split(source, io.StringIO(raw))
+
+
+@pytest.mark.parametrize("source, raw", [
+    ("webvtt", ""),
+    ("webvtt", "WEBVTT\n\npelkkää tekstiä\n"),
+    ("word", ""),
+    ("word", "teksti ilman aikaleimoja\n1:2:3\n"),
+    ("youtube", ""),
+    ("youtube", "[]"),
+    ("youtube", '{"events": [1]}'),
+    ("youtube", '{"events": [{"segs": [{"utf8": "x"}]}]}'),
+    ("youtube", '{"muuta": []}'),
+    ("youtube", '{"events": [{"tStartMs": 1, "segs": []}'),
+])
+def test_malformed_input_raises_split_error(source, raw):
+    with pytest.raises(SplitError):
+        _split(source, raw)
+
+
+def test_unknown_source_raises_key_error():
+    with pytest.raises(KeyError):
+        split_transcription("docx", "")
+
+
+def test_a_failed_split_job_reports_the_error(client):
+    response = client.post("/new_transcription", data={
+        "csrf_token": CSRF_TOKEN, "title": "rikki", "source_path": "", "source": "webvtt",
+        "genre": "g", "raw_content": "ei aikaleimoja", "license": "", "record_date": "",
+        "duration_sec": "", "extra_meta_data": "", "file": (io.BytesIO(b""), "")})
+    transcription_id = int(response.headers["Location"].rsplit("/", 1)[1])
+    assert client.get(f"/text_fragments/{transcription_id}").status_code == 302
+    with client.application.app_context():
+        jobs.work("test", once=True)
+        job = jobs.get_latest_job(transcription_id)
+        assert job["state"] == "failed" and job["message"].startswith("Tekstinjako epäonnistui")
+        assert transcriptions.get_all_text_fragments_count(transcription_id) == 0
+        assert not db.query("SELECT 1 FROM jobs WHERE state = 'queued'")
+    page = client.get(f"/transcription/{transcription_id}")
+    assert "Tekstinjako epäonnistui".encode() in page.data
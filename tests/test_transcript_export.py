@@ -0,0 +1,46 @@
+import re
+import db
+import transcript_export
+
+
+def _export(transcription_id, export_format):
+    return "".join(transcript_export.export_transcription(transcription_id, export_format))
+
+
+def _cue_times(vtt):
+    return re.findall(r"^(\S+) --> (\S+)$", vtt, flags=re.M)
+
+
+def test_vtt_cues_follow_the_current_start_times(app_context):
+    # move the last fragment before the first one by editing its start time
+    last = db.query("""SELECT id FROM text_fragments WHERE transcription_id = 9
+                       ORDER BY start_ms DESC LIMIT 1""")[0]
+    db.execute("UPDATE text_fragments SET current_start_ms = 0 WHERE id = ?", [last["id"]])
+    times = _cue_times(_export(9, "vtt"))
+    assert times[0][0] == "00:00:00.000"
+    starts = [start for start, _ in times]
+    assert starts == sorted(starts)
+    assert all(start <= end for start, end in times)
+
+
+def test_vtt_cue_text_escapes_the_timing_arrow():
+    text = transcript_export._vtt_cue_text("a --> b <i>&")
+    assert "-->" not in text
+    assert text == "a --&gt; b &lt;i&gt;&amp;"
+
+
+def test_cue_text_drops_blank_lines():
+    assert transcript_export._cue_text("eka\n\n  \r\ntoka \n") == "eka\ntoka"
+
+
+def test_vtt_export_keeps_each_cue_in_one_block(app_context):
+    first = db.query("""SELECT id FROM text_fragments WHERE transcription_id = 9
+                        ORDER BY start_ms LIMIT 1""")[0]
+    db.execute("UPDATE text_fragments SET current_words = ? WHERE id = ?",
+               ["rivi --> toinen\n\nkolmas", first["id"]])
+    vtt = _export(9, "vtt")
+    header, *cues = vtt.strip().split("\n\n")
+    assert header == "WEBVTT"
+    assert cues[0].split("\n")[1:] == ["rivi --&gt; toinen", "kolmas"]
+    assert all(" --> " in cue.split("\n")[0] and "-->" not in "".join(cue.split("\n")[1:])
+               for cue in cues)
@@ -1,6 +1,27 @@
+"""Splitters that turn raw timestamped transcripts into text fragments.
+
+Every splitter is a generator yielding (start_ms, text) tuples in one pass
+over its input. The input can be a string, a text file object or an
+iterable of text chunks, so large uploads can be split without reading
+them fully into memory.
+Malformed input raises SplitError.
+"""
+
 import re
 import json
-from datetime import datetime
+
+READ_CHUNK_SIZE = 64 * 1024
+
+VTT_TIMING_PATTERN = re.compile(
+    r'^\s*(?:(\d+):)?(\d\d):(\d\d)[.,](\d\d\d)\s+-->\s+')
+WORD_TIMESTAMP_PATTERN = re.compile(r'^(\d{2}):(\d{2}):(\d{2})$')
+JSON_WHITESPACE_PATTERN = re.compile(r'[ \t\n\r]*')
+
+_json_decoder = json.JSONDecoder()
+
+
+class SplitError(ValueError):
+    """Raised when the raw content does not match the selected format."""
 
 
 def hhmmss_to_milliseconds(time_string):
@@ -14,67 +35,200 @@ def hhmmss_to_milliseconds(time_string):
     return milliseconds
 
 
-def chunk(array, size):
-    chunks = []
-    for i in range(0, len(array), size):
-        chunks.append(array[i:i + size])
-    return chunks
-
-
-def getSrtSlices(raw_contents):
-    pattern = r'\d+\r?\n(\d\d:\d\d:\d\d\.\d\d\d \-)'
-    raw_contents_arr = re.split(pattern, raw_contents)
-    raw_contents_arr2 = raw_contents_arr[:]
-    if raw_contents_arr[0] == '':
-        raw_contents_arr2 = raw_contents_arr[1:]
-    raw_contents_arr3 = chunk(raw_contents_arr2, 2)
-    raw_contents_arr4 = ["".join(subtitle) for subtitle in raw_contents_arr3]
-    return raw_contents_arr4
+def _iter_chunks(raw_contents):
+    # text chunks from a string, a text file object or an iterable of strings
+    if isinstance(raw_contents, str):
+        yield raw_contents
+    elif hasattr(raw_contents, "read"):
+        while True:
+            data = raw_contents.read(READ_CHUNK_SIZE)
+            if not data:
+                return
+            yield data
+    else:
+        yield from raw_contents
+
+
+def _iter_lines(raw_contents):
+    # lines without line endings, whatever the chunk boundaries are
+    rest = ""
+    for data in _iter_chunks(raw_contents):
+        start = 0
+        length = len(data)
+        while True:
+            end = data.find("\n", start)
+            if end == -1:
+                rest = rest + data[start:] if rest else data[start:]
+                break
+            line = data[start:end]
+            if rest:
+                line = rest + line
+                rest = ""
+            yield line.rstrip("\r")
+            start = end + 1
+            if start == length:
+                break
+    if rest:
+        yield rest.rstrip("\r")
 
 
 def split_web_vtt(raw_contents):
-    timespatt = r'(\d\d:\d\d:\d\d\.\d\d\d) \-\-> (\d\d:\d\d:\d\d\.\d\d\d)'
-    raw_contents_arr = getSrtSlices(raw_contents)
-    start_time_0 = datetime(1900, 1, 1, 0, 0, 0)
-    test_fragments_with_timestamps = []
-    for i, row in enumerate(raw_contents_arr[:]):
-        i, row
-        row_split = re.split(r'\r?\n', row)
-        row_split = [r for r in row_split if r != '']
-
-        assert len(row_split) == 2
-        time_str, texti = row_split
-
-        texti = texti.strip()
-        start, stop = re.findall(timespatt, row)[0]
-        start, stop
-
-        start_time = datetime.strptime(start, "%H:%M:%S.%f")
-
-        timDelta = start_time - start_time_0
-        msecs = int(timDelta.seconds * 1000 + timDelta.microseconds / 1000)
-        test_fragments_with_timestamps.append((msecs, texti))
-    return test_fragments_with_timestamps
+    """Split WebVTT (or SRT) cues.
+
+    Header, NOTE blocks and cue identifiers are skipped. The lines of a
+    multi-line cue are joined with a space and empty cues are dropped.
+    Input without a single cue timing line raises SplitError.
+    """
+    start_ms = None
+    text_lines = []
+    found_cue = False
+    for line in _iter_lines(raw_contents):
+        if start_ms is None:
+            match = VTT_TIMING_PATTERN.match(line)
+            if match:
+                found_cue = True
+                hours, minutes, seconds, millis = match.groups()
+                start_ms = ((int(hours or 0) * 60 + int(minutes)) * 60
+                            + int(seconds)) * 1000 + int(millis)
+            continue
+        if line.strip():
+            text_lines.append(line.strip())
+            continue
+        if text_lines:
+            yield start_ms, " ".join(text_lines)
+        start_ms = None
+        text_lines = []
+    if start_ms is not None and text_lines:
+        yield start_ms, " ".join(text_lines)
+    if not found_cue:
+        raise SplitError("no WebVTT cue timing line found")
 
 
 def split_word_transcription(raw_contents):
-    pattern = r'(\d{2}:\d{2}:\d{2})\r?\n((?:.|\r?\n)*?)(?=\r?\n\d{2}:\d{2}:\d{2}\r?\n|$)'
-    matches = re.findall(pattern, raw_contents.strip())
-    result_array = [[timestamp, part.strip()] for timestamp, part in matches]
-    test_fragments_with_timestamps = [
-        (hhmmss_to_milliseconds(time_str),
-         words.strip()) for time_str,
-        words in result_array]
-    return test_fragments_with_timestamps
+    """Split MS Word transcribe output: an hh:mm:ss line followed by text.
+
+    Input without a single timestamp line raises SplitError.
+    """
+    start_ms = None
+    text_lines = []
+    for line in _iter_lines(raw_contents):
+        match = WORD_TIMESTAMP_PATTERN.match(line.strip())
+        if match:
+            if start_ms is not None:
+                yield start_ms, "\n".join(text_lines).strip()
+            hours, minutes, seconds = match.groups()
+            start_ms = ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000
+            text_lines = []
+        elif start_ms is not None:
+            text_lines.append(line)
+    if start_ms is None:
+        raise SplitError("no hh:mm:ss timestamp line found")
+    yield start_ms, "\n".join(text_lines).strip()
+
+
+def _iter_json_array(raw_contents, key):
+    """Yield the items of the top level array ``key`` of a JSON object.
+
+    Only one item at a time is decoded, so the whole document is never
+    held in memory when reading from a file.
+    """
+    chunks = _iter_chunks(raw_contents)
+    buffer = ""
+    pos = 0
+    exhausted = False
+
+    def read_more():
+        nonlocal buffer, pos, exhausted
+        data = next(chunks, None)
+        if data is None:
+            exhausted = True
+            return False
+        buffer = buffer[pos:] + data
+        pos = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            pos = JSON_WHITESPACE_PATTERN.match(buffer, pos).end()
+            if pos < len(buffer) or not read_more():
+                return
+
+    def expect(char):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] != char:
+            raise SplitError(f"expected '{char}' at JSON position {pos}")
+        pos += 1
+
+    def decode_value():
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as error:
+                if exhausted or not read_more():
+                    raise SplitError(str(error)) from error
+                continue
+            # a number can continue in the next chunk
+            if end == len(buffer) and not exhausted and read_more():
+                continue
+            pos = end
+            return value
+
+    expect("{")
+    skip_whitespace()
+    if buffer[pos:pos + 1] == "}":
+        raise SplitError(f"JSON object has no '{key}' array")
+    while True:
+        name = decode_value()
+        expect(":")
+        if name == key:
+            expect("[")
+            skip_whitespace()
+            if buffer[pos:pos + 1] == "]":
+                return
+            while True:
+                yield decode_value()
+                skip_whitespace()
+                if buffer[pos:pos + 1] == "]":
+                    return
+                expect(",")
+        decode_value()
+        skip_whitespace()
+        if buffer[pos:pos + 1] == "}":
+            raise SplitError(f"JSON object has no '{key}' array")
+        expect(",")
 
 
 def split_youtube_transcription(raw_content):
-    timed_text_dict = json.loads(raw_content)
-    events = timed_text_dict['events']
-    test_fragments_with_timestamps = [(e['tStartMs'], "".join(
-        [s['utf8'] for s in e['segs']])) for e in events if 'segs' in e]
-    test_fragments_with_timestamps = [
-        (tStartMsm,
-         text) for tStartMsm,
-        text in test_fragments_with_timestamps if text.strip() != '']
-    return test_fragments_with_timestamps
+    """Split YouTube timedtext (json3) captions, skipping empty events."""
+    for event in _iter_json_array(raw_content, "events"):
+        if not isinstance(event, dict):
+            raise SplitError(f"invalid caption event: {event!r}")
+        if 'segs' not in event:
+            continue
+        try:
+            text = "".join(s['utf8'] for s in event['segs'] if 'utf8' in s)
+            start_ms = event['tStartMs']
+        except (KeyError, TypeError) as error:
+            raise SplitError(f"invalid caption event: {error}") from error
+        if text.strip() != '':
+            yield start_ms, text
+
+
+SPLITTERS = {
+    'youtube': split_youtube_transcription,
+    'word': split_word_transcription,
+    'webvtt': split_web_vtt,
+}
+
+
+def split_transcription(source, raw_contents):
+    """Return the (start_ms, text) generator for the given source format.
+
+    Raises:
+        KeyError: If the source format has no splitter.
+    """
+    return SPLITTERS[source](raw_contents)
@@ -0,0 +1,144 @@
+"""Export of the current text fragments of a transcription.
+
+Every exporter is a generator that reads (start_ms, words) fragments in
+the order of their current start_ms, not in page order (see
+transcriptions.iter_text_fragments), and yields the file as text chunks,
+so a transcription of any length is written with constant memory. A cue
+ends where the next fragment starts; the last one lasts
+LAST_CUE_DURATION_MS.
+
+The JSON export uses the YouTube timedtext (json3) layout and the text
+export the MS Word transcribe layout, so both can be imported again with
+the splitters in text_splitter_help_functions.
+
+Usage:
+    python transcript_export.py [--database PATH] [--output FILE] TRANSCRIPTION_ID FORMAT
+"""
+
+import sys
+import json
+import argparse
+import db
+import transcriptions
+
+LAST_CUE_DURATION_MS = 5000
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+
+def _with_end_times(fragments):
+    # (start_ms, end_ms, words) using the start of the next fragment
+    previous = None
+    for fragment in fragments:
+        start_ms, words = fragment["start_ms"], fragment["words"]
+        if previous is not None:
+            yield previous[0], max(start_ms, previous[0]), previous[1]
+        previous = (start_ms, words)
+    if previous is not None:
+        yield previous[0], previous[0] + LAST_CUE_DURATION_MS, previous[1]
+
+
+def _timestamp(milliseconds, separator):
+    seconds, millis = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}{separator}{millis:03}"
+
+
+def _cue_text(words):
+    # a blank line would end the cue
+    return "\n".join(line.strip() for line in words.splitlines() if line.strip())
+
+
+def _vtt_cue_text(words):
+    # a WebVTT cue payload must not contain "-->"; escaping ">" as an
+    # entity turns it into "--&gt;", which players show as "-->"
+    return _cue_text(words).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _buffered(parts):
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= OUTPUT_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _vtt(fragments):
+    yield "WEBVTT\n\n"
+    for start_ms, end_ms, words in _with_end_times(fragments):
+        yield (f"{_timestamp(start_ms, '.')} --> {_timestamp(end_ms, '.')}\n"
+               f"{_vtt_cue_text(words)}\n\n")
+
+
+def _srt(fragments):
+    for number, (start_ms, end_ms, words) in enumerate(_with_end_times(fragments), 1):
+        yield f"{number}\n{_timestamp(start_ms, ',')} --> {_timestamp(end_ms, ',')}\n{_cue_text(words)}\n\n"
+
+
+def _json(fragments):
+    yield '{"events": ['
+    separator = "\n"
+    for start_ms, end_ms, words in _with_end_times(fragments):
+        event = {"tStartMs": start_ms, "dDurationMs": end_ms - start_ms, "segs": [{"utf8": words}]}
+        yield separator + json.dumps(event, ensure_ascii=False)
+        separator = ",\n"
+    yield "\n]}\n"
+
+
+def _txt(fragments):
+    for fragment in fragments:
+        seconds = fragment["start_ms"] // 1000
+        yield f"{seconds // 3600:02}:{seconds // 60 % 60:02}:{seconds % 60:02}\n{fragment['words'].strip()}\n"
+
+
+EXPORTERS = {
+    "vtt": (_vtt, "text/vtt"),
+    "srt": (_srt, "application/x-subrip"),
+    "json": (_json, "application/json"),
+    "txt": (_txt, "text/plain"),
+}
+
+
+def export_transcription(transcription_id, export_format):
+    """Return a generator of text chunks of the transcription in export_format.
+
+    Raises:
+        KeyError: If the format has no exporter.
+    """
+    exporter = EXPORTERS[export_format][0]
+    return _buffered(exporter(transcriptions.iter_text_fragments(transcription_id)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the text fragments of a transcription.")
+    parser.add_argument("transcription_id", type=int)
+    parser.add_argument("format", choices=sorted(EXPORTERS))
+    parser.add_argument("--database", default=db.DATABASE,
+                        help="SQLite database file (default: %(default)s)")
+    parser.add_argument("--output", help="output file (default: standard output)")
+    args = parser.parse_args(argv)
+    db.DATABASE = args.database
+    try:
+        if not transcriptions.get_transcription(args.transcription_id):
+            print("no transcription", args.transcription_id, file=sys.stderr)
+            return 1
+        output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+        try:
+            for chunk in export_transcription(args.transcription_id, args.format):
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+        return 0
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,16 @@
+import re
+import zlib
+import hashlib
+import sqlite3
+from itertools import islice, groupby
 import db
+import edit_history
+
+BULK_INSERT_BATCH_SIZE = 5000
+FRAGMENT_PAGE_SIZE = 20
+RAW_CONTENT_CHUNK_SIZE = 256 * 1024
+RAW_CONTENT_PREVIEW_LENGTH = 50
+RESTORE_BATCH_SIZE = 1000
 
 
 def get_transcriptions():
@@ -23,8 +35,34 @@ def get_transcriptions_paginated(page, page_size):
     return db.query(sql, [limit, offset])
 
 
+def get_transcriptions_after(transcription_id, page_size):
+    """Keyset page: the page_size transcriptions older than transcription_id."""
+    sql = """SELECT t.id, t.title, t.genre, t.source_path, t.created, t.last_modified,
+             t.license, t.record_date, t.duration_sec, t.extra_meta_data, u.id as user_id, u.username
+             FROM transcriptions t
+             LEFT JOIN users u ON u.id =  t.user_id
+             WHERE t.id < ?
+             ORDER BY t.id DESC
+             LIMIT ?"""
+    return db.query(sql, [transcription_id, page_size])
+
+
+def get_transcriptions_before(transcription_id, page_size):
+    """Keyset page: the page_size transcriptions newer than transcription_id."""
+    sql = """SELECT * FROM (
+             SELECT t.id, t.title, t.genre, t.source_path, t.created, t.last_modified,
+             t.license, t.record_date, t.duration_sec, t.extra_meta_data, u.id as user_id, u.username
+             FROM transcriptions t
+             LEFT JOIN users u ON u.id =  t.user_id
+             WHERE t.id > ?
+             ORDER BY t.id ASC
+             LIMIT ?)
+             ORDER BY id DESC"""
+    return db.query(sql, [transcription_id, page_size])
+
+
 def get_transcriptions_count():
-    sql = "SELECT count(id) as count FROM transcriptions;"
+    sql = "SELECT count FROM table_counts WHERE name = 'transcriptions'"
     result = db.query(sql)
     return result[0]["count"] if result else 0
 
@@ -41,35 +79,118 @@ def add_transcription(
         duration_sec,
         extra_meta_data, allow_collaboration):
     sql = """INSERT INTO transcriptions
-    (title, source_path, source, genre, raw_content, user_id, license,
+    (title, source_path, source, genre, user_id, license,
      record_date, duration_sec, extra_meta_data, allow_collaboration, created, last_modified)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"""
-    db.execute(sql,
-               [title,
-                source_path,
-                source,
-                genre,
-                raw_content,
-                user_id,
-                license,
-                record_date,
-                duration_sec,
-                extra_meta_data, allow_collaboration])
-    transcription_id = db.last_insert_id()
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"""
+    with db.transaction():
+        db.execute(sql,
+                   [title,
+                    source_path,
+                    source,
+                    genre,
+                    user_id,
+                    license,
+                    record_date,
+                    duration_sec,
+                    extra_meta_data, allow_collaboration])
+        transcription_id = db.last_insert_id()
+        set_raw_content(transcription_id, raw_content)
     return transcription_id
 
 
 def get_transcription(transcription_id):
     sql = """SELECT id, title,  source_path, source,
-        genre, raw_content, user_id, created, last_modified, license, record_date, duration_sec, extra_meta_data, allow_collaboration
+        genre, raw_content_preview, raw_content_size, raw_content_sha256, user_id, created, last_modified,
+        license, record_date, duration_sec, extra_meta_data, allow_collaboration, revision,
+        audio_sha256
         FROM transcriptions WHERE id = ?"""
     result = db.query(sql, [transcription_id])
     return result[0] if result else None
 
 
 def remove_transcription(transcription_id):
-    sql = "DELETE FROM transcriptions WHERE id = ?"
-    db.execute(sql, [transcription_id])
+    with db.transaction():
+        sql = "DELETE FROM transcription_raw_content WHERE transcription_id = ?"
+        db.execute(sql, [transcription_id])
+        sql = "DELETE FROM transcriptions WHERE id = ?"
+        db.execute(sql, [transcription_id])
+
+
+def set_raw_content(transcription_id, raw_content):
+    """Replace the raw content of a transcription.
+
+    raw_content is a string or an iterable of strings. It is stored
+    zlib-compressed in transcription_raw_content, RAW_CONTENT_CHUNK_SIZE
+    characters per row, and the preview, UTF-8 size and SHA-256 of the
+    whole text are kept on the transcription row.
+    """
+    if isinstance(raw_content, str):
+        raw_content = [raw_content]
+    sql = """INSERT INTO transcription_raw_content (transcription_id, seq, data)
+             VALUES (?, ?, ?)"""
+    digest = hashlib.sha256()
+    size = 0
+    seq = 0
+    preview = None
+
+    def store(text):
+        nonlocal size, seq
+        data = text.encode("utf-8")
+        digest.update(data)
+        size += len(data)
+        db.execute(sql, [transcription_id, seq, zlib.compress(data)])
+        seq += 1
+
+    with db.transaction():
+        sql_remove = "DELETE FROM transcription_raw_content WHERE transcription_id = ?"
+        db.execute(sql_remove, [transcription_id])
+        pending = ""
+        for text in raw_content:
+            pending += text
+            if preview is None and len(pending) >= RAW_CONTENT_PREVIEW_LENGTH:
+                preview = pending[:RAW_CONTENT_PREVIEW_LENGTH]
+            if len(pending) < RAW_CONTENT_CHUNK_SIZE:
+                continue
+            full_length = len(pending) - len(pending) % RAW_CONTENT_CHUNK_SIZE
+            for start in range(0, full_length, RAW_CONTENT_CHUNK_SIZE):
+                store(pending[start:start + RAW_CONTENT_CHUNK_SIZE])
+            pending = pending[full_length:]
+        if pending:
+            store(pending)
+        if preview is None:
+            preview = pending
+        sql_update = """UPDATE transcriptions SET raw_content = NULL, raw_content_preview = ?,
+                 raw_content_size = ?, raw_content_sha256 = ? WHERE id = ?"""
+        db.execute(sql_update, [preview, size, digest.hexdigest(), transcription_id])
+    return size
+
+
+def iter_raw_content(transcription_id):
+    """Yield the raw content of a transcription one stored chunk at a time."""
+    sql = """SELECT data FROM transcription_raw_content
+             WHERE transcription_id = ? AND seq = ?"""
+    seq = 0
+    while True:
+        result = db.query(sql, [transcription_id, seq])
+        if not result:
+            return
+        yield zlib.decompress(result[0]["data"]).decode("utf-8")
+        seq += 1
+
+
+def get_raw_content(transcription_id):
+    return "".join(iter_raw_content(transcription_id))
+
+
+def get_raw_content_hashes():
+    sql = """SELECT DISTINCT raw_content_sha256 FROM transcriptions
+             WHERE raw_content_sha256 IS NOT NULL"""
+    return {row["raw_content_sha256"] for row in db.query(sql)}
+
+
+def set_audio(transcription_id, audio_sha256):
+    sql = "UPDATE transcriptions SET audio_sha256 = ? WHERE id = ?"
+    db.execute(sql, [audio_sha256, transcription_id])
 
 
 def update_transcription(
@@ -83,79 +204,259 @@ def update_transcription(
         record_date,
         duration_sec,
         extra_meta_data, allow_collaboration):
+    """Update the metadata; raw_content None keeps the stored raw content."""
     sql = """UPDATE transcriptions SET title = ?, source_path = ?, source = ?,
-            genre = ?, last_modified=CURRENT_TIMESTAMP, license = ?, raw_content= ?,  record_date= ?,
+            genre = ?, last_modified=CURRENT_TIMESTAMP, license = ?, record_date= ?,
             duration_sec= ?, extra_meta_data= ?, allow_collaboration = ? WHERE id = ?"""
-    db.execute(sql,
-               [title,
-                source_path,
-                source,
-                genre,
-                license,
-                raw_content,
-                record_date,
-                duration_sec,
-                extra_meta_data, allow_collaboration,
-                transcription_id])
+    with db.transaction():
+        db.execute(sql,
+                   [title,
+                    source_path,
+                    source,
+                    genre,
+                    license,
+                    record_date,
+                    duration_sec,
+                    extra_meta_data, allow_collaboration,
+                    transcription_id])
+        if raw_content is not None:
+            set_raw_content(transcription_id, raw_content)
 
 
 def get_text_fragments(transcription_id):
-    sql = "SELECT id, start_ms, words FROM text_fragments WHERE transcription_id = ?  AND trashed is NULL"
+    sql = """SELECT id, COALESCE(current_start_ms, start_ms) as start_ms,
+             COALESCE(current_words, words) as words
+             FROM text_fragments WHERE transcription_id = ?  AND trashed is NULL"""
     return db.query(sql, [transcription_id])
 
 
-def get_text_fragments_paginated(transcription_id, page, page_size):
-    sql = """SELECT id, start_ms, words, 0 as version
-          FROM text_fragments WHERE transcription_id = ?
-          AND trashed is NULL ORDER BY start_ms
-          LIMIT ? OFFSET ?"""
-    limit = page_size + 1
-    offset = page_size * (page - 1) - 1
-    result =  db.query(sql, [transcription_id, limit, offset])
-    if result is None:
+def iter_text_fragments(transcription_id):
+    """Current version of every fragment, one row at a time, for exports.
+
+    Unlike the listing pages, the seek and the playback window, which use
+    the page order key (the original start_ms, id) so that the stored page
+    boundaries stay valid, the rows are sorted by the current start_ms.
+    An export is a timeline: WebVTT requires cue start times that never
+    decrease, and the end of a cue is the start of the next one. The
+    extra sort costs little as the whole transcription is read anyway.
+    """
+    sql = """SELECT id, COALESCE(current_start_ms, start_ms) as start_ms,
+             COALESCE(current_words, words) as words, version
+             FROM text_fragments WHERE transcription_id = ? AND trashed is NULL
+             ORDER BY COALESCE(current_start_ms, text_fragments.start_ms), id"""
+    return db.iterate(sql, [transcription_id])
+
+
+def _ensure_text_fragment_pages(transcription_id):
+    sql = "SELECT 1 FROM text_fragment_pages WHERE transcription_id = ? LIMIT 1"
+    if db.query(sql, [transcription_id]):
+        return
+    with db.transaction():
+        if db.query(sql, [transcription_id]):
+            return
+        sql = """INSERT INTO text_fragment_pages (transcription_id, page, start_ms, text_fragment_id)
+                 SELECT ?, (row_number - 1) / ? + 1, start_ms, id FROM (
+                     SELECT start_ms, id, ROW_NUMBER() OVER (ORDER BY start_ms, id) as row_number
+                     FROM text_fragments
+                     WHERE transcription_id = ? AND trashed is NULL)
+                 WHERE (row_number - 1) % ? = 0"""
+        db.execute(sql, [transcription_id, FRAGMENT_PAGE_SIZE,
+                         transcription_id, FRAGMENT_PAGE_SIZE])
+
+
+def get_text_fragment_page_count(transcription_id):
+    _ensure_text_fragment_pages(transcription_id)
+    sql = "SELECT MAX(page) as page_count FROM text_fragment_pages WHERE transcription_id = ?"
+    result = db.query(sql, [transcription_id])
+    return result[0]["page_count"] or 0
+
+
+def get_text_fragments_paginated(transcription_id, page, at=None):
+    """One page of fragments; with at, their text as it was at that moment."""
+    _ensure_text_fragment_pages(transcription_id)
+    sql = """SELECT start_ms, text_fragment_id FROM text_fragment_pages
+             WHERE transcription_id = ? AND page = ?"""
+    result = db.query(sql, [transcription_id, page])
+    if not result:
         return []
+    start_ms, text_fragment_id = result[0]
+    if at:
+        fragments = get_text_fragments_as_of(
+            transcription_id, at, start_ms, text_fragment_id, FRAGMENT_PAGE_SIZE)
+        return [(f["id"], f["start_ms"], f["words"], f["version"]) for f in fragments]
+    return get_text_fragments_after(
+        transcription_id, start_ms, text_fragment_id, FRAGMENT_PAGE_SIZE)
+
+
+def get_text_fragments_after(transcription_id, start_ms, text_fragment_id, limit):
+    """Keyset page: fragments from the key (start_ms, id) onwards."""
+    sql = """SELECT id, COALESCE(current_start_ms, start_ms) as start_ms,
+          COALESCE(current_words, words) as words, version
+          FROM text_fragments
+          WHERE transcription_id = ? AND trashed is NULL
+          AND (text_fragments.start_ms, id) >= (?, ?)
+          ORDER BY text_fragments.start_ms, id
+          LIMIT ?"""
+    return db.query(sql, [transcription_id, start_ms, text_fragment_id, limit])
+
+
+def get_text_fragment_at_time(transcription_id, time_ms):
+    """The fragment playing at time_ms: the last one starting at or before it.
+
+    Returns a row with id and start_ms (the page order key), or None if
+    time_ms is before the first fragment.
+    """
+    sql = """SELECT id, start_ms FROM text_fragments
+             WHERE transcription_id = ? AND trashed IS NULL AND start_ms <= ?
+             ORDER BY start_ms DESC, id DESC
+             LIMIT 1"""
+    result = db.query(sql, [transcription_id, time_ms])
+    return result[0] if result else None
+
+
+def get_text_fragments_around(transcription_id, time_ms, before, after):
+    """Fragments around a playback time: before fragments preceding the one
+    playing at time_ms, that fragment and after fragments following it.
 
-    # add the latest edits if any
-    text_ids = [row['id'] for row in result]
-    id_placeholders = ','.join('?' for _ in text_ids)
-    edits_sql = f"""SELECT tfe.text_fragment_id as id, tfe.start_ms, tfe.words, tfe.version
-                            FROM text_fragment_edits tfe
-                            WHERE tfe.text_fragment_id IN ({id_placeholders})
-                              AND tfe.version = (
-                                  SELECT MAX(tfe2.version)
-                                  FROM text_fragment_edits tfe2
-                                  WHERE tfe2.text_fragment_id = tfe.text_fragment_id
-                              )"""
-    edits = db.query(edits_sql, text_ids)
-    edits_ids = [row['id'] for row in edits]
-    results_with_edits = []
-    for row in  result:
-        if row['id'] in edits_ids:
-            edited_row = [edit for edit in edits if edit['id'] == row['id']][0]
-            results_with_edits.append(edited_row)
-        else:
-            results_with_edits.append(row)
-    return results_with_edits
-
-
-def get_the_page_of_text_fragment(text_fragment_id, page_size=20):   
-    sql = """SELECT transcription_id
+    The rows are in page order and have id, start_ms, words and version.
+    start_ms is the page order key, the original start time that
+    get_text_fragment_at_time() compares, so the rows are sorted by it.
+
+    Returns (the id of the fragment playing or None, list of rows).
+    """
+    current = get_text_fragment_at_time(transcription_id, time_ms)
+    sql = """SELECT id, start_ms, COALESCE(current_words, words) as words, version
+          FROM text_fragments
+          WHERE transcription_id = ? AND trashed is NULL
+          AND (text_fragments.start_ms, id) >= (?, ?)
+          ORDER BY text_fragments.start_ms, id
+          LIMIT ?"""
+    if current is None:
+        return None, db.query(sql, [transcription_id, -1, -1, after])
+    following = db.query(sql, [transcription_id, current["start_ms"], current["id"], after + 1])
+    sql = """SELECT id, start_ms, COALESCE(current_words, words) as words, version
+          FROM text_fragments
+          WHERE transcription_id = ? AND trashed is NULL
+          AND (text_fragments.start_ms, id) < (?, ?)
+          ORDER BY text_fragments.start_ms DESC, id DESC
+          LIMIT ?"""
+    preceding = db.query(sql, [transcription_id, current["start_ms"], current["id"], before])
+    return current["id"], preceding[::-1] + following
+
+
+def get_text_fragments_as_of(transcription_id, at, start_ms, text_fragment_id, limit):
+    """Keyset page of fragments with their version at the moment at.
+
+    at is a "YYYY-MM-DD HH:MM:SS" UTC time like text_fragment_edits.created_at.
+    The version of every fragment on the page and the edit rows needed to
+    rebuild its text are read with one query. A fragment that had no
+    edits yet has its original split text as version 0.
+
+    Returns a list of dicts with id, key_start_ms (the page order key),
+    start_ms, words and version as of at, and current_start_ms,
+    current_words and current_version.
+    """
+    sql = """WITH page AS (
+                 SELECT id, start_ms, words,
+                        COALESCE(current_start_ms, start_ms) AS current_start_ms,
+                        COALESCE(current_words, words) AS current_words,
+                        version AS current_version
+                 FROM text_fragments
+                 WHERE transcription_id = ? AND trashed IS NULL
+                 AND (start_ms, id) >= (?, ?)
+                 ORDER BY start_ms, id
+                 LIMIT ?),
+             target AS (
+                 SELECT page.id, (
+                     SELECT e.version FROM text_fragment_edits e
+                     WHERE e.text_fragment_id = page.id AND e.created_at <= ?
+                     ORDER BY e.created_at DESC, e.version DESC LIMIT 1) AS version
+                 FROM page),
+             chain AS (
+                 SELECT target.id, target.version, (
+                     SELECT MAX(s.version) FROM text_fragment_edits s
+                     WHERE s.text_fragment_id = target.id AND s.version <= target.version
+                     AND s.words IS NOT NULL) AS snapshot
+                 FROM target WHERE target.version IS NOT NULL)
+             SELECT page.*, e.version AS edit_version, e.start_ms AS edit_start_ms,
+                    e.words AS edit_words, e.delta AS edit_delta
+             FROM page
+             LEFT JOIN chain ON chain.id = page.id
+             LEFT JOIN text_fragment_edits e ON e.text_fragment_id = chain.id
+                 AND e.version BETWEEN chain.snapshot AND chain.version
+             ORDER BY page.start_ms, page.id, e.version"""
+    rows = db.query(sql, [transcription_id, start_ms, text_fragment_id, limit, at])
+    fragments = []
+    for _, group in groupby(rows, key=lambda row: row["id"]):
+        group = list(group)
+        first, last = group[0], group[-1]
+        fragment = {
+            "id": first["id"],
+            "key_start_ms": first["start_ms"],
+            "start_ms": first["start_ms"],
+            "words": first["words"],
+            "version": 0,
+            "current_start_ms": first["current_start_ms"],
+            "current_words": first["current_words"],
+            "current_version": first["current_version"],
+        }
+        if last["edit_version"] is not None:
+            edits = [{"words": row["edit_words"], "delta": row["edit_delta"]} for row in group]
+            fragment["words"] = edit_history.rebuild_texts(edits)[-1]
+            fragment["version"] = last["edit_version"]
+            if last["edit_start_ms"] is not None:
+                fragment["start_ms"] = last["edit_start_ms"]
+        fragments.append(fragment)
+    return fragments
+
+
+def restore_text_fragments(transcription_id, at, user_id):
+    """Save the text every fragment had at the moment at as its new version.
+
+    Fragments whose current text already matches are left alone. Everything
+    is written in one transaction, RESTORE_BATCH_SIZE fragments per query;
+    the replaced versions are turned into deltas per batch as well.
+
+    Returns the number of fragments restored.
+    """
+    sql = """INSERT INTO text_fragment_edits
+        (start_ms, version, words, text_fragment_id, created_at, user_id)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, ?)"""
+    restored = 0
+    start_ms, text_fragment_id = -2 ** 63, -1
+    with db.transaction():
+        while True:
+            fragments = get_text_fragments_as_of(
+                transcription_id, at, start_ms, text_fragment_id, RESTORE_BATCH_SIZE)
+            if not fragments:
+                break
+            changed = [f for f in fragments
+                       if (f["start_ms"], f["words"]) != (f["current_start_ms"], f["current_words"])]
+            db.executemany(sql, [(f["start_ms"], f["current_version"] + 1, f["words"], f["id"],
+                                  user_id) for f in changed])
+            edit_history.compact_versions(
+                [(f["id"], f["current_version"], f["current_words"]) for f in changed])
+            restored += len(changed)
+            start_ms, text_fragment_id = fragments[-1]["key_start_ms"], fragments[-1]["id"] + 1
+    return restored
+
+
+def get_the_page_of_text_fragment(text_fragment_id):
+    sql = """SELECT transcription_id, start_ms
           FROM text_fragments
           WHERE id = ?
           """
     result = db.query(sql, [text_fragment_id])
     if not result:
         return 1, None
-    transcription_id = result[0]['transcription_id']
-    sql = """SELECT COUNT(*) as count
-          FROM text_fragments
-          WHERE transcription_id = ?
-           AND trashed is NULL AND id <= ?"""
-    result = db.query(sql, [transcription_id, text_fragment_id])
+    transcription_id, start_ms = result[0]
+    _ensure_text_fragment_pages(transcription_id)
+    sql = """SELECT page FROM text_fragment_pages
+          WHERE transcription_id = ? AND (start_ms, text_fragment_id) <= (?, ?)
+          ORDER BY start_ms DESC, text_fragment_id DESC LIMIT 1"""
+    result = db.query(sql, [transcription_id, start_ms, text_fragment_id])
     if result:
-        count = result[0]['count']
-        page = (count - 1) // page_size + 1
-        return page, transcription_id
+        return result[0]["page"], transcription_id
     return 1, transcription_id
 
 
@@ -165,16 +466,20 @@ def get_text_fragments_count(transcription_id):
     return result[0] if result else 0
 
 
-def get_text_fragment(text_fragment_id):
+def get_all_text_fragments_count(transcription_id):
+    """Count of the fragments including the removed (trashed) ones."""
+    sql = "SELECT count(id) as count FROM text_fragments WHERE transcription_id = ?"
+    return db.query(sql, [transcription_id])[0]["count"]
 
-    sql = """SELECT tfe.start_ms, tfe.words, tfe.version, tfe.text_fragment_id as id, tfe.created_at, tfe.user_id, tf.transcription_id
-            FROM text_fragment_edits tfe, text_fragments tf 
-            WHERE text_fragment_id = ? and tf.id = tfe.text_fragment_id
-            ORDER BY version DESC LIMIT 1"""
-    result = db.query(sql, [text_fragment_id])
-    if result:
-        return result[0]
-    sql = "SELECT id, start_ms, words, transcription_id FROM text_fragments WHERE id = ?"
+
+def get_text_fragment(text_fragment_id):
+    sql = """SELECT tf.id, COALESCE(tf.current_start_ms, tf.start_ms) as start_ms,
+            COALESCE(tf.current_words, tf.words) as words, tf.version,
+            tf.transcription_id, tfe.created_at, tfe.user_id
+            FROM text_fragments tf
+            LEFT JOIN text_fragment_edits tfe
+              ON tfe.text_fragment_id = tf.id AND tfe.version = tf.version
+            WHERE tf.id = ?"""
     result = db.query(sql, [text_fragment_id])
     return result[0] if result else None
 
@@ -185,14 +490,54 @@ def add_text_fragment(start_ms, words, transcription_id):
     db.execute(sql, [start_ms, words, transcription_id])
 
 
+def add_text_fragments(transcription_id, fragments):
+    """Insert (start_ms, words) pairs in one transaction.
+
+    Large inputs are written in batches of BULK_INSERT_BATCH_SIZE rows, but
+    either all of them are stored or none. Returns the number of rows.
+    """
+    sql = """INSERT INTO text_fragments (start_ms, words, transcription_id) VALUES
+             (?, ?, ?)"""
+    rows = ((start_ms, words, transcription_id) for start_ms, words in fragments)
+    count = 0
+    with db.transaction():
+        while True:
+            batch = list(islice(rows, BULK_INSERT_BATCH_SIZE))
+            if not batch:
+                break
+            db.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
 def remove_text_fragment(text_fragment_id):
     sql = "UPDATE text_fragments SET trashed = 1 WHERE id = ?"
     db.execute(sql, [text_fragment_id])
 
 
+def remove_text_fragments_batch(transcription_id, limit=BULK_INSERT_BATCH_SIZE):
+    """Delete up to limit fragments of a transcription with their edits.
+
+    Returns the number of deleted fragments, 0 when none are left.
+    """
+    # an id range instead of "id IN (... LIMIT ?)", which the planner may
+    # answer with a scan of the whole table
+    sql = """SELECT MAX(id) AS last_id FROM (SELECT id FROM text_fragments
+             WHERE transcription_id = ? ORDER BY id LIMIT ?)"""
+    with db.transaction():
+        last_id = db.query(sql, [transcription_id, limit])[0]["last_id"]
+        if last_id is None:
+            return 0
+        sql = """DELETE FROM text_fragment_edits WHERE text_fragment_id IN (
+                 SELECT id FROM text_fragments WHERE transcription_id = ? AND id <= ?)"""
+        db.execute(sql, [transcription_id, last_id])
+        sql = "DELETE FROM text_fragments WHERE transcription_id = ? AND id <= ?"
+        return db.execute(sql, [transcription_id, last_id])
+
+
 def remove_transcription_split_text(transcription_id):
-    sql = "DELETE FROM text_fragments WHERE transcription_id = ?"
-    db.execute(sql, [transcription_id])
+    while remove_text_fragments_batch(transcription_id):
+        pass
 
 
 def update_text(id, words):
@@ -200,40 +545,81 @@ def update_text(id, words):
     db.execute(sql, [words, id])
 
 
-def add_versioned_text_fragment(original_id, start_ms, version, words, user_id):
-    sql = """INSERT INTO text_fragment_edits 
-        (start_ms, version, words, text_fragment_id, created_at, user_id) 
-        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, ?)"""
-    db.execute(sql, [start_ms, version, words, original_id, user_id])
-
-
-def search(query):
-    sql = """SELECT t.id, t.start_ms, t.words, t.transcription_id, tr.title
-             FROM text_fragments t, transcriptions tr
-             WHERE  tr.id= t.transcription_id AND t.words LIKE ?
-            """
-    result = db.query(sql, ["%" + query + "%"])
-    sql2 = """SELECT t.id, te.start_ms, te.words, t.transcription_id, tr.title
-             FROM text_fragment_edits te, text_fragments t, transcriptions tr
-             WHERE te.text_fragment_id = t.id and tr.id= t.transcription_id AND
-             te.version = (
-                            SELECT MAX(tfe2.version)
-                            FROM text_fragment_edits tfe2
-                            WHERE tfe2.text_fragment_id = te.text_fragment_id
-                            )
-             AND te.words LIKE ?
-            """
-    result2 = db.query(sql2, ["%" + query + "%"])
-    text_ids2 = [row['id'] for row in result2]   
-    result_filtered = [row for row in result if row['id'] not in text_ids2]
-    result2.extend(result_filtered)
-    result2.sort(key=lambda x: x['id'])
-    return result2
+def add_versioned_text_fragment(original_id, start_ms, words, user_id, base_version=None):
+    """Save an edit as the next version of a fragment.
+
+    The version is allocated by the insert itself. If base_version is given
+    and the fragment has been edited after it, nothing is saved.
+
+    Returns the new version, or None on a conflicting edit.
+    """
+    sql = """INSERT INTO text_fragment_edits
+        (start_ms, version, words, text_fragment_id, created_at, user_id)
+        SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, CURRENT_TIMESTAMP, ?
+        FROM text_fragment_edits WHERE text_fragment_id = ?
+        HAVING ? IS NULL OR COALESCE(MAX(version), 0) = ?"""
+    with db.transaction():
+        try:
+            inserted = db.execute(sql, [start_ms, words, original_id, user_id,
+                                        original_id, base_version, base_version])
+        except sqlite3.IntegrityError:
+            return None
+        if not inserted:
+            return None
+        sql = """SELECT MAX(version) AS version FROM text_fragment_edits
+                 WHERE text_fragment_id = ?"""
+        version = db.query(sql, [original_id])[0]["version"]
+        edit_history.compact_previous(original_id, version)
+        return version
+
+
+SEARCH_RESULT_LIMIT = 200
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+
+
+def _fts_query(query):
+    """Turn free text into an FTS5 query.
+
+    Words are matched as separate terms, text in double quotes as a phrase
+    and a trailing * makes a term a prefix query.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if phrase.strip():
+            terms.append('"' + phrase.strip() + '"')
+        elif word:
+            prefix = word.endswith("*")
+            word = word.replace('"', "").rstrip("*")
+            if word:
+                terms.append('"' + word + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search(query, limit=SEARCH_RESULT_LIMIT):
+    fts_query = _fts_query(query)
+    if not fts_query:
+        return []
+    sql = f"""SELECT t.id, t.transcription_id, tr.title,
+             COALESCE(t.current_start_ms, t.start_ms) as start_ms,
+             text_fragments_fts.words as words,
+             snippet(text_fragments_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 24) as snippet
+             FROM text_fragments_fts
+             JOIN text_fragments t ON t.id = text_fragments_fts.rowid
+             JOIN transcriptions tr ON tr.id = t.transcription_id
+             WHERE text_fragments_fts MATCH ?
+             ORDER BY text_fragments_fts.rank
+             LIMIT ?"""
+    try:
+        return db.query(sql, [fts_query, limit])
+    except sqlite3.OperationalError:
+        # query that the fts5 parser cannot handle
+        return []
 
 
 def search_titles(query):
     sql = """SELECT id, title,  source_path, source,
-                genre, raw_content, user_id, created, last_modified, license,
+                genre, raw_content_preview, raw_content_size, user_id, created, last_modified, license,
                 record_date, duration_sec, extra_meta_data
              FROM transcriptions
              WHERE  title LIKE ?
@@ -243,7 +629,7 @@ def search_titles(query):
 
 def search_file_name(query):
     sql = """SELECT id, title,  source_path, source,
-                genre, raw_content, user_id, created, last_modified, license,
+                genre, raw_content_preview, raw_content_size, user_id, created, last_modified, license,
                 record_date, duration_sec, extra_meta_data
              FROM transcriptions
              WHERE  source_path LIKE ?
@@ -256,7 +642,8 @@ def get_text_fragment_context(id):
     end = id + 5
     if start < 0:
         start = 0
-    sql = """SELECT t.id, t.start_ms, t.words, t.transcription_id, tr.title
+    sql = """SELECT t.id, COALESCE(t.current_start_ms, t.start_ms) as start_ms,
+             COALESCE(t.current_words, t.words) as words, t.transcription_id, tr.title
              FROM text_fragments t, transcriptions tr
              WHERE tr.id= t.transcription_id AND t.trashed is NULL AND t.id >= ? and   t.id <= ?
             """
@@ -265,35 +652,31 @@ def get_text_fragment_context(id):
 
 def get_duplicate_files():
     sql = """SELECT t.id, t.source_path
-            FROM transcriptions t
-            JOIN (
-                SELECT source_path
-                FROM transcriptions
-                GROUP BY source_path
-                HAVING COUNT(id) > 1
-            ) dup ON t.source_path = dup.source_path"""
+            FROM stats_source_path dup
+            JOIN transcriptions t ON t.source_path = dup.source_path
+            WHERE dup.count > 1"""
     return db.query(sql)
 
 
 def get_genre_stats():
-    sql = """select count(id) as count, genre
-            from transcriptions
-            group by genre order by count desc;"""
+    sql = """select count, NULLIF(genre, char(0)) as genre
+            from stats_genre
+            order by count desc;"""
     return db.query(sql)
 
 
 def get_source_stats():
-    sql = """select count(id) as count, source
-            from transcriptions
-            group by source order by count desc;"""
+    sql = """select count, NULLIF(source, char(0)) as source
+            from stats_source
+            order by count desc;"""
     return db.query(sql)
 
 
 def get_user_stats():
-    sql = """select count(t.id) as count, t.user_id, u.username
-            from transcriptions t
-            JOIN users u ON u.id = user_id
-            group by t.user_id order by count desc;
+    sql = """select s.count, s.user_id, u.username
+            from stats_user s
+            JOIN users u ON u.id = s.user_id
+            order by count desc;
             """
     return db.query(sql)
 
@@ -25,3 +25,10 @@ def get_user(user_id):
              WHERE id = ?"""
     result = db.query(sql, [user_id])
     return result[0] if result else None
+
+
+def get_user_by_username(username):
+    sql = """SELECT id, username FROM users
+             WHERE username = ?"""
+    result = db.query(sql, [username])
+    return result[0] if result else None